@@ -0,0 +1,360 @@
+"""
+Behaviour checks for the native adb clients.
+
+Runs ``AdbClient`` against an in-process fake adb server and
+``AdbDeviceTransport`` against a fake adbd, both listening on an ephemeral
+loopback port, and verifies ``shell``, ``push``, ``forward`` and ``reverse``
+together with the OKAY/FAIL framing::
+
+    PYTHONPATH=. python3 tests/adb_client_check.py
+
+It exits with 1 when a check fails.
+"""
+
+import asyncio
+import struct
+import sys
+import tempfile
+from collections.abc import Awaitable, Callable
+
+from waydroid_helper.util.adb_client import (
+    _PACKET,
+    A_CLSE,
+    A_CNXN,
+    A_OKAY,
+    A_OPEN,
+    A_VERSION,
+    A_WRTE,
+    AdbClient,
+    AdbDeviceTransport,
+    AdbError,
+)
+
+SERIAL = "192.168.240.112:5555"
+# Small enough that pushes span several device packets
+FAKE_MAX_PAYLOAD = 4096
+READ_ONLY_DIR = "/system/"
+
+ReadExactly = Callable[[int], Awaitable[bytes]]
+Write = Callable[[bytes], Awaitable[None]]
+
+
+def _hex_prefixed(message: str) -> bytes:
+    payload = message.encode()
+    return f"{len(payload):04x}".encode() + payload
+
+
+def _fail(message: str) -> bytes:
+    return b"FAIL" + _hex_prefixed(message)
+
+
+def _shell_output(command: str) -> bytes:
+    return f"ran {command}\n".encode()
+
+
+class FakeDevice:
+    """State shared by both fakes: pushed files and port tunnels."""
+
+    def __init__(self):
+        self.files: dict[str, tuple[int, bytes]] = {}
+        self.forwards: list[tuple[str, str]] = []
+        self.reverses: list[tuple[str, str]] = []
+
+    async def serve_sync(self, read_exactly: ReadExactly, write: Write) -> None:
+        """One SEND of the sync protocol, answered with OKAY or FAIL"""
+        request = await read_exactly(8)
+        if request[:4] != b"SEND":
+            await write(b"FAIL" + struct.pack("<I", 0))
+            return
+        path, mode = (await read_exactly(struct.unpack("<I", request[4:])[0])).decode().split(",")
+        data = bytearray()
+        while True:
+            chunk = await read_exactly(8)
+            tag, length = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+            if tag == b"DONE":
+                break
+            data += await read_exactly(length)
+        if path.startswith(READ_ONLY_DIR):
+            message = f"couldn't create file: Read-only file system ({path})".encode()
+            await write(b"FAIL" + struct.pack("<I", len(message)) + message)
+            return
+        self.files[path] = (int(mode), bytes(data))
+        await write(b"OKAY" + struct.pack("<I", 0))
+
+
+class FakeAdbServer:
+    """The host protocol of the adb server, for one known device"""
+
+    def __init__(self, device: FakeDevice):
+        self.device = device
+        self.port = 0
+        self._server: asyncio.Server | None = None
+
+    async def __aenter__(self) -> "FakeAdbServer":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        assert self._server is not None
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            await self._serve(reader, writer)
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            writer.close()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        async def read_request() -> str:
+            length = int(await reader.readexactly(4), 16)
+            return (await reader.readexactly(length)).decode()
+
+        async def write(data: bytes) -> None:
+            writer.write(data)
+            await writer.drain()
+
+        request = await read_request()
+        if request == "host:version":
+            await write(b"OKAY" + _hex_prefixed("0029"))
+        elif request.startswith("host:connect:"):
+            await write(b"OKAY" + _hex_prefixed(f"already connected to {request[13:]}"))
+        elif request.startswith(f"host-serial:{SERIAL}:forward:"):
+            local, remote = request.split(":forward:", 1)[1].split(";")
+            if not remote.startswith(("tcp:", "localabstract:")):
+                await write(b"OKAY" + _fail(f"cannot bind '{remote}'"))
+                return
+            self.device.forwards.append((local, remote))
+            # One OKAY for the host request, one for the forward itself
+            await write(b"OKAYOKAY")
+        elif request == f"host:transport:{SERIAL}":
+            await write(b"OKAY")
+            await self._serve_device(await read_request(), reader, write)
+        elif request.startswith("host:transport:"):
+            await write(_fail(f"device '{request[15:]}' not found"))
+        else:
+            await write(_fail(f"unknown host service '{request}'"))
+
+    async def _serve_device(self, service: str, reader: asyncio.StreamReader, write: Write):
+        if service.startswith("shell:"):
+            await write(b"OKAY" + _shell_output(service[6:]))
+        elif service == "sync:":
+            await write(b"OKAY")
+            await self.device.serve_sync(reader.readexactly, write)
+        elif service.startswith("reverse:forward:"):
+            remote, local = service[16:].split(";")
+            self.device.reverses.append((remote, local))
+            await write(b"OKAYOKAY")
+        else:
+            await write(_fail(f"unknown service '{service}'"))
+
+
+class FakeAdbd:
+    """The device protocol of adbd without authentication"""
+
+    def __init__(self, device: FakeDevice):
+        self.device = device
+        self.port = 0
+        self._server: asyncio.Server | None = None
+
+    async def __aenter__(self) -> "FakeAdbd":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        assert self._server is not None
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        def send(command: int, arg0: int, arg1: int, data: bytes = b"") -> None:
+            writer.write(
+                _PACKET.pack(
+                    command, arg0, arg1, len(data), sum(data) & 0xFFFFFFFF, command ^ 0xFFFFFFFF
+                )
+                + data
+            )
+
+        async def read_packet() -> tuple[int, int, int, bytes]:
+            command, arg0, arg1, length, _, _ = _PACKET.unpack(
+                await reader.readexactly(_PACKET.size)
+            )
+            return command, arg0, arg1, await reader.readexactly(length) if length else b""
+
+        # remote id -> (local id, buffered stream data)
+        streams: dict[int, tuple[int, asyncio.StreamReader]] = {}
+        tasks: set[asyncio.Task[None]] = set()
+        next_id = 1
+        try:
+            command, *_ = await read_packet()
+            if command != A_CNXN:
+                return
+            send(A_CNXN, A_VERSION, FAKE_MAX_PAYLOAD, b"device::\0")
+            while True:
+                command, arg0, arg1, data = await read_packet()
+                if command == A_OPEN:
+                    service = data.rstrip(b"\0").decode()
+                    remote_id, next_id = next_id, next_id + 1
+                    if service.startswith("shell:"):
+                        send(A_OKAY, remote_id, arg0)
+                        send(A_WRTE, remote_id, arg0, _shell_output(service[6:]))
+                        send(A_CLSE, remote_id, arg0)
+                    elif service == "sync:":
+                        send(A_OKAY, remote_id, arg0)
+                        stream = asyncio.StreamReader()
+                        streams[remote_id] = (arg0, stream)
+
+                        async def reply(data: bytes, local_id: int = arg0, remote: int = remote_id):
+                            send(A_WRTE, remote, local_id, data)
+
+                        task = asyncio.create_task(self.device.serve_sync(stream.readexactly, reply))
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
+                    else:
+                        # Refused, like adbd does for reverse tunnels on a TCP transport
+                        send(A_CLSE, 0, arg0)
+                elif command == A_WRTE and arg1 in streams:
+                    if len(data) > FAKE_MAX_PAYLOAD:
+                        return
+                    local_id, stream = streams[arg1]
+                    stream.feed_data(data)
+                    send(A_OKAY, arg1, local_id)
+                elif command == A_CLSE:
+                    _ = streams.pop(arg1, None)
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            for task in tasks:
+                _ = task.cancel()
+            writer.close()
+
+
+def _payload(size: int) -> bytes:
+    return bytes(i * 7 % 251 for i in range(size))
+
+
+async def _expect_error(call: Awaitable[object], fragment: str) -> str | None:
+    try:
+        await call
+    except AdbError as e:
+        if fragment not in str(e):
+            return f"expected an error mentioning {fragment!r}, got {e!r}"
+        return None
+    return f"expected AdbError mentioning {fragment!r}, but the call succeeded"
+
+
+async def check_server_shell() -> str | None:
+    device = FakeDevice()
+    async with FakeAdbServer(device) as server:
+        client = AdbClient(SERIAL, port=server.port)
+        if await client.version() != 0x29:
+            return "host:version did not decode the hex reply"
+        output = await client.shell("getprop ro.build.version.sdk", timeout=5)
+        if output != "ran getprop ro.build.version.sdk\n":
+            return f"unexpected shell output {output!r}"
+        lines = [line async for line in await client.open_shell("ls")]
+        if lines != ["ran ls"]:
+            return f"unexpected streamed shell output {lines!r}"
+        return await _expect_error(
+            AdbClient("emulator-5554", port=server.port).shell("true"),
+            "device 'emulator-5554' not found",
+        )
+
+
+async def check_server_push() -> str | None:
+    device = FakeDevice()
+    # Larger than one sync DATA chunk
+    data = _payload(150 * 1024)
+    with tempfile.NamedTemporaryFile() as f:
+        _ = f.write(data)
+        f.flush()
+        async with FakeAdbServer(device) as server:
+            client = AdbClient(SERIAL, port=server.port)
+            await client.push(f.name, "/data/local/tmp/payload", mode=0o100755)
+            error = await _expect_error(
+                client.push(f.name, f"{READ_ONLY_DIR}payload"), "Read-only file system"
+            )
+    if error is not None:
+        return error
+    if device.files.get("/data/local/tmp/payload") != (0o100755, data):
+        return "pushed file content or mode does not match"
+    return None
+
+
+async def check_server_tunnels() -> str | None:
+    device = FakeDevice()
+    async with FakeAdbServer(device) as server:
+        client = AdbClient(SERIAL, port=server.port)
+        await client.forward("tcp:27183", "localabstract:scrcpy")
+        await client.reverse("localabstract:scrcpy", "tcp:27184")
+        error = await _expect_error(client.forward("tcp:27185", "jdwp:1"), "cannot bind 'jdwp:1'")
+    if error is not None:
+        return error
+    if device.forwards != [("tcp:27183", "localabstract:scrcpy")]:
+        return f"unexpected forwards {device.forwards}"
+    if device.reverses != [("localabstract:scrcpy", "tcp:27184")]:
+        return f"unexpected reverses {device.reverses}"
+    return None
+
+
+async def check_device_transport() -> str | None:
+    device = FakeDevice()
+    data = _payload(3 * FAKE_MAX_PAYLOAD + 123)
+    async with FakeAdbd(device) as adbd:
+        transport = AdbDeviceTransport("127.0.0.1", adbd.port)
+        await transport.connect(timeout=5)
+        try:
+            if transport.max_payload != FAKE_MAX_PAYLOAD:
+                return f"max payload {transport.max_payload} was not taken from CNXN"
+            output = await transport.shell("id", timeout=5)
+            if output != "ran id\n":
+                return f"unexpected shell output {output!r}"
+            with tempfile.NamedTemporaryFile() as f:
+                _ = f.write(data)
+                f.flush()
+                await transport.push(f.name, "/data/local/tmp/payload")
+                error = await _expect_error(
+                    transport.push(f.name, f"{READ_ONLY_DIR}payload"), "Read-only file system"
+                )
+            if error is not None:
+                return error
+            error = await _expect_error(
+                transport.reverse("localabstract:scrcpy", "tcp:27184"), "service refused"
+            )
+            if error is not None:
+                return error
+        finally:
+            await transport.close()
+    if device.files.get("/data/local/tmp/payload") != (0o100644, data):
+        return "pushed file content or mode does not match"
+    return None
+
+
+CHECKS: dict[str, Callable[[], Awaitable[str | None]]] = {
+    "server shell": check_server_shell,
+    "server push": check_server_push,
+    "server forward/reverse": check_server_tunnels,
+    "device transport": check_device_transport,
+}
+
+
+async def run() -> bool:
+    ok = True
+    for name, check in CHECKS.items():
+        try:
+            error = await asyncio.wait_for(check(), timeout=10)
+        except (AdbError, OSError, asyncio.TimeoutError) as e:
+            error = f"{type(e).__name__}: {e}"
+        print(f"{'ok  ' if error is None else 'FAIL'} {name}")
+        if error is not None:
+            print(f"       {error}")
+            ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(run()) else 1)
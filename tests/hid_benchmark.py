@@ -0,0 +1,49 @@
+"""
+HID 键盘与 injectInputEvent 键盘路径的基准测试
+
+    PYTHONPATH=. python3 tests/hid_benchmark.py
+"""
+
+import time
+
+from waydroid_helper.controller.android import AKeyCode, AKeyEventAction
+from waydroid_helper.controller.core.control_msg import InjectKeycodeMsg, UhidInputMsg
+from waydroid_helper.controller.core.hid import (HID_ID_KEYBOARD,
+                                                 XKB_KEYCODE_OFFSET, HidKeyboard)
+
+
+def benchmark(events: int = 100_000) -> dict[str, tuple[float, float]]:
+    """比较两条输入路径在主机端的开销
+
+    返回 {路径: (每个事件的微秒数, 每个事件的字节数)}。Android 端 injectInputEvent 的开销
+    只能在设备上测量，这里只统计打包和发送的数据量。
+    """
+
+    def run(step) -> tuple[float, float]:
+        size = 0
+        start = time.perf_counter()
+        for i in range(events):
+            size += step(i)
+        elapsed = time.perf_counter() - start
+        return elapsed / events * 1e6, size / events
+
+    keyboard = HidKeyboard()
+    key_a = 30 + XKB_KEYCODE_OFFSET  # KEY_A
+
+    def inject_key(i: int) -> int:
+        action = AKeyEventAction.DOWN if i % 2 == 0 else AKeyEventAction.UP
+        return len(InjectKeycodeMsg(action, AKeyCode.AKEYCODE_A, 0, 0).pack())
+
+    def uhid_key(i: int) -> int:
+        report = keyboard.process(key_a, i % 2 == 0)
+        return len(UhidInputMsg(HID_ID_KEYBOARD, report).pack()) if report else 0
+
+    return {
+        "inject keycode": run(inject_key),
+        "uhid keyboard": run(uhid_key),
+    }
+
+
+if __name__ == "__main__":
+    for path, (micros, size) in benchmark().items():
+        print(f"{path:16} {micros:7.2f} us/event {size:5.1f} bytes/event")
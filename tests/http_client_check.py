@@ -0,0 +1,152 @@
+"""
+Behaviour checks for the shared HTTP client.
+
+Runs ``HttpClient`` against an in-process ``httpx`` transport, so no network
+is needed, and verifies the per-host concurrency limit, that queued metadata
+requests get a slot before payload downloads, and that transient error
+statuses are retried::
+
+    PYTHONPATH=. python3 tests/http_client_check.py
+
+It exits with 1 when a check fails.
+"""
+
+import asyncio
+import sys
+from collections import Counter
+from collections.abc import Awaitable, Callable
+
+import httpx
+
+from waydroid_helper.util.http_client import (
+    PRIORITY_METADATA,
+    PRIORITY_PAYLOAD,
+    HttpClient,
+)
+
+Handler = Callable[[httpx.Request], Awaitable[httpx.Response]]
+
+
+def _client(handler: Handler, per_host_limit: int = 4) -> HttpClient:
+    # Keep retries fast; the backoff itself is not what is being checked
+    return HttpClient(
+        per_host_limit=per_host_limit,
+        base_delay=0.001,
+        max_delay=0.01,
+        transport=httpx.MockTransport(handler),
+    )
+
+
+async def check_per_host_limit() -> str | None:
+    active: Counter[str] = Counter()
+    peak: Counter[str] = Counter()
+    peak_total = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal peak_total
+        host = request.url.host
+        active[host] += 1
+        peak[host] = max(peak[host], active[host])
+        peak_total = max(peak_total, active.total())
+        await asyncio.sleep(0.01)
+        active[host] -= 1
+        return httpx.Response(200)
+
+    client = _client(handler, per_host_limit=2)
+    try:
+        _ = await asyncio.gather(
+            *(client.get(f"https://{host}/{i}") for host in ("a.test", "b.test") for i in range(8))
+        )
+    finally:
+        await client.aclose()
+    if peak["a.test"] != 2 or peak["b.test"] != 2:
+        return f"expected at most 2 concurrent requests per host, saw {dict(peak)}"
+    if peak_total < 3:
+        return f"hosts should not share a limit, saw {peak_total} concurrent requests in total"
+    return None
+
+
+async def check_priority_order() -> str | None:
+    order: list[str] = []
+    first_started = asyncio.Event()
+    release_first = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path == "/first":
+            first_started.set()
+            _ = await release_first.wait()
+        order.append(path)
+        return httpx.Response(200)
+
+    client = _client(handler, per_host_limit=1)
+    try:
+        # Hold the only slot, then queue payloads before metadata
+        first = asyncio.create_task(client.get("https://a.test/first"))
+        _ = await first_started.wait()
+        queued = [
+            asyncio.create_task(client.get(f"https://a.test/payload-{i}", PRIORITY_PAYLOAD))
+            for i in range(3)
+        ] + [
+            asyncio.create_task(client.get(f"https://a.test/metadata-{i}", PRIORITY_METADATA))
+            for i in range(3)
+        ]
+        # Let every task reach the wait queue before the slot is freed
+        await asyncio.sleep(0.01)
+        release_first.set()
+        _ = await asyncio.gather(first, *queued)
+    finally:
+        await client.aclose()
+    expected = ["/first"] + [f"/metadata-{i}" for i in range(3)] + [f"/payload-{i}" for i in range(3)]
+    if order != expected:
+        return f"expected {expected}, got {order}"
+    return None
+
+
+async def check_retry() -> str | None:
+    calls = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        if request.url.path == "/flaky" and calls < 3:
+            return httpx.Response(503)
+        if request.url.path == "/down":
+            return httpx.Response(503)
+        return httpx.Response(200, text="ok")
+
+    client = _client(handler)
+    try:
+        response = await client.get("https://a.test/flaky", retries=3)
+        if response.status_code != 200 or calls != 3:
+            return f"503 twice then 200: got {response.status_code} after {calls} requests"
+
+        calls = 0
+        response = await client.get("https://a.test/down", retries=3)
+        if response.status_code != 503 or calls != 3:
+            return f"503 every time: got {response.status_code} after {calls} requests"
+    finally:
+        await client.aclose()
+    return None
+
+
+CHECKS: dict[str, Callable[[], Awaitable[str | None]]] = {
+    "per-host limit": check_per_host_limit,
+    "priority order": check_priority_order,
+    "retry on 503": check_retry,
+}
+
+
+async def run() -> bool:
+    ok = True
+    for name, check in CHECKS.items():
+        error = await asyncio.wait_for(check(), timeout=10)
+        print(f"{'ok  ' if error is None else 'FAIL'} {name}")
+        if error is not None:
+            print(f"       {error}")
+            ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(run()) else 1)
@@ -0,0 +1,155 @@
+"""
+Import-time budgets for the entry points.
+
+Cold start of waydroid-helper is dominated by imports, so every entry point
+has a budget for the time ``python -X importtime`` reports for it, plus a list
+of modules it must not load at all (heavy dependencies that are imported
+lazily). Run the check after changing imports, with the compiled resources
+from a build dir (``meson test`` sets this up)::
+
+    WAYDROID_HELPER_GRESOURCE=_build/data/waydroid-helper.gresource \
+        python3 tests/import_budget.py [--runs N] [ENTRY...]
+
+It exits with 1 when an entry point is over budget or loads a forbidden
+module, and prints the slowest modules to look at. Budgets are set for a
+low-end laptop with a warm page cache; tighten them when startup improves.
+"""
+
+import os
+import re
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MARKER = "--- entry point ---"
+# "import time: self [us] | cumulative | imported package", nesting is indented by two spaces
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+
+@dataclass(frozen=True)
+class EntryPoint:
+    modules: tuple[str, ...]
+    budget_ms: float
+    forbidden: tuple[str, ...] = ()
+    # Templated widgets need the compiled resources registered before import
+    needs_gresource: bool = False
+
+
+ENTRY_POINTS: dict[str, EntryPoint] = {
+    # Everything imported before the first window is shown
+    "gui": EntryPoint(
+        ("waydroid_helper.main", "waydroid_helper.window"),
+        budget_ms=500,
+        forbidden=(
+            "httpx",
+            "yaml",
+            "gi.repository.Vte",
+            "waydroid_helper.props_page",
+            "waydroid_helper.extensions_page",
+            "waydroid_helper.scripts_page",
+            "waydroid_helper.tools.extensions_manager",
+        ),
+        needs_gresource=True,
+    ),
+    # waydroid-helper --start-mount / --start-monitor (system services)
+    "mount": EntryPoint(
+        ("waydroid_helper.tools.mount_service",),
+        budget_ms=120,
+        forbidden=("httpx", "yaml", "gi.repository.Gtk"),
+    ),
+    "monitor": EntryPoint(
+        ("waydroid_helper.tools.monitor_service",),
+        budget_ms=120,
+        forbidden=("httpx", "yaml", "gi.repository.Gtk"),
+    ),
+}
+
+
+@dataclass
+class ImportProfile:
+    total_ms: float
+    # module -> self time in ms, for everything imported by the entry point
+    modules: dict[str, float]
+
+
+def _child_code(entry: EntryPoint, gresource: str | None) -> str:
+    lines = ["import sys", f"sys.stderr.write({MARKER!r} + '\\n')", "sys.stderr.flush()"]
+    if entry.needs_gresource and gresource:
+        lines += [
+            "from gi.repository import Gio",
+            f"Gio.Resource.load({gresource!r})._register()",
+        ]
+    lines += [f"import {module}" for module in entry.modules]
+    return "\n".join(lines)
+
+
+def measure(entry: EntryPoint, gresource: str | None = None) -> ImportProfile:
+    """Import the entry point in a fresh interpreter and collect -X importtime"""
+    env = {**os.environ, "PYTHONPATH": SOURCE_DIR, "PYTHONDONTWRITEBYTECODE": "1"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _child_code(entry, gresource)],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {', '.join(entry.modules)} failed:\n{result.stderr}")
+
+    # Interpreter start-up (site, encodings) is logged before the marker
+    stderr = result.stderr.split(MARKER, 1)[-1]
+    total_us = 0
+    modules: dict[str, float] = {}
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules[name] = int(self_us) / 1000
+        if not indent:
+            total_us += int(cumulative_us)
+    return ImportProfile(total_us / 1000, modules)
+
+
+def check(name: str, entry: EntryPoint, runs: int = 5, gresource: str | None = None) -> bool:
+    profiles = [measure(entry, gresource) for _ in range(runs)]
+    total_ms = statistics.median(p.total_ms for p in profiles)
+    loaded = set().union(*(p.modules for p in profiles))
+    forbidden = [m for m in entry.forbidden if m in loaded]
+
+    ok = total_ms <= entry.budget_ms and not forbidden
+    print(f"{'ok  ' if ok else 'FAIL'} {name}: {total_ms:.1f} ms (budget {entry.budget_ms:.0f} ms)")
+    for module in forbidden:
+        print(f"       loads {module}, which must be imported lazily")
+    if total_ms > entry.budget_ms:
+        slowest = sorted(profiles[-1].modules.items(), key=lambda item: item[1], reverse=True)
+        for module, self_ms in slowest[:10]:
+            print(f"       {self_ms:8.1f} ms  {module}")
+    return ok
+
+
+def main(argv: list[str]) -> int:
+    runs = 5
+    if "--runs" in argv:
+        i = argv.index("--runs")
+        runs = int(argv[i + 1])
+        argv = argv[:i] + argv[i + 2 :]
+    names = argv or list(ENTRY_POINTS)
+    gresource = os.environ.get("WAYDROID_HELPER_GRESOURCE")
+    if gresource is not None and not os.path.exists(gresource):
+        gresource = None
+
+    ok = True
+    for name in names:
+        try:
+            ok = check(name, ENTRY_POINTS[name], runs, gresource) and ok
+        except RuntimeError as e:
+            print(f"FAIL {name}: {e}")
+            ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
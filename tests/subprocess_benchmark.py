@@ -0,0 +1,58 @@
+"""
+子进程启动开销的基准测试
+
+    PYTHONPATH=. python3 tests/subprocess_benchmark.py
+"""
+
+import asyncio
+import os
+import shlex
+import time
+
+from waydroid_helper.util.subprocess_manager import SubprocessManager
+
+
+def benchmark(count: int = 200) -> dict[str, float]:
+    """比较旧的启动方式（复制环境、shlex 拆分、preexec_fn=os.setsid）与当前方式
+
+    返回 {方式: 每秒启动并回收的进程数}。
+    """
+
+    async def legacy() -> None:
+        env = {
+            **os.environ.copy(),
+            "PATH": f"/usr/bin:/bin:{os.environ['PATH']}",
+            "LD_LIBRARY_PATH": "",
+            "PYTHONPATH": "",
+            "PYTHONHOME": "",
+        }
+        process = await asyncio.create_subprocess_exec(
+            *shlex.split("true --flag"),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=env,
+            preexec_fn=os.setsid,
+        )
+        await process.communicate()
+
+    async def current() -> None:
+        process = await SubprocessManager()._create_process(
+            ["true", "--flag"], flag=True, env=None, shell=False
+        )
+        await process.communicate()
+
+    async def run() -> dict[str, float]:
+        rates: dict[str, float] = {}
+        for name, spawn in (("preexec_fn", legacy), ("start_new_session", current)):
+            start = time.perf_counter()
+            for _ in range(count):
+                await spawn()
+            rates[name] = count / (time.perf_counter() - start)
+        return rates
+
+    return asyncio.run(run())
+
+
+if __name__ == "__main__":
+    for name, rate in benchmark().items():
+        print(f"{name:18} {rate:8.1f} spawns/s")
@@ -44,6 +44,7 @@ Requires:       python3-yaml
 Requires:       android-tools
 
 Recommends:     bindfs
+Recommends:     python3-h2
 
 %description
 Waydroid Helper is a graphical user interface application that provides
@@ -10,12 +10,12 @@ gi.require_version("Adw", "1")
 
 from gettext import gettext as _
 
-from gi.repository import Adw, GObject, Gtk
+from gi.repository import Adw, GLib, GObject, Gtk, Pango
 
 from waydroid_helper.compat_widget import (HeaderBar, MessageDialog,
                                            NavigationPage, Spinner,
                                            ToolbarView)
-from waydroid_helper.tools import PackageManager
+from waydroid_helper.tools import InstallationCancelled, PackageManager
 from waydroid_helper.util import Task, logger
 
 if TYPE_CHECKING:
@@ -51,17 +51,39 @@ class AvailableRow(Adw.ActionRow):
         self.install_button.set_size_request(button_size, button_size)
         self.add_suffix(self.install_button)
 
+        # 下载进度：已下载/总大小 和速度，只在安装时显示
+        self.progress_label: Gtk.Label = Gtk.Label.new()
+        self.progress_label.add_css_class("dim-label")
+        self.progress_label.add_css_class("numeric")
+        self.progress_label.set_valign(align=Gtk.Align.CENTER)
+        self.progress_label.set_ellipsize(Pango.EllipsizeMode.END)
+        self.progress_label.set_max_width_chars(32)
+        self.add_suffix(self.progress_label)
+
         self.spinner: Spinner = Spinner()
         self.spinner.set_size_request(button_size, button_size)
         self.spinner.set_valign(align=Gtk.Align.CENTER)
         self.add_suffix(self.spinner)
 
+        # 只在安装真正开始后显示，确认对话框和卸载期间不显示
+        self.cancel_button: Gtk.Button = Gtk.Button.new()
+        self.cancel_button.set_valign(align=Gtk.Align.CENTER)
+        self.cancel_button.set_icon_name("process-stop-symbolic")
+        self.cancel_button.set_tooltip_text(_("Cancel Installation"))
+        self.cancel_button.set_size_request(button_size, button_size)
+        self.add_suffix(self.cancel_button)
+
         if installed:
             self.set_installation_state(self.State.INSTALLED)
         else:
             self.set_installation_state(self.State.UNINSTALLED)
 
     def set_installation_state(self, state: State):
+        if state != self.State.INSTALLING:
+            self.progress_label.set_label("")
+            self.progress_label.hide()
+        self.cancel_button.hide()
+        self.cancel_button.set_sensitive(True)
         if state == self.State.INSTALLED:
             self.install_button.hide()
             self.delete_button.show()
@@ -75,6 +97,19 @@ class AvailableRow(Adw.ActionRow):
             self.delete_button.hide()
             self.spinner.show()
 
+    def set_download_progress(self, downloaded: int, total: int, rate: float):
+        size = GLib.format_size(downloaded)
+        if total:
+            size = f"{size} / {GLib.format_size(total)}"
+        self.progress_label.set_label(f"{size} • {GLib.format_size(int(rate))}/s")
+        self.progress_label.show()
+
+    def set_output(self, line: str):
+        # 下载完成后显示构建输出的最后一行
+        self.progress_label.set_label(line)
+        self.progress_label.set_tooltip_text(line)
+        self.progress_label.show()
+
     def set_validation_errors(self, arch_error: bool = False, android_version_error: bool = False):
         """Set validation errors as colored subtitle text.
 
@@ -190,6 +225,7 @@ class AvailableVersionPage(NavigationPage):
         self.set_child(adw_tool_bar_view)
 
         self.rows: dict[str, AvailableRow] = {}
+        self._installing: str | None = None
         self.lock: asyncio.Lock = asyncio.Lock()
 
         for version in ext_versions:
@@ -226,20 +262,41 @@ class AvailableVersionPage(NavigationPage):
                     version=version["version"],
                 ),
             )
+            adw_action_row.cancel_button.connect(
+                "clicked",
+                partial(self.on_cancel_button_clicked, name=version["name"]),
+            )
             adw_preferences_group.add(child=adw_action_row)
             self.rows[f"{version['name']}-{version['version']}"] = adw_action_row
 
     def on_installation_started(
         self, obj: GObject.Object, name: str, version: str
     ) -> None:
-        pass
+        # 安装是串行的，download-progress 只带包名，记下正在安装的版本
+        self._installing = f"{name}-{version}"
+        row = self.rows.get(self._installing)
+        if row is not None:
+            row.cancel_button.show()
         # self.rows[f"{name}-{version}"].set_installation_state(
         #     AvailableRow.State.INSTALLING
         # )
 
+    def on_download_progress(
+        self, obj: GObject.Object, name: str, downloaded: int, total: int, rate: float
+    ) -> None:
+        row = self.rows.get(self._installing) if self._installing else None
+        if row is not None:
+            row.set_download_progress(downloaded, total, rate)
+
+    def on_installation_output(self, obj: GObject.Object, name: str, line: str) -> None:
+        row = self.rows.get(self._installing) if self._installing else None
+        if row is not None and line.strip():
+            row.set_output(line.strip())
+
     def on_installation_completed(
         self, obj: GObject.Object, name: str, version: str
     ) -> None:
+        self._installing = None
         self.rows[f"{name}-{version}"].set_installation_state(
             AvailableRow.State.INSTALLED
         )
@@ -364,6 +421,8 @@ class AvailableVersionPage(NavigationPage):
                         name=name, version=version
                     )
                     installation_successful = True
+        except InstallationCancelled:
+            logger.info(f"Installation cancelled: {name}-{version}")
         except Exception as e:
             logger.error(str(e))
             dialog = MessageDialog(
@@ -372,6 +431,7 @@ class AvailableVersionPage(NavigationPage):
             dialog.add_response(Gtk.ResponseType.OK, _("OK"))
             dialog.present()
         finally:
+            self._installing = None
             if not installation_successful:
                 self.rows[f"{name}-{version}"].set_installation_state(
                     AvailableRow.State.UNINSTALLED
@@ -408,5 +468,9 @@ class AvailableVersionPage(NavigationPage):
     def on_install_button_clicked(self, button: Gtk.Button, name:str, version:str):
         self._task.create_task(self.__install(name, version))
 
+    def on_cancel_button_clicked(self, button: Gtk.Button, name: str):
+        button.set_sensitive(False)
+        self._task.create_task(self.extension_manager.cancel_installation(name))
+
     def on_delete_button_clicked(self, button: Gtk.Button, name:str, version:str):
         self._task.create_task(self.__uninstall(name, version))
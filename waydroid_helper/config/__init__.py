@@ -1,8 +1,9 @@
 from .file_manager import ConfigManager
-from .models import CageConfig, RootConfig
+from .models import CageConfig, KeyMappingConfig, RootConfig
 
 __all__ = [
     "ConfigManager",
     "CageConfig",
+    "KeyMappingConfig",
     "RootConfig"
 ]
@@ -22,14 +22,21 @@ class CageConfig(GObject.Object):
     confine_pointer = GObject.Property(type=bool, default=False)
 
 
+class KeyMappingConfig(GObject.Object):
+
+    uhid_input = GObject.Property(type=bool, default=False)
+
+
 class RootConfig(GObject.Object):
     
     cage = GObject.Property(type=object)
+    key_mapping = GObject.Property(type=object)
     
     def __init__(self):
         super().__init__()
         self._file_manager = ConfigManager()
         self.cage = CageConfig()
+        self.key_mapping = KeyMappingConfig()
         self.load_from_file()
     
     def load_from_file(self) -> None:
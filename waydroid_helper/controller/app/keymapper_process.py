@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+预热的按键映射进程
+提前启动子进程并完成 GTK、libadwaita 以及全部组件模块的导入，打开映射窗口时只需把显示器名发给它。
+子进程通过管道回报启动时间线（导入、窗口 realize、服务监听、scrcpy 就绪），用于跟踪首次输入前的耗时。
+
+本模块会被 spawn 出的子进程重新导入，顶层不要引入 GTK 等重量级依赖。
+"""
+
+import asyncio
+import multiprocessing
+import time
+import weakref
+from collections.abc import Callable
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+
+from waydroid_helper.util.log import logger
+
+# 启动时间线的各个阶段，按发生顺序排列
+STARTUP_STAGES = ("import", "window_realize", "server_listen", "scrcpy_ready")
+
+
+class StartupTimeline:
+    """记录当前进程的启动阶段，可选地把每个阶段转发给父进程"""
+
+    def __init__(self):
+        self.marks: dict[str, float] = {}
+        self._reporter: Callable[[tuple[str, float]], None] | None = None
+
+    def set_reporter(self, reporter: Callable[[tuple[str, float]], None] | None):
+        self._reporter = reporter
+
+    def mark(self, stage: str):
+        # 同一阶段只记录第一次，scrcpy 重试时不会覆盖
+        if stage in self.marks:
+            return
+        # CLOCK_MONOTONIC 在进程之间可比较
+        now = time.monotonic()
+        self.marks[stage] = now
+        if self._reporter is not None:
+            try:
+                self._reporter((stage, now))
+            except (OSError, ValueError):
+                self._reporter = None
+
+
+startup_timeline = StartupTimeline()
+
+
+def keymapper_worker(conn: Connection):
+    """子进程入口：预先导入，等待显示器名后启动按键映射窗口"""
+    startup_timeline.set_reporter(conn.send)
+
+    # 导入 GTK/libadwaita 并扫描组件模块，之后创建窗口时都命中 sys.modules
+    from waydroid_helper.controller.app.window import create_keymapper
+    from waydroid_helper.controller.widgets.factory import WidgetFactory
+
+    WidgetFactory().preload()
+    startup_timeline.mark("import")
+
+    try:
+        display_name = conn.recv()
+    except EOFError:
+        return
+    if not display_name:
+        return
+    create_keymapper(display_name)
+
+
+# 所有启动器，应用退出时统一结束预热进程
+_launchers: "weakref.WeakSet[KeymapperLauncher]" = weakref.WeakSet()
+
+
+def shutdown_launchers():
+    """结束所有启动器中尚未附加的预热进程，在应用关闭时调用"""
+    for launcher in list(_launchers):
+        launcher.shutdown()
+
+
+class KeymapperLauncher:
+    """管理一个预热的按键映射进程，按需把它附加到显示器上"""
+
+    def __init__(self):
+        self._proc: BaseProcess | None = None
+        self._conn: Connection | None = None
+        self._spawned_at: float = 0.0
+        self.timeline: dict[str, float] = {}
+        _launchers.add(self)
+
+    def prewarm(self):
+        """启动一个空闲的预热进程，已存在时不做任何事"""
+        if self._proc is not None and self._proc.is_alive():
+            return
+        ctx = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = ctx.Pipe()
+        self._proc = ctx.Process(
+            target=keymapper_worker, args=(child_conn,), name="KeyMapper-prewarm"
+        )
+        self._spawned_at = time.monotonic()
+        self._proc.start()
+        child_conn.close()
+        self._conn = parent_conn
+        logger.debug(f"Keymapper process pre-warmed (PID: {self._proc.pid})")
+
+    def attach(self, display_name: str) -> BaseProcess:
+        """把预热进程附加到显示器并返回它，没有可用的预热进程时先启动一个"""
+        self.prewarm()
+        proc, conn = self._proc, self._conn
+        assert proc is not None and conn is not None
+        self._proc = self._conn = None
+
+        attached_at = time.monotonic()
+        self.timeline = {}
+        conn.send(display_name)
+        proc.name = f"KeyMapper-{display_name}"
+        asyncio.create_task(self._collect_timeline(conn, attached_at))
+        return proc
+
+    async def _collect_timeline(self, conn: Connection, attached_at: float):
+        """读取子进程回报的启动阶段，时间相对于附加时刻"""
+        loop = asyncio.get_running_loop()
+        spawned_at = self._spawned_at
+        try:
+            while len(self.timeline) < len(STARTUP_STAGES):
+                stage, timestamp = await loop.run_in_executor(None, conn.recv)
+                # 预热期间完成的阶段不计入首次输入耗时
+                self.timeline[stage] = max(0.0, timestamp - attached_at)
+                logger.info(
+                    f"Keymapper startup: {stage} at +{self.timeline[stage] * 1000:.1f} ms "
+                    f"(+{(timestamp - spawned_at) * 1000:.1f} ms since spawn)"
+                )
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+        if "scrcpy_ready" in self.timeline:
+            logger.info(
+                f"Keymapper time to first input: {self.timeline['scrcpy_ready'] * 1000:.1f} ms"
+            )
+
+    def shutdown(self):
+        """结束尚未附加的预热进程"""
+        if self._conn is not None:
+            try:
+                self._conn.send(None)
+            except OSError:
+                pass
+            self._conn.close()
+            self._conn = None
+        if self._proc is not None and self._proc.is_alive():
+            self._proc.join(timeout=1)
+            if self._proc.is_alive():
+                self._proc.terminate()
+        self._proc = None
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+布局管理器
+负责组件与布局记录之间的转换，按稳定 ID 增量应用布局变化，并提供编辑模式下的撤销/重做
+"""
+
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any
+
+from gi.repository import Gdk, GLib, Gtk
+
+from waydroid_helper.controller.core import Key, KeyCombination
+from waydroid_helper.controller.core.control_msg import ScreenInfo
+from waydroid_helper.controller.widgets.base import BaseWidget
+from waydroid_helper.controller.widgets.layout import (
+    COORDINATE_CONFIG_KEYS,
+    Layout,
+    LayoutHistory,
+    WidgetChange,
+    WidgetRecord,
+    apply_changes_to_layout,
+    changed_config_keys,
+    changed_fields,
+    denormalize_points,
+    diff_layouts,
+    normalize_points,
+)
+from waydroid_helper.util.log import logger
+
+if TYPE_CHECKING:
+    from waydroid_helper.controller.app.window import TransparentWindow
+
+# 加载布局时每帧用于创建组件的时间预算
+LAYOUT_FRAME_BUDGET_SECONDS = 0.008
+
+
+class LayoutManager:
+    """布局的采集、增量应用与撤销/重做"""
+
+    def __init__(self, window: "TransparentWindow"):
+        self.window = window
+        self.screen_info = ScreenInfo()
+        self.history = LayoutHistory()
+        # 最近一次提交后的布局，用于计算编辑产生的 diff
+        self._snapshot = Layout()
+        self._layout_tick_id: int = 0
+        # 应用变化期间删除组件等操作不应触发提交
+        self._applying = False
+
+    # ==================== 组件 <-> 记录 ====================
+
+    def _serialize_key_combination(self, key_combination: KeyCombination) -> list[str]:
+        """序列化按键组合为字符串列表"""
+        if not key_combination:
+            return []
+        return [str(key) for key in key_combination.keys]
+
+    def _deserialize_key_combination(
+        self, key_names: list[str]
+    ) -> "KeyCombination | None":
+        """从字符串列表反序列化按键组合"""
+        keys: list[Key] = []
+        for key_name in key_names:
+            key = self.window.key_registry.deserialize_key(key_name)
+            if key:
+                keys.append(key)
+        return KeyCombination(keys) if keys else None
+
+    def _deserialize_final_keys(self, record: WidgetRecord) -> list[KeyCombination]:
+        final_keys = []
+        for key_names in record.keys:
+            key_combo = self._deserialize_key_combination(key_names)
+            if key_combo:
+                final_keys.append(key_combo)
+        return final_keys
+
+    def _deserialize_direction_keys(
+        self, record: WidgetRecord
+    ) -> dict[str, "KeyCombination | None"]:
+        return {
+            direction: self._deserialize_key_combination(key_names)
+            for direction, key_names in record.direction_keys.items()
+        }
+
+    def _config_for_widget(
+        self, record: WidgetRecord, keys: list[str] | None = None
+    ) -> dict[str, dict[str, Any]]:
+        """把记录中的配置还原为当前分辨率下的值，keys 为空时返回全部配置"""
+        screen_width, screen_height = self.screen_info.get_host_resolution()
+        config_data: dict[str, dict[str, Any]] = {}
+        for key in record.config if keys is None else keys:
+            item = record.config[key]
+            value = item.get("value")
+            if key in COORDINATE_CONFIG_KEYS.get(record.type, ()) and isinstance(
+                value, list
+            ):
+                item = {
+                    **item,
+                    "value": denormalize_points(value, screen_width, screen_height),
+                }
+            config_data[key] = item
+        return config_data
+
+    def widget_to_record(self, child: "BaseWidget") -> WidgetRecord:
+        """将 widget 转换为归一化的布局记录"""
+        screen_width, screen_height = self.screen_info.get_host_resolution()
+        widget_type = type(child).__name__.lower()
+        record = WidgetRecord(
+            type=widget_type,
+            x=child.x / screen_width,
+            y=child.y / screen_height,
+            width=child.width / screen_width,
+            height=child.height / screen_height,
+            id=child.widget_id,
+        )
+
+        # 如果widget有text属性，也保存
+        if hasattr(child, "text") and child.text:
+            record.text = str(child.text)
+
+        # 保存按键映射 - 根据组件类型处理
+        if widget_type == "directionalpad":
+            # DirectionalPad 有四个方向的按键
+            if hasattr(child, "direction_keys") and child.direction_keys:
+                record.direction_keys = {
+                    direction: self._serialize_key_combination(
+                        child.direction_keys[direction]
+                    )
+                    for direction in ("up", "down", "left", "right")
+                }
+        elif hasattr(child, "final_keys") and child.final_keys:
+            # 其他组件的通用按键映射
+            record.keys = [
+                self._serialize_key_combination(kc) for kc in child.final_keys
+            ]
+
+        # 保存组件配置，只保留值和可见性
+        if hasattr(child, "get_config_manager"):
+            config_manager = child.get_config_manager()
+            for key, config in config_manager.configs.items():
+                value = config.value
+                if key in COORDINATE_CONFIG_KEYS.get(widget_type, ()) and isinstance(
+                    value, str
+                ):
+                    value = normalize_points(value, screen_width, screen_height)
+                record.config[key] = {"value": value, "visible": config.visible}
+
+        return record
+
+    def capture_layout(self) -> Layout:
+        """收集当前所有 widget 组成布局"""
+        screen_width, screen_height = self.screen_info.get_host_resolution()
+        layout = Layout(
+            screen_resolution=(screen_width, screen_height),
+            widget_version=BaseWidget.WIDGET_VERSION,
+        )
+        if screen_width <= 0 or screen_height <= 0:
+            return layout
+
+        child: "BaseWidget | None" = self.window.fixed.get_first_child()
+        while child:
+            layout.widgets.append(self.widget_to_record(child))
+            child = child.get_next_sibling()
+        return layout
+
+    def _widgets_by_id(self) -> dict[str, "BaseWidget"]:
+        widgets: dict[str, "BaseWidget"] = {}
+        child: "BaseWidget | None" = self.window.fixed.get_first_child()
+        while child:
+            widgets[child.widget_id] = child
+            child = child.get_next_sibling()
+        return widgets
+
+    # ==================== 增量应用 ====================
+
+    def apply(self, layout: Layout) -> None:
+        """切换到新布局，只应用与当前布局之间的差异，并记录到撤销历史"""
+        self.commit()
+        screen_width, screen_height = self.screen_info.get_host_resolution()
+        changes = diff_layouts(self._snapshot, layout, screen_width, screen_height)
+        self.apply_changes(changes)
+        self.history.push(changes)
+
+    def apply_changes(self, changes: list[WidgetChange]) -> None:
+        """应用一组变化，未变化的组件保持不动"""
+        widgets = self._widgets_by_id()
+        pending: list[WidgetRecord] = []
+        updated = removed = 0
+
+        self._applying = True
+        try:
+            for change in changes:
+                if change.before is None:
+                    if change.after is not None:
+                        pending.append(change.after)
+                    continue
+
+                widget = widgets.get(change.before.id)
+                if widget is None:
+                    continue
+                if change.after is None:
+                    self.window.workspace_manager.delete_specific_widget(widget)
+                    removed += 1
+                else:
+                    self._update_widget(widget, change.before, change.after)
+                    updated += 1
+        finally:
+            self._applying = False
+
+        logger.info(
+            f"Layout changes applied: {removed} removed, {updated} updated, {len(pending)} added"
+        )
+        self._snapshot = apply_changes_to_layout(self._snapshot, changes)
+        self._schedule_instantiation(pending)
+
+    def _update_widget(
+        self, widget: "BaseWidget", before: WidgetRecord, after: WidgetRecord
+    ) -> None:
+        """就地更新组件的位置、尺寸、按键和配置"""
+        screen_width, screen_height = self.screen_info.get_host_resolution()
+        fields = changed_fields(before, after, screen_width, screen_height)
+
+        if "id" in fields:
+            widget.widget_id = after.id
+
+        if "size" in fields:
+            widget.width = round(after.width * screen_width)
+            widget.height = round(after.height * screen_height)
+            if not widget.mapping_mode:
+                widget.set_size_request(widget.width, widget.height)
+                widget.set_content_width(widget.width)
+                widget.set_content_height(widget.height)
+
+        if "position" in fields or "size" in fields:
+            widget.x = round(after.x * screen_width)
+            widget.y = round(after.y * screen_height)
+            if widget.mapping_mode:
+                self.window.fixed.move(widget, widget.mapping_start_x, widget.mapping_start_y)
+            else:
+                self.window.fixed.move(widget, widget.x, widget.y)
+
+        if "keys" in fields or "direction_keys" in fields:
+            # 只重新订阅这个组件的按键
+            self.window.unregister_widget_key_mapping(widget)
+            if after.type == "directionalpad":
+                widget.direction_keys.update(self._deserialize_direction_keys(after))
+            else:
+                widget.final_keys = set(self._deserialize_final_keys(after))
+            self.window.register_widget_keys(widget)
+
+        if "text" in fields:
+            widget.text = after.text
+
+        if "config" in fields and hasattr(widget, "get_config_manager"):
+            keys = changed_config_keys(before, after)
+            if keys:
+                widget.get_config_manager().deserialize(self._config_for_widget(after, keys))
+
+        widget.queue_draw()
+
+    def _schedule_instantiation(self, records: list[WidgetRecord]) -> None:
+        """在帧时钟回调中分批创建组件"""
+        # 取消尚未完成的加载
+        if self._layout_tick_id:
+            self.window.remove_tick_callback(self._layout_tick_id)
+            self._layout_tick_id = 0
+
+        pending = deque(records)
+        if not pending:
+            return
+
+        def on_tick(widget: Gtk.Widget, frame_clock: Gdk.FrameClock) -> bool:
+            # 每帧在时间预算内尽可能多地创建组件，超出预算的留到下一帧
+            deadline = time.monotonic() + LAYOUT_FRAME_BUDGET_SECONDS
+            while pending:
+                self._instantiate_record(pending.popleft())
+                if time.monotonic() >= deadline:
+                    break
+            if pending:
+                return GLib.SOURCE_CONTINUE
+            self._layout_tick_id = 0
+            return GLib.SOURCE_REMOVE
+
+        self._layout_tick_id = self.window.add_tick_callback(on_tick)
+
+    def _instantiate_record(self, record: WidgetRecord) -> "BaseWidget | None":
+        """根据布局记录创建单个 widget"""
+        screen_width, screen_height = self.screen_info.get_host_resolution()
+        try:
+            # 根据组件类型准备参数
+            create_kwargs: dict[str, Any] = {
+                "width": round(record.width * screen_width),
+                "height": round(record.height * screen_height),
+                "text": record.text,
+                "event_bus": self.window.event_bus,
+                "pointer_id_manager": self.window.pointer_id_manager,
+                "key_registry": self.window.key_registry,
+            }
+
+            # 添加按键映射参数
+            if record.type == "directionalpad":
+                if record.direction_keys:
+                    create_kwargs["direction_keys"] = self._deserialize_direction_keys(
+                        record
+                    )
+            else:
+                # 其他组件的通用按键
+                create_kwargs["default_keys"] = self._deserialize_final_keys(record)
+
+            # 创建widget
+            widget = self.window.widget_factory.create_widget(record.type, **create_kwargs)
+            if not widget:
+                return None
+            widget.widget_id = record.id
+
+            x = round(record.x * screen_width)
+            y = round(record.y * screen_height)
+            self.window.create_widget_at_position(widget, x, y)
+
+            # 恢复配置，归一化坐标按当前分辨率还原
+            if record.config and hasattr(widget, "get_config_manager"):
+                widget.get_config_manager().deserialize(self._config_for_widget(record))
+
+            return widget
+        except Exception as e:
+            logger.error(f"Failed to create widget: {e}")
+            return None
+
+    # ==================== 撤销/重做 ====================
+
+    def commit(self) -> None:
+        """把上次提交以来的编辑记录为一次可撤销的变化"""
+        if self._applying or self._layout_tick_id:
+            # 正在应用变化或仍在分批创建组件，此时的布局不完整
+            return
+        current = self.capture_layout()
+        screen_width, screen_height = self.screen_info.get_host_resolution()
+        changes = diff_layouts(self._snapshot, current, screen_width, screen_height)
+        self._snapshot = current
+        self.history.push(changes)
+
+    def undo(self) -> bool:
+        self.commit()
+        changes = self.history.undo()
+        if changes is None:
+            return False
+        self.apply_changes(changes)
+        return True
+
+    def redo(self) -> bool:
+        self.commit()
+        changes = self.history.redo()
+        if changes is None:
+            return False
+        self.apply_changes(changes)
+        return True
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+应用布局配置
+将 Android 包名映射到布局文件，索引保存在磁盘上，解析后的布局使用 LRU 缓存
+"""
+
+import json
+import os
+from collections import OrderedDict
+
+from waydroid_helper.controller.widgets.layout import (
+    LAYOUT_FILE_SUFFIX,
+    Layout,
+    LayoutError,
+    read_layout_file,
+    write_layout_file,
+)
+from waydroid_helper.util.log import logger
+
+PROFILE_INDEX_NAME = "profiles.json"
+PROFILE_INDEX_VERSION = 1
+PROFILE_CACHE_SIZE = 8
+
+
+class ProfileStore:
+    """包名 -> 布局 的存储"""
+
+    def __init__(self, layouts_dir: str, cache_size: int = PROFILE_CACHE_SIZE):
+        self.layouts_dir = layouts_dir
+        self.profiles_dir = os.path.join(layouts_dir, "profiles")
+        self.index_path = os.path.join(layouts_dir, PROFILE_INDEX_NAME)
+        self.cache_size = cache_size
+        # 布局路径 -> (mtime_ns, 布局)
+        self._cache: OrderedDict[str, tuple[int, Layout]] = OrderedDict()
+        self._index: dict[str, str] = self._read_index()
+
+    def _read_index(self) -> dict[str, str]:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {str(k): str(v) for k, v in data.get("profiles", {}).items()}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, AttributeError) as e:
+            logger.error(f"Failed to read profile index: {e}")
+            return {}
+
+    def _write_index(self) -> None:
+        os.makedirs(self.layouts_dir, exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": PROFILE_INDEX_VERSION, "profiles": self._index},
+                f,
+                indent=2,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_path, self.index_path)
+
+    def _resolve(self, path: str) -> str:
+        return path if os.path.isabs(path) else os.path.join(self.layouts_dir, path)
+
+    def packages(self) -> list[str]:
+        return sorted(self._index)
+
+    def has_profile(self, package: str) -> bool:
+        return package in self._index
+
+    def get_layout(self, package: str) -> Layout | None:
+        """获取包名对应的布局，文件未变化时直接返回缓存"""
+        path = self._index.get(package)
+        if path is None:
+            return None
+        path = self._resolve(path)
+
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError as e:
+            logger.warning(f"Layout for {package} is unavailable: {e}")
+            self._cache.pop(path, None)
+            return None
+
+        cached = self._cache.get(path)
+        if cached is not None and cached[0] == mtime_ns:
+            self._cache.move_to_end(path)
+            return cached[1]
+
+        try:
+            layout = read_layout_file(path)
+        except (OSError, UnicodeDecodeError, LayoutError) as e:
+            logger.error(f"Failed to load layout for {package}: {e}")
+            return None
+
+        self._cache[path] = (mtime_ns, layout)
+        self._cache.move_to_end(path)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return layout
+
+    def save_profile(self, package: str, layout: Layout) -> str:
+        """保存布局并绑定到包名，返回布局文件路径"""
+        os.makedirs(self.profiles_dir, exist_ok=True)
+        path = os.path.join(self.profiles_dir, f"{package}{LAYOUT_FILE_SUFFIX}")
+        write_layout_file(path, layout)
+        self._cache.pop(path, None)
+        self._index[package] = os.path.relpath(path, self.layouts_dir)
+        self._write_index()
+        return path
+
+    def bind(self, package: str, path: str) -> None:
+        """把已有布局文件绑定到包名"""
+        self._index[package] = path
+        self._write_index()
+
+    def remove_profile(self, package: str) -> None:
+        path = self._index.pop(package, None)
+        if path is not None:
+            self._cache.pop(self._resolve(path), None)
+            self._write_index()
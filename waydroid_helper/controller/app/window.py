@@ -25,6 +25,9 @@ from gi.repository import Adw, Gdk, GLib, GObject, Gtk
 from gi.events import GLibEventLoopPolicy
 
 from waydroid_helper.compat_widget import PropertyAnimationTarget
+from waydroid_helper.config import RootConfig
+from waydroid_helper.controller.app.keymapper_process import startup_timeline
+from waydroid_helper.controller.app.layout_manager import LayoutManager
 from waydroid_helper.controller.app.workspace_manager import WorkspaceManager
 from waydroid_helper.controller.core import (Event, EventType, KeyCombination,
                                              Server, EventBus,
@@ -35,10 +38,13 @@ from waydroid_helper.controller.core.handler import (DefaultEventHandler,
                                                      InputEventHandlerChain,
                                                      KeyMappingEventHandler,
                                                      KeyMappingManager)
+from waydroid_helper.controller.core.handler.default.default_key_handler import \
+    KeyInjectMode
 from waydroid_helper.controller.ui.menus import ContextMenuManager
 from waydroid_helper.controller.ui.styles import StyleManager
 from waydroid_helper.controller.widgets.factory import WidgetFactory
 from waydroid_helper.util import AdbHelper, logger
+from waydroid_helper.util.task_graph import StepFailed, TaskGraph
 
 if TYPE_CHECKING:
     from waydroid_helper.controller.widgets.base import BaseWidget
@@ -197,6 +203,7 @@ class TransparentWindow(Adw.Window):
         # Initialize components
         self.widget_factory = WidgetFactory()
         self.style_manager = StyleManager(self.get_display())
+        self.layout_manager = LayoutManager(self)
         self.menu_manager = ContextMenuManager(self)
         self.workspace_manager = WorkspaceManager(self, self.fixed, self.event_bus)
 
@@ -225,9 +232,14 @@ class TransparentWindow(Adw.Window):
         # Import and add default handler
         self.server = Server("0.0.0.0", 10721, self.event_bus)  # 使用单例模式
         self.adb_helper = AdbHelper()
+        self.foreground_watcher: "asyncio.Task[None] | None" = None
+        self.display_watcher: "asyncio.Task[None] | None" = None
         self.scrcpy_setup_task = asyncio.create_task(self.setup_scrcpy())
         self.key_mapping_handler = KeyMappingEventHandler(self.key_mapping_manager)
         self.default_handler = DefaultEventHandler(self.event_bus)
+        if RootConfig().key_mapping.get_property("uhid_input"):
+            # Virtual HID devices are created once the scrcpy connection is up
+            self.default_handler.keyboard_handler.set_inject_mode(KeyInjectMode.UHID)
 
         self.event_handler_chain.add_handler(self.key_mapping_handler)
         self.event_handler_chain.add_handler(self.default_handler)
@@ -240,6 +252,7 @@ class TransparentWindow(Adw.Window):
 
         # Set fullscreen
         self.setup_window()
+        startup_timeline.mark("window_realize")
 
         # Set UI (mainly event controllers)
         self.setup_controllers()
@@ -348,6 +361,7 @@ class TransparentWindow(Adw.Window):
                     config_manager = widget.get_config_manager()
                     config_manager.clear_ui_references()
                     p.unparent()
+                    self.layout_manager.commit()
 
                 popover.connect(
                     "closed",
@@ -373,6 +387,7 @@ class TransparentWindow(Adw.Window):
                 config_manager = widget.get_config_manager()
                 config_manager.clear_ui_references()
                 p.unparent()
+                self.layout_manager.commit()
                 self.queue_draw()
 
             popover.connect("closed", on_popover_closed)
@@ -454,53 +469,90 @@ class TransparentWindow(Adw.Window):
     async def cleanup_scrcpy(self):
         if not self.scrcpy_setup_task.done():
             self.scrcpy_setup_task.cancel()
+        if self.foreground_watcher is not None:
+            self.foreground_watcher.cancel()
+            self.foreground_watcher = None
+        if self.display_watcher is not None:
+            self.display_watcher.cancel()
+            self.display_watcher = None
         await self.adb_helper.remove_reverse_tunnel()
+        await self.adb_helper.close()
 
     async def setup_scrcpy(self):
-        """Pushes scrcpy-server and starts it on the device, with retry logic."""
+        """Pushes scrcpy-server and starts it on the device.
+
+        The steps run as a dependency graph: the resolution query, push and
+        reverse tunnel run concurrently once adb is connected, and a failing
+        step is retried on its own with jittered backoff.
+        """
         await self.server.wait_started()
 
         if not self.server.server:
             return
+        startup_timeline.mark("server_listen")
 
+        scid, socket_name = self.adb_helper.generate_scid()
 
-        for attempt in range(MAX_RETRY_ATTEMPTS):
-            try:
-                # 1. Connect to ADB device first
-                if not await self.adb_helper.connect():
-                    await asyncio.sleep(RETRY_DELAY_SECONDS)
-                    continue
-
-                # 2. Get screen resolution. Not critical, so no retry on failure.
-                screen_resolution = await self.adb_helper.get_screen_resolution()
-                if screen_resolution:
-                    ScreenInfo().set_resolution(screen_resolution[0], screen_resolution[1])
-
-                # 3. Push server to device
-                if not await self.adb_helper.push_scrcpy_server():
-                    await asyncio.sleep(RETRY_DELAY_SECONDS)
-                    continue
+        async def query_resolution() -> bool:
+            # Not critical: the graph carries on without it
+            screen_resolution = await self.adb_helper.get_screen_resolution()
+            if not screen_resolution:
+                return False
+            ScreenInfo().set_resolution(screen_resolution[0], screen_resolution[1])
+            return True
 
-                # 4. Generate SCID and setup reverse tunnel
-                scid, socket_name = self.adb_helper.generate_scid()
-                if not await self.adb_helper.reverse_tunnel(
-                    socket_name, self.server.port
-                ):
-                    await asyncio.sleep(RETRY_DELAY_SECONDS)
-                    continue
+        def on_display_changed(width: int, height: int, rotation: int) -> None:
+            if ScreenInfo().set_display(width, height, rotation):
+                logger.info(f"Device display: {width}x{height}, rotation {rotation * 90}°")
+                self.event_bus.emit(
+                    Event(EventType.DISPLAY_CHANGED, self, (width, height, rotation))
+                )
 
-                # 5. Start scrcpy-server on device
-                if not await self.adb_helper.start_scrcpy_server(scid):
-                    await asyncio.sleep(RETRY_DELAY_SECONDS)
-                    continue
+        async def watch_display() -> bool:
+            # Keep ScreenInfo current across rotations and resolution changes
+            if self.display_watcher is None:
+                self.display_watcher = await self.adb_helper.watch_display(
+                    on_display_changed
+                )
+            return self.display_watcher is not None
 
-                return  # Exit on success
+        async def start_server() -> bool:
+            if not await self.adb_helper.start_scrcpy_server(scid):
+                return False
+            startup_timeline.mark("scrcpy_ready")
+            return True
 
-            except asyncio.CancelledError:
-                return  # Use return to exit immediately on cancellation
-            except Exception as e:
-                await asyncio.sleep(RETRY_DELAY_SECONDS)
+        async def watch_foreground_app() -> bool:
+            # Watch the foreground app to switch layout profiles
+            if self.foreground_watcher is None:
+                self.foreground_watcher = await self.adb_helper.watch_foreground_app(
+                    lambda package: self.event_bus.emit(
+                        Event(EventType.FOREGROUND_APP_CHANGED, self, package)
+                    )
+                )
+            return self.foreground_watcher is not None
+
+        retries = MAX_RETRY_ATTEMPTS - 1
+        graph = TaskGraph("scrcpy", max_delay=RETRY_DELAY_SECONDS)
+        graph.add("connect", self.adb_helper.connect, retries=retries)
+        graph.add("resolution", query_resolution, deps=("connect",), required=False)
+        graph.add("display", watch_display, deps=("connect",), required=False)
+        graph.add("push", self.adb_helper.push_scrcpy_server, deps=("connect",), retries=retries)
+        graph.add(
+            "reverse",
+            lambda: self.adb_helper.reverse_tunnel(socket_name, self.server.port),
+            deps=("connect",),
+            retries=retries,
+        )
+        graph.add("start", start_server, deps=("push", "reverse"), retries=retries)
+        graph.add("watch", watch_foreground_app, deps=("start",), required=False)
 
+        try:
+            await graph.run()
+        except asyncio.CancelledError:
+            return  # Use return to exit immediately on cancellation
+        except StepFailed as e:
+            logger.error(f"Failed to set up scrcpy: {e}")
 
     def setup_mode_system(self):
         """Initializes the dual mode system"""
@@ -977,7 +1029,10 @@ class TransparentWindow(Adw.Window):
         """Creates a component at the specified position"""
         # Place component directly at the specified position
         self.fixed_put(widget, x, y)
+        self.register_widget_keys(widget)
 
+    def register_widget_keys(self, widget: "BaseWidget"):
+        """Registers all key mappings currently held by a component"""
         # Check if it's a multi-key mapping component (e.g., DirectionalPad)
         if hasattr(widget, "get_all_key_mappings"):
             # Register all keys for multi-key mapping components
@@ -1123,6 +1178,17 @@ class TransparentWindow(Adw.Window):
                 # Delete key deletes selected widget
                 self.workspace_manager.delete_selected_widgets()
                 return True
+            if state & Gdk.ModifierType.CONTROL_MASK:
+                # Ctrl+Z undoes, Ctrl+Shift+Z / Ctrl+Y redoes layout edits
+                if keyval in (Gdk.KEY_z, Gdk.KEY_Z):
+                    if state & Gdk.ModifierType.SHIFT_MASK:
+                        self.layout_manager.redo()
+                    else:
+                        self.layout_manager.undo()
+                    return True
+                if keyval in (Gdk.KEY_y, Gdk.KEY_Y):
+                    self.layout_manager.redo()
+                    return True
 
         return False
 
@@ -96,6 +96,7 @@ class WorkspaceManager:
     def handle_mouse_release(self, controller, n_press, x, y):
         """处理鼠标释放事件"""
         # 停止拖拽和调整大小
+        edited = bool(self.dragging_widget or self.resizing_widget)
         if self.dragging_widget:
             self.dragging_widget = None
         
@@ -105,6 +106,10 @@ class WorkspaceManager:
             self.resizing_widget = None
             self.resize_direction = None
         
+        # 拖拽或调整大小结束，记录为一次可撤销的编辑
+        if edited:
+            self.window.layout_manager.commit()
+        
         # 清除待处理状态
         self.selected_widget = None
         self.pending_resize_direction = None
@@ -256,6 +261,7 @@ class WorkspaceManager:
             if self.selected_widget == widget:
                 self.selected_widget = None
             widget.on_delete()
+            self.window.layout_manager.commit()
 
     def cleanup(self):
         """清理WorkspaceManager的资源，包括事件订阅"""
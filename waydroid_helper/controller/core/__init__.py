@@ -4,6 +4,7 @@
 
 from .constants import *
 from .control_msg import *
+from .device_msg import *
 from .event_bus import Event, EventType, EventBus
 from .handler.event_handlers import InputEventHandler, InputEventHandlerChain
 from .key_system import Key, KeyCombination, KeyType, KeyRegistry
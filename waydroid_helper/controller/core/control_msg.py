@@ -13,31 +13,123 @@ from waydroid_helper.controller.android import (AKeyCode, AKeyEventAction,
                                                 AMotionEventButtons)
 
 
+# 定点数小数位数；缩放系数向上取整，坐标小于 2^32 / 窗口宽高时结果与整数乘除完全一致
+FIXED_SHIFT = 32
+
+
+@dataclass(frozen=True, slots=True)
+class ScreenTransform:
+    """宿主窗口坐标 -> 设备坐标的缩放，系数为 Q32 定点数
+
+    device_x = (scale_x * x) >> 32
+    device_y = (scale_y * y) >> 32
+
+    只在宿主窗口或设备显示变化时重建，各处共享同一个不可变对象。
+    """
+
+    host_width: int = 0
+    host_height: int = 0
+    device_width: int = 0
+    device_height: int = 0
+    scale_x: int = 0
+    scale_y: int = 0
+
+    @property
+    def valid(self) -> bool:
+        return self.scale_x > 0 and self.scale_y > 0
+
+    @property
+    def host_size(self) -> tuple[int, int]:
+        return self.host_width, self.host_height
+
+    @property
+    def device_size(self) -> tuple[int, int]:
+        return self.device_width, self.device_height
+
+    @classmethod
+    def build(
+        cls, host_width: int, host_height: int, device_width: int, device_height: int
+    ) -> "ScreenTransform":
+        if host_width <= 0 or host_height <= 0 or device_width <= 0 or device_height <= 0:
+            return cls(host_width, host_height, device_width, device_height)
+        return cls(
+            host_width,
+            host_height,
+            device_width,
+            device_height,
+            -((-device_width << FIXED_SHIFT) // host_width),
+            -((-device_height << FIXED_SHIFT) // host_height),
+        )
+
+    def to_device(self, x: int, y: int) -> tuple[int, int]:
+        # 窗口之外的点夹到屏幕边缘
+        return (
+            min(max((self.scale_x * x) >> FIXED_SHIFT, 0), self.device_width - 1),
+            min(max((self.scale_y * y) >> FIXED_SHIFT, 0), self.device_height - 1),
+        )
+
+
 class ScreenInfo:
+    """设备与宿主窗口的尺寸
+
+    设备显示信息保存为一个 (宽, 高, 旋转) 元组，整体替换以保证读到的是同一次更新；
+    每次变化重建 transform，消息打包和组件共享这个不可变的变换。
+    """
+
     _instance = None
     host_width: int = 0
     host_height: int = 0
-    width: int = 0
-    height: int = 0
+    # (width, height, rotation)，rotation 为 0-3，表示顺时针旋转的 90° 次数
+    display: tuple[int, int, int] = (0, 0, 0)
+    transform: ScreenTransform = ScreenTransform()
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
 
+    @property
+    def width(self) -> int:
+        return self.display[0]
+
+    @property
+    def height(self) -> int:
+        return self.display[1]
+
+    @property
+    def rotation(self) -> int:
+        return self.display[2]
+
+    def _rebuild(self):
+        self.transform = ScreenTransform.build(
+            self.host_width, self.host_height, self.display[0], self.display[1]
+        )
+
+    def set_display(self, width: int, height: int, rotation: int = 0) -> bool:
+        """更新设备显示信息，返回是否有变化"""
+        display = (width, height, rotation % 4)
+        if display == self.display:
+            return False
+        self.display = display
+        self._rebuild()
+        return True
+
     def set_resolution(self, width: int, height: int):
-        self.width = width
-        self.height = height
+        self.set_display(width, height, self.rotation)
 
     def get_resolution(self) -> tuple[int, int]:
-        return self.width, self.height
+        width, height, _ = self.display
+        return width, height
     
     def set_host_resolution(self, width: int, height: int):
+        if (width, height) == (self.host_width, self.host_height):
+            return
         self.host_width = width
         self.host_height = height
+        self._rebuild()
     
     def get_host_resolution(self) -> tuple[int, int]:
-        return self.host_width, self.host_height
+        return self.transform.host_size
 
 
 # 全局单例实例，避免重复创建
@@ -46,10 +138,15 @@ _resolution_warning_shown = False
 
 
 def scale_coordinates(client_x: int, client_y: int, client_w: int, client_h: int) -> tuple[int, int, int, int]:
-    """优化的坐标缩放函数，减少重复代码和计算"""
+    """把宿主窗口坐标转换为设备坐标，返回 (x, y, 设备宽, 设备高)"""
     global _resolution_warning_shown
-    device_w, device_h = _screen_info.get_resolution()
+    transform = _screen_info.transform
+    if transform.valid and client_w == transform.host_width and client_h == transform.host_height:
+        x, y = transform.to_device(client_x, client_y)
+        return x, y, transform.device_width, transform.device_height
 
+    # 调用方的窗口尺寸与 transform 不一致（或设备尺寸未知）时按比例缩放
+    device_w, device_h = transform.device_size
     if device_w == 0 or device_h == 0:
         # 只在第一次警告，避免日志洪水
         if not _resolution_warning_shown:
@@ -79,7 +176,10 @@ class ControlMsgType(IntEnum):
     ROTATE_DEVICE = 11
     UHID_CREATE = 12
     UHID_INPUT = 13
-    OPEN_HARD_KEYBOARD_SETTINGS = 14
+    UHID_DESTROY = 14
+    OPEN_HARD_KEYBOARD_SETTINGS = 15
+    START_APP = 16
+    RESET_VIDEO = 17
 
 def to_fixed_point_u16(f_val: float) -> int:
     """优化版本：将浮点数转换为 Q16 格式的定点数，移除分支预测"""
@@ -208,4 +308,115 @@ class InjectScrollEventMsg(ControlMsg):
             hscroll_fixed,
             vscroll_fixed,
             self.buttons,
-        )
\ No newline at end of file
+        )
+
+
+class CopyKey(IntEnum):
+    NONE = 0
+    COPY = 1
+    CUT = 2
+
+
+# 与 scrcpy 的 CONTROL_MSG_CLIPBOARD_TEXT_MAX_LENGTH 一致
+CLIPBOARD_TEXT_MAX_LENGTH = (1 << 18) - 14
+
+
+@dataclass
+class GetClipboardMsg(ControlMsg):
+    """请求设备剪贴板，可先在设备上按下复制/剪切键"""
+
+    copy_key: CopyKey = CopyKey.NONE
+
+    @property
+    def msg_type(self) -> ControlMsgType:
+        return ControlMsgType.GET_CLIPBOARD
+
+    def pack(self) -> bytes:
+        return struct.pack(">BB", self.msg_type, self.copy_key)
+
+
+@dataclass
+class SetClipboardMsg(ControlMsg):
+    """设置设备剪贴板，sequence 非 0 时设备会回复 ACK_CLIPBOARD"""
+
+    text: str
+    sequence: int = 0
+    paste: bool = False
+
+    @property
+    def msg_type(self) -> ControlMsgType:
+        return ControlMsgType.SET_CLIPBOARD
+
+    def pack(self) -> bytes:
+        text_bytes = self.text.encode("utf-8")
+        if len(text_bytes) > CLIPBOARD_TEXT_MAX_LENGTH:
+            # 截断到合法的 UTF-8 边界
+            text_bytes = text_bytes[:CLIPBOARD_TEXT_MAX_LENGTH].decode(
+                "utf-8", errors="ignore"
+            ).encode("utf-8")
+        return (
+            struct.pack(
+                ">BQBI", self.msg_type, self.sequence, self.paste, len(text_bytes)
+            )
+            + text_bytes
+        )
+
+
+@dataclass
+class UhidCreateMsg(ControlMsg):
+    """在设备上创建 UHID 设备"""
+
+    id: int
+    report_desc: bytes
+    name: str = ""
+    vendor_id: int = 0
+    product_id: int = 0
+
+    @property
+    def msg_type(self) -> ControlMsgType:
+        return ControlMsgType.UHID_CREATE
+
+    def pack(self) -> bytes:
+        name_bytes = self.name.encode("utf-8")[:127]
+        return (
+            struct.pack(
+                ">BHHHB",
+                self.msg_type,
+                self.id,
+                self.vendor_id,
+                self.product_id,
+                len(name_bytes),
+            )
+            + name_bytes
+            + struct.pack(">H", len(self.report_desc))
+            + self.report_desc
+        )
+
+
+@dataclass
+class UhidInputMsg(ControlMsg):
+    """向 UHID 设备发送一个 HID 输入报告"""
+
+    id: int
+    data: bytes
+
+    @property
+    def msg_type(self) -> ControlMsgType:
+        return ControlMsgType.UHID_INPUT
+
+    def pack(self) -> bytes:
+        return struct.pack(">BHH", self.msg_type, self.id, len(self.data)) + self.data
+
+
+@dataclass
+class UhidDestroyMsg(ControlMsg):
+    """销毁 UHID 设备"""
+
+    id: int
+
+    @property
+    def msg_type(self) -> ControlMsgType:
+        return ControlMsgType.UHID_DESTROY
+
+    def pack(self) -> bytes:
+        return struct.pack(">BH", self.msg_type, self.id)
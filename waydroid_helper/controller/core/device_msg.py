@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+设备消息模块
+解析 scrcpy-server 通过控制连接回传的设备消息
+"""
+import asyncio
+import struct
+from dataclasses import dataclass
+from enum import IntEnum
+
+# 与 scrcpy 的 DEVICE_MSG_MAX_SIZE 一致
+DEVICE_MSG_MAX_SIZE = 1 << 18
+
+
+class DeviceMsgType(IntEnum):
+    CLIPBOARD = 0
+    ACK_CLIPBOARD = 1
+    UHID_OUTPUT = 2
+
+
+class DeviceMsgError(Exception):
+    """设备消息格式错误，连接无法继续解析"""
+
+
+@dataclass
+class DeviceMsg:
+    pass
+
+
+@dataclass
+class ClipboardMsg(DeviceMsg):
+    """设备剪贴板内容（剪贴板变化或响应 GET_CLIPBOARD）"""
+
+    text: str
+
+
+@dataclass
+class AckClipboardMsg(DeviceMsg):
+    """确认某个序号的 SET_CLIPBOARD 已在设备上生效"""
+
+    sequence: int
+
+
+@dataclass
+class UhidOutputMsg(DeviceMsg):
+    """UHID 设备的输出报告，例如键盘 LED 状态"""
+
+    id: int
+    data: bytes
+
+
+async def read_device_msg(reader: asyncio.StreamReader) -> DeviceMsg:
+    """从控制连接读取一条完整的设备消息"""
+    msg_type = (await reader.readexactly(1))[0]
+
+    if msg_type == DeviceMsgType.CLIPBOARD:
+        (length,) = struct.unpack(">I", await reader.readexactly(4))
+        if length > DEVICE_MSG_MAX_SIZE:
+            raise DeviceMsgError(f"clipboard message too large: {length}")
+        text = await reader.readexactly(length)
+        return ClipboardMsg(text.decode("utf-8", errors="replace"))
+
+    if msg_type == DeviceMsgType.ACK_CLIPBOARD:
+        (sequence,) = struct.unpack(">Q", await reader.readexactly(8))
+        return AckClipboardMsg(sequence)
+
+    if msg_type == DeviceMsgType.UHID_OUTPUT:
+        uhid_id, size = struct.unpack(">HH", await reader.readexactly(4))
+        return UhidOutputMsg(uhid_id, await reader.readexactly(size))
+
+    # 未知类型无法确定长度，只能放弃这个连接
+    raise DeviceMsgError(f"unknown device message type: {msg_type}")
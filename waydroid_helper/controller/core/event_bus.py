@@ -52,6 +52,15 @@ class EventType(str, Enum):
     EXIT_STARING = "exit-staring"  # 退出瞄准模式
     SWIPEHOLD_RADIUS = "swipehold-radius"  # 滑动半径设置
 
+    # 设备事件
+    FOREGROUND_APP_CHANGED = "foreground-app-changed"  # 前台应用变化，数据为包名
+    DISPLAY_CHANGED = "display-changed"  # 设备显示尺寸或旋转变化，数据为 (宽, 高, 旋转)
+    DEVICE_CLIPBOARD = "device-clipboard"  # 设备剪贴板内容，数据为文本
+    DEVICE_CLIPBOARD_ACK = "device-clipboard-ack"  # SET_CLIPBOARD 已生效，数据为序号
+    DEVICE_UHID_OUTPUT = "device-uhid-output"  # UHID 输出报告，数据为 UhidOutputMsg
+    CONTROL_LATENCY = "control-latency"  # 控制通道往返延迟，数据为秒
+    CONTROL_STALLED = "control-stalled"  # 设备停止读取控制消息，数据为是否阻塞
+
 
 @dataclass
 class HandlerInfo:
@@ -99,6 +108,15 @@ class GlobalEventEmitter(GObject.Object):
         EventType.ENTER_STARING: (GObject.SignalFlags.RUN_FIRST, None, (object, object)),
         EventType.EXIT_STARING: (GObject.SignalFlags.RUN_FIRST, None, (object, object)),
         EventType.SWIPEHOLD_RADIUS: (GObject.SignalFlags.RUN_FIRST, None, (object, object)),
+
+        # 设备事件
+        EventType.FOREGROUND_APP_CHANGED: (GObject.SignalFlags.RUN_FIRST, None, (object, object)),
+        EventType.DISPLAY_CHANGED: (GObject.SignalFlags.RUN_FIRST, None, (object, object)),
+        EventType.DEVICE_CLIPBOARD: (GObject.SignalFlags.RUN_FIRST, None, (object, object)),
+        EventType.DEVICE_CLIPBOARD_ACK: (GObject.SignalFlags.RUN_FIRST, None, (object, object)),
+        EventType.DEVICE_UHID_OUTPUT: (GObject.SignalFlags.RUN_FIRST, None, (object, object)),
+        EventType.CONTROL_LATENCY: (GObject.SignalFlags.RUN_FIRST, None, (object, object)),
+        EventType.CONTROL_STALLED: (GObject.SignalFlags.RUN_FIRST, None, (object, object)),
     }
 
     def __new__(cls):
@@ -12,9 +12,14 @@ import gi
 from waydroid_helper.controller.android import (AKeyCode, AKeyEventAction,
                                                 AMetaState)
 from waydroid_helper.controller.core.control_msg import (InjectKeycodeMsg,
-                                                         InjectTextMsg)
+                                                         InjectTextMsg,
+                                                         UhidCreateMsg,
+                                                         UhidDestroyMsg,
+                                                         UhidInputMsg)
 from waydroid_helper.controller.core.event_bus import (Event, EventType,
                                                        EventBus)
+from waydroid_helper.controller.core.hid import (HID_PRODUCT_ID,
+                                                 HID_VENDOR_ID, HidKeyboard)
 
 gi.require_version("Gdk", "4.0")
 from gi.repository import Gdk, Gtk
@@ -27,6 +32,8 @@ class KeyInjectMode(Enum):
     TEXT = 1
     # 所有的都作为 key event
     RAW = 2
+    # 通过 UHID 虚拟键盘发送 HID 报告, 由 Android 按键盘布局处理
+    UHID = 3
 
 
 class KeyboardBase(ABC):
@@ -154,6 +161,31 @@ class KeyboardDefault(KeyboardBase):
         self.key_repeat: int = 0
         # TODO 从配置中读取
         self.inject_mode: KeyInjectMode = KeyInjectMode.MIXED
+        self.hid_keyboard: HidKeyboard | None = None
+
+    def set_inject_mode(self, mode: KeyInjectMode) -> None:
+        """切换注入模式，进入或离开 UHID 模式时创建或销毁设备上的虚拟键盘"""
+        if mode == KeyInjectMode.UHID and self.hid_keyboard is None:
+            self.hid_keyboard = HidKeyboard()
+            msg = UhidCreateMsg(
+                HidKeyboard.id,
+                HidKeyboard.report_desc,
+                HidKeyboard.name,
+                HID_VENDOR_ID,
+                HID_PRODUCT_ID,
+            )
+            self.event_bus.emit(Event(EventType.CONTROL_MSG, self, msg))
+        elif mode != KeyInjectMode.UHID and self.hid_keyboard is not None:
+            self._send_hid_report(self.hid_keyboard.release_all())
+            self.hid_keyboard = None
+            self.event_bus.emit(
+                Event(EventType.CONTROL_MSG, self, UhidDestroyMsg(HidKeyboard.id))
+            )
+        self.inject_mode = mode
+
+    def _send_hid_report(self, report: bytes) -> None:
+        msg = UhidInputMsg(HidKeyboard.id, report)
+        self.event_bus.emit(Event(EventType.CONTROL_MSG, self, msg))
 
     def convert_action(self, event: Gdk.Event) -> AKeyEventAction:
         if event.get_event_type() == Gdk.EventType.KEY_PRESS:
@@ -249,6 +281,8 @@ class KeyboardDefault(KeyboardBase):
         self, controller: Gtk.EventControllerKey, keyval: int, keycode: int, state: int
     ) -> bool:
         # print(low_level_keyval, chr(low_level_keyval),"+shift=", keyval, chr(keyval))
+        if self.hid_keyboard is not None:
+            return self.__hid_processor(controller, self.hid_keyboard, keycode)
         result = self.__key_processor(controller, keyval, keycode, state)
         if not result:
             result = self.__text_processor(controller, keyval, keycode, state)
@@ -266,6 +300,21 @@ class KeyboardDefault(KeyboardBase):
             self.key_repeat = 0
         return self.key_repeat
 
+    def __hid_processor(
+        self, controller: Gtk.EventControllerKey, hid_keyboard: HidKeyboard, keycode: int
+    ) -> bool:
+        # 直接使用硬件键码, 不经过 keyval 和 AKeyCode 转换
+        if hid_keyboard.usage_for_keycode(keycode) is None:
+            return False
+        event = controller.get_current_event()
+        if event is None:
+            return False
+        pressed = event.get_event_type() == Gdk.EventType.KEY_PRESS
+        report = hid_keyboard.process(keycode, pressed)
+        if report is not None:
+            self._send_hid_report(report)
+        return True
+
     def __key_processor(
         self, controller: Gtk.EventControllerKey, keyval: int, keycode: int, state: int
     ) -> bool:
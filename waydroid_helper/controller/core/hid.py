@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+HID 设备模块
+通过 scrcpy 的 UHID 消息在设备上创建虚拟键盘，直接发送 HID 报告，
+不经过按键码转换表和 Android 端的 injectInputEvent。
+
+HID 鼠标只能上报相对位移，而 GTK 无法锁定指针，Android 光标会与主机指针脱节，
+所以鼠标仍然使用绝对坐标的注入事件。
+
+报告描述符与 scrcpy 的 hid_keyboard 保持一致。
+"""
+
+# scrcpy 约定的 UHID 设备 id
+HID_ID_KEYBOARD = 1
+
+# 0x18d1 为 Google 的厂商 id，让 Android 使用通用按键布局
+HID_VENDOR_ID = 0x18D1
+HID_PRODUCT_ID = 0x0000
+
+# 标准启动键盘：修饰键位图、保留字节、最多 6 个同时按下的按键，带 LED 输出报告
+KEYBOARD_REPORT_DESC = bytes(
+    [
+        0x05, 0x01,  # Usage Page (Generic Desktop)
+        0x09, 0x06,  # Usage (Keyboard)
+        0xA1, 0x01,  # Collection (Application)
+        0x05, 0x07,  #   Usage Page (Key Codes)
+        0x19, 0xE0,  #   Usage Minimum (224)
+        0x29, 0xE7,  #   Usage Maximum (231)
+        0x15, 0x00,  #   Logical Minimum (0)
+        0x25, 0x01,  #   Logical Maximum (1)
+        0x75, 0x01,  #   Report Size (1)
+        0x95, 0x08,  #   Report Count (8)
+        0x81, 0x02,  #   Input (Data, Variable, Absolute): 修饰键
+        0x75, 0x08,  #   Report Size (8)
+        0x95, 0x01,  #   Report Count (1)
+        0x81, 0x01,  #   Input (Constant): 保留字节
+        0x05, 0x08,  #   Usage Page (LEDs)
+        0x19, 0x01,  #   Usage Minimum (Num Lock)
+        0x29, 0x05,  #   Usage Maximum (Kana)
+        0x75, 0x01,  #   Report Size (1)
+        0x95, 0x05,  #   Report Count (5)
+        0x91, 0x02,  #   Output (Data, Variable, Absolute): LED
+        0x75, 0x03,  #   Report Size (3)
+        0x95, 0x01,  #   Report Count (1)
+        0x91, 0x01,  #   Output (Constant): 填充
+        0x05, 0x07,  #   Usage Page (Key Codes)
+        0x19, 0x00,  #   Usage Minimum (0)
+        0x29, 0x65,  #   Usage Maximum (101)
+        0x15, 0x00,  #   Logical Minimum (0)
+        0x25, 0x65,  #   Logical Maximum (101)
+        0x75, 0x08,  #   Report Size (8)
+        0x95, 0x06,  #   Report Count (6)
+        0x81, 0x00,  #   Input (Data, Array): 按下的按键
+        0xC0,  # End Collection
+    ]
+)
+
+# Linux evdev 键码 -> HID 键盘用法码（HID Usage Tables, Keyboard/Keypad Page）
+EVDEV_TO_HID: dict[int, int] = {
+    1: 0x29,  # ESC
+    **{code: 0x1E + i for i, code in enumerate(range(2, 11))},  # 1-9
+    11: 0x27,  # 0
+    12: 0x2D, 13: 0x2E, 14: 0x2A, 15: 0x2B,  # - = Backspace Tab
+    16: 0x14, 17: 0x1A, 18: 0x08, 19: 0x15, 20: 0x17,  # Q W E R T
+    21: 0x1C, 22: 0x18, 23: 0x0C, 24: 0x12, 25: 0x13,  # Y U I O P
+    26: 0x2F, 27: 0x30, 28: 0x28, 29: 0xE0,  # [ ] Enter LeftCtrl
+    30: 0x04, 31: 0x16, 32: 0x07, 33: 0x09, 34: 0x0A,  # A S D F G
+    35: 0x0B, 36: 0x0D, 37: 0x0E, 38: 0x0F,  # H J K L
+    39: 0x33, 40: 0x34, 41: 0x35, 42: 0xE1, 43: 0x31,  # ; ' ` LeftShift backslash
+    44: 0x1D, 45: 0x1B, 46: 0x06, 47: 0x19, 48: 0x05,  # Z X C V B
+    49: 0x11, 50: 0x10,  # N M
+    51: 0x36, 52: 0x37, 53: 0x38, 54: 0xE5,  # , . / RightShift
+    55: 0x55, 56: 0xE2, 57: 0x2C, 58: 0x39,  # KP* LeftAlt Space CapsLock
+    **{code: 0x3A + i for i, code in enumerate(range(59, 69))},  # F1-F10
+    69: 0x53, 70: 0x47,  # NumLock ScrollLock
+    71: 0x5F, 72: 0x60, 73: 0x61, 74: 0x56,  # KP7 KP8 KP9 KP-
+    75: 0x5C, 76: 0x5D, 77: 0x5E, 78: 0x57,  # KP4 KP5 KP6 KP+
+    79: 0x59, 80: 0x5A, 81: 0x5B, 82: 0x62, 83: 0x63,  # KP1 KP2 KP3 KP0 KP.
+    86: 0x64, 87: 0x44, 88: 0x45,  # 102nd F11 F12
+    96: 0x58, 97: 0xE4, 98: 0x54, 99: 0x46, 100: 0xE6,  # KPEnter RightCtrl KP/ SysRq RightAlt
+    102: 0x4A, 103: 0x52, 104: 0x4B, 105: 0x50, 106: 0x4F,  # Home Up PageUp Left Right
+    107: 0x4D, 108: 0x51, 109: 0x4E, 110: 0x49, 111: 0x4C,  # End Down PageDown Insert Delete
+    119: 0x48, 125: 0xE3, 126: 0xE7, 127: 0x65,  # Pause LeftMeta RightMeta Compose
+}
+
+# GDK 在 Linux 上的硬件键码等于 evdev 键码加 8
+XKB_KEYCODE_OFFSET = 8
+
+HID_MODIFIER_FIRST = 0xE0
+HID_MODIFIER_LAST = 0xE7
+HID_KEYBOARD_MAX_KEYS = 6
+HID_ERROR_ROLL_OVER = 0x01
+
+
+class HidKeyboard:
+    """启动键盘报告，按 GDK 硬件键码维护按下状态"""
+
+    id = HID_ID_KEYBOARD
+    name = "Waydroid Helper Keyboard"
+    report_desc = KEYBOARD_REPORT_DESC
+
+    def __init__(self):
+        self.modifiers: int = 0
+        self.keys: list[int] = []
+
+    @staticmethod
+    def usage_for_keycode(keycode: int) -> int | None:
+        return EVDEV_TO_HID.get(keycode - XKB_KEYCODE_OFFSET)
+
+    def process(self, keycode: int, pressed: bool) -> bytes | None:
+        """更新按键状态并返回新的报告；键码无法映射或状态未变化时返回 None"""
+        usage = self.usage_for_keycode(keycode)
+        if usage is None:
+            return None
+
+        if HID_MODIFIER_FIRST <= usage <= HID_MODIFIER_LAST:
+            bit = 1 << (usage - HID_MODIFIER_FIRST)
+            modifiers = self.modifiers | bit if pressed else self.modifiers & ~bit
+            if modifiers == self.modifiers:
+                return None
+            self.modifiers = modifiers
+        elif pressed:
+            if usage in self.keys:
+                # 自动重复由 Android 端处理
+                return None
+            self.keys.append(usage)
+        else:
+            if usage not in self.keys:
+                return None
+            self.keys.remove(usage)
+        return self.report()
+
+    def report(self) -> bytes:
+        keys = self.keys
+        if len(keys) > HID_KEYBOARD_MAX_KEYS:
+            keys = [HID_ERROR_ROLL_OVER] * HID_KEYBOARD_MAX_KEYS
+        return bytes(
+            (self.modifiers, 0, *keys, *([0] * (HID_KEYBOARD_MAX_KEYS - len(keys))))
+        )
+
+    def release_all(self) -> bytes:
+        self.modifiers = 0
+        self.keys.clear()
+        return self.report()
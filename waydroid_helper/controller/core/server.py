@@ -1,10 +1,67 @@
 import asyncio
+import itertools
+import logging
+import socket
+import time
 
-from waydroid_helper.controller.core.control_msg import ControlMsg
+from waydroid_helper.controller.android import AMotionEventAction
+from waydroid_helper.controller.core.control_msg import (ControlMsg,
+                                                         ControlMsgType,
+                                                         CopyKey,
+                                                         GetClipboardMsg,
+                                                         SetClipboardMsg,
+                                                         UhidCreateMsg,
+                                                         UhidDestroyMsg)
+from waydroid_helper.controller.core.device_msg import (AckClipboardMsg,
+                                                        ClipboardMsg,
+                                                        DeviceMsgError,
+                                                        UhidOutputMsg,
+                                                        read_device_msg)
 from waydroid_helper.controller.core.event_bus import (Event, EventType,
                                                        EventBus)
 from waydroid_helper.util.log import logger
 
+# scrcpy-server 连接后先发送 64 字节的设备名
+DEVICE_NAME_LENGTH = 64
+# 发送缓冲超过该值即认为设备停止读取
+STALL_HIGH_WATER = 16 * 1024
+# TCP 保活：空闲多久开始探测、探测间隔和失败次数，只由内核收发，不改变设备上的任何状态
+KEEPALIVE_IDLE = 15
+KEEPALIVE_INTERVAL = 5
+KEEPALIVE_COUNT = 3
+# 超过该时间仍未确认的 SET_CLIPBOARD 不再计入延迟
+ACK_TIMEOUT = 60.0
+# 往返延迟的平滑系数
+RTT_SMOOTHING = 0.125
+
+_TOUCH_MOVE_HEADER = bytes((ControlMsgType.INJECT_TOUCH_EVENT, AMotionEventAction.MOVE))
+
+
+def _touch_pointer(message: bytes) -> bytes | None:
+    """触摸消息返回 pointer id 字段，其它消息返回 None"""
+    if len(message) > 10 and message[0] == ControlMsgType.INJECT_TOUCH_EVENT:
+        return message[2:10]
+    return None
+
+
+def shed_move_backlog(messages: list[bytes | None]) -> list[bytes | None]:
+    """合并积压的触摸 MOVE，每个触点在两次非 MOVE 事件之间只保留最后一次"""
+    kept: list[bytes | None] = []
+    superseded: set[bytes] = set()
+    for message in reversed(messages):
+        pointer = _touch_pointer(message) if message else None
+        if pointer is not None:
+            if message.startswith(_TOUCH_MOVE_HEADER):
+                if pointer in superseded:
+                    continue
+                superseded.add(pointer)
+            else:
+                # DOWN/UP 之前的最后一次 MOVE 决定抬起位置，需要保留
+                superseded.discard(pointer)
+        kept.append(message)
+    kept.reverse()
+    return kept
+
 
 class Server:
     def __init__(self, host: str = "0.0.0.0", port: int = 10721, event_bus: EventBus|None = None):
@@ -19,6 +76,16 @@ class Server:
         self.server: asyncio.Server | None = None
         self.writers: list[asyncio.StreamWriter] = []
         self.started_event = asyncio.Event()
+        self.device_name: str = ""
+
+        # 控制通道状态
+        self.stalled: bool = False
+        self.rtt: float | None = None  # 平滑后的往返延迟（秒）
+        self.shed_count: int = 0  # 因设备阻塞丢弃的 MOVE 数量
+        self._sequence = itertools.count(1)
+        self._pending_acks: dict[int, float] = {}
+        # 已创建的 UHID 设备，scrcpy-server 重连后需要重新创建
+        self.uhid_devices: dict[int, bytes] = {}
         self.server_task: asyncio.Task[None] = asyncio.create_task(self.start_server())
 
         Server._initialized = True
@@ -27,9 +94,19 @@ class Server:
     async def handler(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
         addr = writer.get_extra_info("peername")
         logger.info(f"Connected to {addr!r}")
-        info = await reader.read(64)
-        logger.info(f"Connected to {info.decode()}")
+        try:
+            info = await reader.readexactly(DEVICE_NAME_LENGTH)
+        except asyncio.IncompleteReadError as e:
+            info = e.partial
+        self.device_name = info.split(b"\0", 1)[0].decode(errors="replace")
+        logger.info(f"Connected to {self.device_name}")
         self.writers.append(writer)
+        for create_msg in self.uhid_devices.values():
+            writer.write(create_msg)
+
+        writer.transport.set_write_buffer_limits(high=STALL_HIGH_WATER)
+        self._enable_keepalive(writer.get_extra_info("socket"))
+        reader_task = asyncio.create_task(self._read_device_messages(reader))
 
         try:
             while True:
@@ -37,12 +114,90 @@ class Server:
                 if not message:
                     break
                 writer.write(message)
+                if writer.transport.get_write_buffer_size() > STALL_HIGH_WATER:
+                    await self._wait_unstalled(writer)
+        except (ConnectionError, OSError) as e:
+            logger.warning(f"Control connection lost: {e}")
         finally:
             logger.info(f"Closing the connection to {addr!r}")
+            reader_task.cancel()
+            self._pending_acks.clear()
+            self._set_stalled(False)
             self.writers.remove(writer)
             writer.close()
             await writer.wait_closed()
 
+    async def _wait_unstalled(self, writer: asyncio.StreamWriter):
+        """设备读取跟不上时等待缓冲排空，并丢弃期间积压的 MOVE"""
+        self._set_stalled(True)
+        await writer.drain()
+        self._shed_queue()
+        self._set_stalled(False)
+
+    def _set_stalled(self, stalled: bool):
+        if stalled == self.stalled:
+            return
+        self.stalled = stalled
+        if stalled:
+            logger.warning("Device stopped reading control messages")
+        else:
+            logger.info(f"Control channel resumed, {self.shed_count} move(s) shed so far")
+        self.event_bus.emit(Event(EventType.CONTROL_STALLED, self, stalled))
+
+    def _shed_queue(self):
+        messages: list[bytes | None] = []
+        while not self.message_queue.empty():
+            messages.append(self.message_queue.get_nowait())
+        kept = shed_move_backlog(messages)
+        self.shed_count += len(messages) - len(kept)
+        for message in kept:
+            self.message_queue.put_nowait(message)
+
+    async def _read_device_messages(self, reader: asyncio.StreamReader):
+        """解析设备消息并转为 EventBus 事件"""
+        try:
+            while True:
+                msg = await read_device_msg(reader)
+                if isinstance(msg, ClipboardMsg):
+                    self.event_bus.emit(Event(EventType.DEVICE_CLIPBOARD, self, msg.text))
+                elif isinstance(msg, AckClipboardMsg):
+                    self._on_ack(msg.sequence)
+                elif isinstance(msg, UhidOutputMsg):
+                    self.event_bus.emit(Event(EventType.DEVICE_UHID_OUTPUT, self, msg))
+        except asyncio.IncompleteReadError:
+            logger.info("Device message stream closed")
+        except DeviceMsgError as e:
+            logger.error(f"Stopped reading device messages: {e}")
+        except (ConnectionError, OSError) as e:
+            logger.warning(f"Device message stream error: {e}")
+
+    def _on_ack(self, sequence: int):
+        sent_at = self._pending_acks.pop(sequence, None)
+        if sent_at is not None:
+            sample = time.monotonic() - sent_at
+            self.rtt = sample if self.rtt is None else self.rtt + RTT_SMOOTHING * (sample - self.rtt)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Control RTT {sample * 1000:.1f} ms (smoothed {self.rtt * 1000:.1f} ms)")
+            self.event_bus.emit(Event(EventType.CONTROL_LATENCY, self, self.rtt))
+        self.event_bus.emit(Event(EventType.DEVICE_CLIPBOARD_ACK, self, sequence))
+
+    @staticmethod
+    def _enable_keepalive(sock: socket.socket | None):
+        """开启 TCP 保活，设备断开而没有关闭连接时读写会出错并结束 handler
+
+        scrcpy 协议中只有 SET_CLIPBOARD 会被确认，用它探测会改写设备剪贴板，
+        所以保活交给内核，往返延迟只取自用户触发的 SET_CLIPBOARD 的确认。
+        """
+        if sock is None:
+            return
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, KEEPALIVE_IDLE)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, KEEPALIVE_INTERVAL)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, KEEPALIVE_COUNT)
+        except OSError as e:
+            logger.warning(f"Failed to enable TCP keepalive: {e}")
+
     async def start_server(self):
         try:
             self.server = await asyncio.start_server(self.handler, self.host, self.port)
@@ -97,13 +252,37 @@ class Server:
             except asyncio.QueueEmpty:
                 pass
 
+    def set_clipboard(self, text: str, paste: bool = False) -> int:
+        """设置设备剪贴板，返回用于匹配 DEVICE_CLIPBOARD_ACK 的序号"""
+        sequence = next(self._sequence)
+        now = time.monotonic()
+        # 超时未确认的不再计入延迟
+        for pending, sent_at in list(self._pending_acks.items()):
+            if now - sent_at > ACK_TIMEOUT:
+                del self._pending_acks[pending]
+        self._pending_acks[sequence] = now
+        self.send(SetClipboardMsg(text, sequence, paste).pack())
+        return sequence
+
+    def request_clipboard(self, copy_key: CopyKey = CopyKey.NONE):
+        """请求设备剪贴板，结果通过 DEVICE_CLIPBOARD 事件返回"""
+        self.send(GetClipboardMsg(copy_key).pack())
+
     def send_msg(self, event: Event[ControlMsg]):
         """优化版本：减少日志调用和条件检查"""
         msg: ControlMsg = event.data
         # 只在需要时才调用 debug 日志（检查日志级别）
-        if logger.isEnabledFor(10):  # DEBUG level = 10
+        if logger.isEnabledFor(logging.DEBUG):
             logger.debug("Send: %s", msg)
 
         # 优化后的 pack() 方法总是返回 bytes，无需检查 None
         packed_msg: bytes = msg.pack()
+        if isinstance(msg, UhidCreateMsg):
+            self.uhid_devices[msg.id] = packed_msg
+            if not self.writers:
+                # 连接建立时统一创建
+                return
+        elif isinstance(msg, UhidDestroyMsg):
+            if self.uhid_devices.pop(msg.id, None) is None or not self.writers:
+                return
         self.send(packed_msg)
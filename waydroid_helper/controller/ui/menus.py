@@ -6,21 +6,26 @@
 
 from __future__ import annotations
 
-import json
 import os
-import re
 from gettext import gettext as _
 from pathlib import Path
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING
 
 import gi
 from gi.repository import Gdk, Gtk, GLib
 
+from waydroid_helper.controller.app.profiles import ProfileStore
+from waydroid_helper.controller.core import Event, EventType
 from waydroid_helper.controller.core.control_msg import ScreenInfo
-from waydroid_helper.controller.core.key_system import Key, KeyCombination, KeyRegistry
 from waydroid_helper.util.log import logger
 from waydroid_helper.compat_widget.file_dialog import FileDialog
 from waydroid_helper.controller.widgets.base import BaseWidget
+from waydroid_helper.controller.widgets.layout import (
+    LAYOUT_FILE_SUFFIX,
+    LayoutError,
+    read_layout_file,
+    write_layout_file,
+)
 
 gi.require_version("Gtk", "4.0")
 gi.require_version("Gdk", "4.0")
@@ -40,6 +45,13 @@ class ContextMenuManager:
         self._flow_box: "Gtk.FlowBox | None" = None
         self._tool_flow: "Gtk.FlowBox | None" = None
         self.screen_info = ScreenInfo()
+        self.profile_store = ProfileStore(self._get_default_layouts_dir())
+        self.current_package: str | None = None
+        self.parent_window.event_bus.subscribe(
+            EventType.FOREGROUND_APP_CHANGED,
+            self._on_foreground_app_changed,
+            subscriber=self,
+        )
 
     def show_widget_creation_menu(
         self, x: int, y: int, widget_factory: "WidgetFactory"
@@ -146,10 +158,9 @@ class ContextMenuManager:
         # 过滤掉不允许通过右键菜单创建的组件
         filtered_types = []
         for widget_type in available_types:
-            widget_class = widget_factory.widget_classes.get(widget_type)
-            if widget_class and getattr(
-                widget_class, "ALLOW_CONTEXT_MENU_CREATION", True
-            ):
+            # 只读取清单中的元数据，不导入组件模块
+            metadata = widget_factory.get_widget_metadata(widget_type)
+            if metadata.get("allow_context_menu_creation", True):
                 filtered_types.append(widget_type)
 
         if not filtered_types:
@@ -188,6 +199,8 @@ class ContextMenuManager:
             (_("Save layout"), lambda: self._save_layout()),
             (_("Load layout"), lambda: self._load_layout(widget_factory)),
         ]
+        if self.current_package:
+            tool_items.append((_("Bind to app"), lambda: self._save_profile()))
 
         for label, callback in tool_items:
             button = Gtk.Button(label=label)
@@ -212,6 +225,7 @@ class ContextMenuManager:
             )
             if widget:
                 self.parent_window.create_widget_at_position(widget, x, y)
+                self.parent_window.layout_manager.commit()
         except Exception as e:
             logger.error(f"Error creating {widget_type} widget: {e}")
 
@@ -227,26 +241,7 @@ class ContextMenuManager:
     def _clear_all_widgets(self):
         """清空所有组件"""
         self.parent_window.on_clear_widgets(None)
-
-    def _get_available_screen_size(self):
-        return self.screen_info.get_host_resolution()
-
-    def _serialize_key_combination(self, key_combination: KeyCombination) -> list[str]:
-        """序列化按键组合为字符串列表"""
-        if not key_combination:
-            return []
-        return [str(key) for key in key_combination.keys]
-
-    def _deserialize_key_combination(
-        self, key_names: list[str]
-    ) -> "KeyCombination | None":
-        """从字符串列表反序列化按键组合"""
-        keys: list[Key] = []
-        for key_name in key_names:
-            key = self.parent_window.key_registry.deserialize_key(key_name)
-            if key:
-                keys.append(key)
-        return KeyCombination(keys) if keys else None
+        self.parent_window.layout_manager.commit()
 
     # TODO 在每个 widget 内部单独实现序列化/反序列化
     def _get_default_layouts_dir(self) -> str:
@@ -260,13 +255,16 @@ class ContextMenuManager:
 
         return layouts_dir
 
-    def _save_layout(self):
-        """保存当前布局到文件，包括屏幕尺寸信息"""
-        # 创建文件过滤器，只显示 JSON 文件
-        json_filter = Gtk.FileFilter()
-        json_filter.set_name(_("JSON files"))
-        json_filter.add_pattern("*.json")
+    def _layout_file_filter(self) -> Gtk.FileFilter:
+        """布局文件过滤器，同时接受二进制布局和 JSON"""
+        layout_filter = Gtk.FileFilter()
+        layout_filter.set_name(_("Layout files"))
+        layout_filter.add_pattern(f"*{LAYOUT_FILE_SUFFIX}")
+        layout_filter.add_pattern("*.json")
+        return layout_filter
 
+    def _save_layout(self):
+        """保存当前布局到文件，坐标以归一化形式保存"""
         # 创建文件对话框
         dialog = FileDialog(
             parent=self.parent_window, title=_("Save Layout"), modal=True
@@ -275,11 +273,11 @@ class ContextMenuManager:
         # 设置默认目录
         default_dir = self._get_default_layouts_dir()
 
-        # 显示保存对话框
+        # 显示保存对话框，以 .json 结尾时导出为 JSON
         dialog.save_file(
             callback=self._on_save_layout_file_selected,
-            suggested_name="layout.json",
-            file_filter=json_filter,
+            suggested_name=f"layout{LAYOUT_FILE_SUFFIX}",
+            file_filter=self._layout_file_filter(),
             initial_folder=default_dir,
         )
 
@@ -289,94 +287,12 @@ class ContextMenuManager:
             return
 
         try:
-            # 获取当前屏幕尺寸
-            screen_width, screen_height = self._get_available_screen_size()
-
-            # 收集所有widget的信息
-            widgets_data = []
-            if hasattr(self.parent_window, "fixed"):
-                child: "BaseWidget | None" = self.parent_window.fixed.get_first_child()
-                while child:
-                    # 获取widget的位置
-                    x, y = child.x, child.y
-
-                    # 获取widget的尺寸
-                    width = child.width
-                    height = child.height
-
-                    # 获取widget类型
-                    widget_type = type(child).__name__.lower()
-
-                    # 创建widget数据
-                    widget_data: dict[str, Any] = {
-                        "type": widget_type,
-                        "x": float(x),
-                        "y": float(y),
-                        "width": float(width),
-                        "height": float(height),
-                    }
-
-                    # 如果widget有text属性，也保存
-                    if hasattr(child, "text") and child.text:
-                        widget_data["text"] = str(child.text)
-
-                    # 保存按键映射 - 根据组件类型处理
-                    if widget_type == "directionalpad":
-                        # DirectionalPad 有四个方向的按键
-                        if hasattr(child, "direction_keys") and child.direction_keys:
-                            widget_data["direction_keys"] = {
-                                "up": self._serialize_key_combination(
-                                    child.direction_keys["up"]
-                                ),
-                                "down": self._serialize_key_combination(
-                                    child.direction_keys["down"]
-                                ),
-                                "left": self._serialize_key_combination(
-                                    child.direction_keys["left"]
-                                ),
-                                "right": self._serialize_key_combination(
-                                    child.direction_keys["right"]
-                                ),
-                            }
-                    else:
-                        # 其他组件的通用按键映射
-                        if hasattr(child, "final_keys") and child.final_keys:
-                            widget_data["default_keys"] = [
-                                self._serialize_key_combination(kc)
-                                for kc in child.final_keys
-                            ]
-
-                    # 保存组件配置
-                    if hasattr(child, "get_config_manager"):
-                        config_manager = child.get_config_manager()
-                        if config_manager.configs:
-                            widget_data["config"] = config_manager.serialize()
-
-                    widgets_data.append(widget_data)
-                    child = child.get_next_sibling()
-
-            # 创建完整的布局数据，包括屏幕尺寸信息
-            layout_data = {
-                "version": BaseWidget.WIDGET_VERSION,  # 增加版本号
-                "screen_resolution": {"width": screen_width, "height": screen_height},
-                "widgets": widgets_data,
-                "created_at": str(Path().absolute()),  # 保存创建时间戳
-            }
-
-            # 保存到文件
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(layout_data, f, indent=2, ensure_ascii=False)
-
+            write_layout_file(file_path, self.parent_window.layout_manager.capture_layout())
         except Exception as e:
             logger.error(f"Failed to save layout: {e}")
 
     def _load_layout(self, widget_factory: "WidgetFactory"):
-        """从文件加载布局，支持屏幕尺寸缩放适配"""
-        # 创建文件过滤器，只显示 JSON 文件
-        json_filter = Gtk.FileFilter()
-        json_filter.set_name(_("JSON files"))
-        json_filter.add_pattern("*.json")
-
+        """从文件加载布局"""
         # 创建文件对话框
         dialog = FileDialog(
             parent=self.parent_window, title=_("Load Layout"), modal=True
@@ -390,10 +306,37 @@ class ContextMenuManager:
             callback=lambda success, path: self._on_load_layout_file_selected(
                 success, path, widget_factory
             ),
-            file_filter=json_filter,
+            file_filter=self._layout_file_filter(),
             initial_folder=default_dir,
         )
 
+    def _save_profile(self):
+        """把当前布局绑定到前台应用，下次切换到该应用时自动加载"""
+        if not self.current_package:
+            return
+        try:
+            self.profile_store.save_profile(
+                self.current_package, self.parent_window.layout_manager.capture_layout()
+            )
+            self.parent_window.show_notification(
+                _("Layout bound to {0}").format(self.current_package)
+            )
+        except Exception as e:
+            logger.error(f"Failed to save profile for {self.current_package}: {e}")
+
+    def _on_foreground_app_changed(self, event: "Event[str]"):
+        """前台应用变化时切换到其绑定的布局"""
+        package = event.data
+        if package == self.current_package:
+            return
+        self.current_package = package
+
+        layout = self.profile_store.get_layout(package)
+        if layout is None:
+            return
+        logger.info(f"Switching to layout profile of {package}")
+        self.parent_window.layout_manager.apply(layout)
+
     def _on_load_layout_file_selected(
         self, success: bool, file_path: str | None, widget_factory: "WidgetFactory"
     ):
@@ -406,135 +349,14 @@ class ContextMenuManager:
             if not Path(file_path).exists():
                 return
 
-            # 读取布局文件
-            with open(file_path, "r", encoding="utf-8") as f:
-                layout_data = json.load(f)
-
-            # 验证布局数据
-            if "widgets" not in layout_data:
-                logger.error("Invalid layout file format")
-                return
-            
-            if layout_data.get("version") != BaseWidget.WIDGET_VERSION:
-                logger.warning(f"Layout file version mismatch: {layout_data.get('version')} != {BaseWidget.WIDGET_VERSION}")
+            layout = read_layout_file(file_path)
+        except (OSError, UnicodeDecodeError, LayoutError) as e:
+            logger.error(f"Failed to load layout: {e}")
+            return
 
-            # 获取当前屏幕尺寸
-            current_screen_width, current_screen_height = (
-                self._get_available_screen_size()
+        if layout.widget_version and layout.widget_version != BaseWidget.WIDGET_VERSION:
+            logger.warning(
+                f"Layout file version mismatch: {layout.widget_version} != {BaseWidget.WIDGET_VERSION}"
             )
 
-            # 计算缩放比例
-            scale_x = 1.0
-            scale_y = 1.0
-            saved_resolution = layout_data.get("screen_resolution")
-
-            if saved_resolution:
-                saved_width = saved_resolution.get("width", current_screen_width)
-                saved_height = saved_resolution.get("height", current_screen_height)
-                scale_x = current_screen_width / saved_width
-                scale_y = current_screen_height / saved_height
-
-            # 清空现有组件
-            if hasattr(self.parent_window, "on_clear_widgets"):
-                self.parent_window.on_clear_widgets(None)
-
-            # 重新创建组件
-            widgets_created = 0
-            for widget_data in layout_data["widgets"]:
-                try:
-                    # 获取基本信息
-                    widget_type = widget_data.get("type", "")
-                    original_x = widget_data.get("x", 0)
-                    original_y = widget_data.get("y", 0)
-                    original_width = widget_data.get("width", 100)
-                    original_height = widget_data.get("height", 100)
-                    text = widget_data.get("text", "")
-
-                    # 应用缩放比例
-                    x = int(original_x * scale_x)
-                    y = int(original_y * scale_y)
-                    width = int(original_width * scale_x)
-                    height = int(original_height * scale_y)
-
-                    # 根据组件类型准备参数
-                    create_kwargs = {
-                        "width": width,
-                        "height": height,
-                        "text": text,
-                        "event_bus": self.parent_window.event_bus,
-                        "pointer_id_manager": self.parent_window.pointer_id_manager,
-                        "key_registry": self.parent_window.key_registry,
-                    }
-
-                    # 添加按键映射参数
-                    if widget_type == "directionalpad":
-                        if "direction_keys" in widget_data:
-                            create_kwargs["direction_keys"] = {
-                                "up": self._deserialize_key_combination(
-                                    widget_data["direction_keys"]["up"]
-                                ),
-                                "down": self._deserialize_key_combination(
-                                    widget_data["direction_keys"]["down"]
-                                ),
-                                "left": self._deserialize_key_combination(
-                                    widget_data["direction_keys"]["left"]
-                                ),
-                                "right": self._deserialize_key_combination(
-                                    widget_data["direction_keys"]["right"]
-                                ),
-                            }
-                    else:
-                        # 其他组件的通用按键
-                        default_keys = []
-                        if "default_keys" in widget_data:
-                            for key_names in widget_data["default_keys"]:
-                                key_combo = self._deserialize_key_combination(key_names)
-                                if key_combo:
-                                    default_keys.append(key_combo)
-                        create_kwargs["default_keys"] = default_keys
-
-                    if widget_type == "macro":
-                        if "config" in widget_data and "macro_command" in widget_data["config"]:
-                            macro_cfg = widget_data["config"]["macro_command"]
-                            value = macro_cfg.get("value")
-                            if isinstance(value, str) and (scale_x != 1.0 or scale_y != 1.0):
-                                def _scale_coords(match: re.Match) -> str:
-                                    x_str, y_str = match.group(1), match.group(2)
-                                    try:
-                                        x = float(x_str)
-                                        y = float(y_str)
-                                    except ValueError:
-                                        return match.group(0)
-                                    scaled_x = int(x * scale_x)
-                                    scaled_y = int(y * scale_y)
-                                    return f"{scaled_x},{scaled_y}"
-
-                                scaled_value = re.sub(
-                                    r"(\d+)\s*,\s*(\d+)",
-                                    _scale_coords,
-                                    value,
-                                )
-                                macro_cfg["value"] = scaled_value
-
-                    # 创建widget
-                    widget = widget_factory.create_widget(widget_type, **create_kwargs)
-
-                    if widget:
-                        # 在缩放后的位置创建widget
-                        if hasattr(self.parent_window, "create_widget_at_position"):
-                            self.parent_window.create_widget_at_position(widget, x, y)
-
-                            # 恢复配置
-                            if "config" in widget_data and hasattr(
-                                widget, "get_config_manager"
-                            ):
-                                config_manager = widget.get_config_manager()
-                                config_manager.deserialize(widget_data["config"])
-
-                            widgets_created += 1
-
-                except Exception as e:
-                    logger.error(f"Failed to create widget: {e}")
-                    continue
-        except Exception as e:
-            logger.error(f"Failed to load layout: {e}")
+        self.parent_window.layout_manager.apply(layout)
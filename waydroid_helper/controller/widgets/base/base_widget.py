@@ -7,6 +7,7 @@
 from __future__ import annotations
 
 import math
+import uuid
 from typing import TYPE_CHECKING, Any, Callable, TypedDict, cast
 
 import gi
@@ -88,6 +89,7 @@ class BaseWidget(Gtk.DrawingArea):
         self.original_height:int = height
         self.title:str = title
         self.text:str = text  # 显示文本，独立于按键映射
+        self.widget_id:str = uuid.uuid4().hex  # 稳定 ID，用于布局增量更新
 
         # 编辑模式下的坐标也是业务实际使用的坐标
         self.x:int = x  # 编辑模式下x坐标
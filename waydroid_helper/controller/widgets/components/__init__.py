@@ -1,25 +1,40 @@
 """
 具体组件实现
+
+组件模块按需导入：导入单个组件模块时不会连带导入其他组件
 """
 
-from .aim import Aim
-from .cancel_casting import CancelCasting
-from .directional_pad import DirectionalPad
-from .fire import Fire
-from .macro import Macro
-from .repeated_click import RepeatedClick
-from .right_click_to_walk import RightClickToWalk
-from .single_click import SingleClick
-from .skill_casting import SkillCasting
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .aim import Aim
+    from .cancel_casting import CancelCasting
+    from .directional_pad import DirectionalPad
+    from .fire import Fire
+    from .macro import Macro
+    from .repeated_click import RepeatedClick
+    from .right_click_to_walk import RightClickToWalk
+    from .single_click import SingleClick
+    from .skill_casting import SkillCasting
+
+_EXPORTS = {
+    'Aim': '.aim',
+    'Fire': '.fire',
+    'SingleClick': '.single_click',
+    'DirectionalPad': '.directional_pad',
+    'Macro': '.macro',
+    'RightClickToWalk': '.right_click_to_walk',
+    'SkillCasting': '.skill_casting',
+    'CancelCasting': '.cancel_casting',
+    'RepeatedClick': '.repeated_click',
+}
+
+__all__ = list(_EXPORTS)
+
 
-__all__ = [
-    'Aim',
-    'Fire', 
-    'SingleClick',
-    'DirectionalPad',
-    'Macro',
-    'RightClickToWalk',
-    'SkillCasting',
-    'CancelCasting',
-    'RepeatedClick',
-] 
\ No newline at end of file
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module, __name__), name)
@@ -581,6 +581,11 @@ class EditableDecorator(WidgetDecorator):
         # 清空实时捕获
         self.realtime_keys = set()
         self._wrapped_widget.queue_draw()
+        
+        # 按键变化记录为一次可撤销的编辑
+        window = self._get_toplevel_window()
+        if apply_changes and window and hasattr(window, 'layout_manager'):
+            window.layout_manager.commit()
     
     def _register_key_mapping(self):
         """注册按键映射到全局管理器"""
@@ -1,16 +1,20 @@
 #!/usr/bin/env python3
 """
 动态组件工厂
-自动扫描components目录，发现和注册widget类
+根据构建时生成的组件清单注册组件类型，组件模块在首次使用时才导入
 """
 
 from __future__ import annotations
 
 import importlib
-import inspect
-import pkgutil
+from importlib.metadata import entry_points
 from typing import TYPE_CHECKING, Any
 
+from waydroid_helper.controller.widgets.manifest import (
+    ENTRY_POINT_GROUP,
+    WidgetEntry,
+    load_manifest,
+)
 from waydroid_helper.util.log import logger
 
 if TYPE_CHECKING:
@@ -22,42 +26,69 @@ class WidgetFactory:
     """动态组件工厂类"""
     
     def __init__(self):
+        # 已导入的组件类，按需填充
         self.widget_classes: dict[str, type["BaseWidget"]] = {}
         self.widget_metadata: dict[str, dict[str, Any]] = {}
+        self._entries: dict[str, WidgetEntry] = {}
         self._discover_widgets()
     
     def _discover_widgets(self):
-        """动态发现组件目录中的所有widget类"""
+        """从组件清单和第三方 entry point 注册组件类型，不导入组件模块"""
         try:
-            # 导入 components 包
-            import waydroid_helper.controller.widgets.components as components_package
-
-            # 使用 pkgutil 遍历包中的所有模块
-            for _, module_name, ispkg in pkgutil.iter_modules(components_package.__path__):
-                if not ispkg:  # 只处理模块，不处理子包
-                    self._load_widget_from_module(module_name)
+            for entry in load_manifest():
+                self._add_entry(entry)
+        except Exception as e:
+            logger.error(f"Failed to load widget manifest: {e}")
 
-        except ImportError as e:
-            logger.error(f"Failed to import components package: {e}")
+        try:
+            for ep in entry_points(group=ENTRY_POINT_GROUP):
+                # 第三方组件的名称和描述在导入后才知道，先用类型名占位
+                self._add_entry(
+                    WidgetEntry(
+                        type=ep.name.lower(),
+                        class_name=ep.attr,
+                        module=ep.module,
+                        name={"msgid": ep.name},
+                        description={},
+                    )
+                )
         except Exception as e:
-            logger.error(f"Error during widget discovery: {e}")
+            logger.error(f"Error during widget entry point discovery: {e}")
     
-    def _load_widget_from_module(self, module_name: str):
-        """从模块中加载widget类"""
+    def _add_entry(self, entry: WidgetEntry):
+        if entry.type in self._entries or entry.type in self.widget_classes:
+            logger.warning(f"Duplicate widget type ignored: {entry.type} ({entry.module})")
+            return
+        self._entries[entry.type] = entry
+        self.widget_metadata[entry.type] = entry.metadata()
+    
+    def get_widget_class(self, widget_type: str) -> type["BaseWidget"] | None:
+        """获取组件类，首次使用时导入其模块"""
+        widget_class = self.widget_classes.get(widget_type)
+        if widget_class is not None:
+            return widget_class
+
+        entry = self._entries.get(widget_type)
+        if entry is None:
+            return None
         try:
-            # 动态导入模块
-            module_path = f"waydroid_helper.controller.widgets.components.{module_name}"
-            module = importlib.import_module(module_path)
-            
-            # 查找模块中的widget类
-            for name, obj in inspect.getmembers(module, inspect.isclass):
-                if self._is_widget_class(obj, module):
-                    widget_type = self._extract_widget_type(name)
-                    self.widget_classes[widget_type] = obj
-                    self.widget_metadata[widget_type] = self._extract_metadata(obj)
-                    
+            module = importlib.import_module(entry.module)
+            widget_class = getattr(module, entry.class_name)
         except Exception as e:
-            logger.error(f"Failed to load module {module_name}: {e}")
+            logger.error(f"Failed to load widget {widget_type} from {entry.module}: {e}")
+            return None
+        if not self._is_widget_class(widget_class, module):
+            logger.error(f"{entry.module}.{entry.class_name} is not a widget class")
+            return None
+
+        self.widget_classes[widget_type] = widget_class
+        self.widget_metadata[widget_type] = self._extract_metadata(widget_class)
+        return widget_class
+    
+    def preload(self):
+        """导入全部已注册的组件模块，用于空闲时预热"""
+        for widget_type in self.get_available_types():
+            self.get_widget_class(widget_type)
     
     def _is_widget_class(self, cls: type["BaseWidget"], module: 'ModuleType') -> bool:
         """判断是否为有效的widget类"""
@@ -86,7 +117,8 @@ class WidgetFactory:
             'name': getattr(widget_class, '__doc__', widget_class.__name__).split('\n')[0] if widget_class.__doc__ else widget_class.__name__,
             'description': widget_class.__doc__ or '',
             'class_name': widget_class.__name__,
-            'module': widget_class.__module__
+            'module': widget_class.__module__,
+            'allow_context_menu_creation': getattr(widget_class, 'ALLOW_CONTEXT_MENU_CREATION', True),
         }
         
         # 尝试从类中提取更多元数据
@@ -99,11 +131,13 @@ class WidgetFactory:
     
     def create_widget(self, widget_type: str, **kwargs) -> "BaseWidget" | None:
         """创建指定类型的组件"""
-        if widget_type not in self.widget_classes:
-            available = list(self.widget_classes.keys())
+        if widget_type not in self._entries and widget_type not in self.widget_classes:
+            available = self.get_available_types()
             raise ValueError(f"Unsupported widget type: {widget_type}. Available types: {available}")
         
-        widget_class = self.widget_classes[widget_type]
+        widget_class = self.get_widget_class(widget_type)
+        if widget_class is None:
+            return None
         
         try:
             widget = widget_class(**kwargs)
@@ -115,7 +149,7 @@ class WidgetFactory:
     
     def get_available_types(self) -> list[str]:
         """获取所有可用的组件类型"""
-        return list(self.widget_classes.keys())
+        return list(self.widget_metadata.keys())
     
     def get_widget_metadata(self, widget_type: str):
         """获取组件元数据"""
@@ -130,15 +164,15 @@ class WidgetFactory:
     
     def unregister_widget_type(self, name: str):
         """注销组件类型"""
-        if name in self.widget_classes:
-            del self.widget_classes[name]
-            if name in self.widget_metadata:
-                del self.widget_metadata[name]
+        self._entries.pop(name, None)
+        self.widget_classes.pop(name, None)
+        self.widget_metadata.pop(name, None)
     
     def reload_widgets(self):
         """重新加载所有组件"""
         self.widget_classes.clear()
         self.widget_metadata.clear()
+        self._entries.clear()
         self._discover_widgets()
     
     def print_discovered_widgets(self):
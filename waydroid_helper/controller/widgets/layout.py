@@ -0,0 +1,544 @@
+#!/usr/bin/env python3
+"""
+布局文件格式
+紧凑的二进制布局格式（msgpack 子集编码），同时支持 JSON 导入/导出。
+坐标以相对于宿主窗口尺寸的归一化值保存，加载时直接乘以当前尺寸即可，
+不再需要对宏命令文本做正则缩放。
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+import uuid
+from collections import deque
+from dataclasses import dataclass, field, replace
+from typing import Any
+
+from waydroid_helper.util.log import logger
+
+# 文件头: 魔数 + 格式版本
+LAYOUT_MAGIC = b"WDHL"
+LAYOUT_FORMAT_VERSION = 1
+LAYOUT_HISTORY_LIMIT = 100
+LAYOUT_FILE_SUFFIX = ".wdhl"
+
+_HEADER = struct.Struct(">4sH")
+
+# 需要对坐标做归一化的配置项: widget 类型 -> 配置键
+COORDINATE_CONFIG_KEYS: dict[str, tuple[str, ...]] = {
+    "macro": ("macro_command",),
+}
+
+
+class LayoutError(Exception):
+    """布局文件无法解析"""
+
+
+@dataclass
+class WidgetRecord:
+    """单个组件的布局记录，坐标与尺寸均为归一化值 (0~1)"""
+
+    type: str
+    x: float
+    y: float
+    width: float
+    height: float
+    text: str = ""
+    # 普通组件: 按键组合列表; DirectionalPad: 方向 -> 按键组合
+    keys: list[list[str]] = field(default_factory=list)
+    direction_keys: dict[str, list[str]] = field(default_factory=dict)
+    # 配置项: key -> {"value": ..., "visible": ...}
+    config: dict[str, dict[str, Any]] = field(default_factory=dict)
+    # 稳定 ID，用于增量 diff 时匹配组件
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+
+@dataclass
+class Layout:
+    """完整布局"""
+
+    widgets: list[WidgetRecord] = field(default_factory=list)
+    # 保存时的宿主分辨率，仅作参考；坐标本身已归一化
+    screen_resolution: tuple[int, int] = (0, 0)
+    widget_version: str = ""
+
+
+# ==================== 宏坐标归一化 ====================
+
+
+def _scan_point(text: str, start: int) -> tuple[int, int, int] | None:
+    """从 start 处扫描 "x,y" 形式的坐标，返回 (x, y, 结束位置)"""
+    n = len(text)
+    i = start
+    while i < n and text[i].isdigit():
+        i += 1
+    if i == start:
+        return None
+    x_end = i
+    while i < n and text[i] in " \t":
+        i += 1
+    if i >= n or text[i] != ",":
+        return None
+    i += 1
+    while i < n and text[i] in " \t":
+        i += 1
+    y_start = i
+    while i < n and text[i].isdigit():
+        i += 1
+    if i == y_start:
+        return None
+    return int(text[start:x_end]), int(text[y_start:i]), i
+
+
+def normalize_points(text: str, width: int, height: int) -> list[Any]:
+    """将文本中的绝对坐标拆分为归一化坐标片段
+
+    返回由字符串片段和 [x, y] 归一化坐标交替组成的列表
+    """
+    if width <= 0 or height <= 0:
+        return [text]
+    segments: list[Any] = []
+    literal_start = 0
+    i = 0
+    n = len(text)
+    while i < n:
+        # 只在数字序列的开头尝试匹配，避免把 "12,34" 拆成 "2,34"
+        if text[i].isdigit() and (i == 0 or not text[i - 1].isdigit()):
+            point = _scan_point(text, i)
+            if point is not None:
+                x, y, end = point
+                if literal_start < i:
+                    segments.append(text[literal_start:i])
+                segments.append([x / width, y / height])
+                literal_start = i = end
+                continue
+        i += 1
+    if literal_start < n:
+        segments.append(text[literal_start:])
+    return segments
+
+
+def denormalize_points(segments: list[Any], width: int, height: int) -> str:
+    """将归一化坐标片段还原为当前分辨率下的文本"""
+    parts: list[str] = []
+    for segment in segments:
+        if isinstance(segment, str):
+            parts.append(segment)
+        else:
+            parts.append(f"{round(segment[0] * width)},{round(segment[1] * height)}")
+    return "".join(parts)
+
+
+def _comparable_fields(record: WidgetRecord, width: int, height: int) -> dict[str, Any]:
+    """在给定分辨率下可比较的字段（坐标取整到像素，按键无序）"""
+    config = {}
+    for key, item in record.config.items():
+        value = item.get("value")
+        if key in COORDINATE_CONFIG_KEYS.get(record.type, ()) and isinstance(value, list):
+            value = denormalize_points(value, width, height)
+        config[key] = [value, item.get("visible", True)]
+    return {
+        "type": record.type,
+        "position": [round(record.x * width), round(record.y * height)],
+        "size": [round(record.width * width), round(record.height * height)],
+        "text": record.text,
+        "keys": sorted(record.keys),
+        "direction_keys": record.direction_keys,
+        "config": config,
+    }
+
+
+def record_key(record: WidgetRecord, width: int, height: int) -> str:
+    """与 ID 无关的内容键，内容等价的记录键相同"""
+    return json.dumps(
+        _comparable_fields(record, width, height), sort_keys=True, ensure_ascii=False
+    )
+
+
+# ==================== 增量 diff ====================
+
+
+@dataclass
+class WidgetChange:
+    """单个组件的变化记录，before 为空表示新增，after 为空表示删除"""
+
+    before: WidgetRecord | None
+    after: WidgetRecord | None
+
+    def inverse(self) -> "WidgetChange":
+        return WidgetChange(self.after, self.before)
+
+
+def changed_fields(
+    before: WidgetRecord, after: WidgetRecord, width: int, height: int
+) -> set[str]:
+    """返回发生变化的字段: id/position/size/text/keys/direction_keys/config"""
+    old = _comparable_fields(before, width, height)
+    new = _comparable_fields(after, width, height)
+    fields = {name for name in old if old[name] != new[name]}
+    if before.id != after.id:
+        fields.add("id")
+    return fields
+
+
+def changed_config_keys(before: WidgetRecord, after: WidgetRecord) -> list[str]:
+    """返回值或可见性发生变化的配置键"""
+    return [key for key, item in after.config.items() if before.config.get(key) != item]
+
+
+def diff_layouts(
+    old: Layout, new: Layout, width: int, height: int
+) -> list[WidgetChange]:
+    """按稳定 ID 匹配组件并计算变化
+
+    ID 不匹配的组件再按内容匹配，内容等价的组件只记录 ID 变化以便复用。
+    结果按 删除 -> 修改 -> 新增 的顺序排列。
+    """
+    old_by_id = {record.id: record for record in old.widgets}
+    matched: list[WidgetChange] = []
+    unmatched_new: list[WidgetRecord] = []
+    for record in new.widgets:
+        previous = old_by_id.pop(record.id, None)
+        if previous is not None and previous.type == record.type:
+            matched.append(WidgetChange(previous, record))
+        else:
+            if previous is not None:
+                old_by_id[previous.id] = previous
+            unmatched_new.append(record)
+
+    # 剩余的旧组件按内容分组
+    by_content: dict[str, deque[WidgetRecord]] = {}
+    for record in old_by_id.values():
+        by_content.setdefault(record_key(record, width, height), deque()).append(record)
+
+    adds: list[WidgetChange] = []
+    for record in unmatched_new:
+        candidates = by_content.get(record_key(record, width, height))
+        if candidates:
+            matched.append(WidgetChange(candidates.popleft(), record))
+        else:
+            adds.append(WidgetChange(None, record))
+
+    removes = [
+        WidgetChange(record, None)
+        for candidates in by_content.values()
+        for record in candidates
+    ]
+    modifies = [
+        change
+        for change in matched
+        if change.before is not None
+        and change.after is not None
+        and changed_fields(change.before, change.after, width, height)
+    ]
+    return removes + modifies + adds
+
+
+def invert_changes(changes: list[WidgetChange]) -> list[WidgetChange]:
+    """计算撤销一组变化所需的变化"""
+    inverted = [change.inverse() for change in reversed(changes)]
+    # 保持 删除 -> 修改 -> 新增 的顺序
+    return (
+        [c for c in inverted if c.after is None]
+        + [c for c in inverted if c.before is not None and c.after is not None]
+        + [c for c in inverted if c.before is None]
+    )
+
+
+def apply_changes_to_layout(layout: Layout, changes: list[WidgetChange]) -> Layout:
+    """在布局记录上应用变化，返回新布局"""
+    widgets = {record.id: record for record in layout.widgets}
+    for change in changes:
+        if change.before is not None:
+            widgets.pop(change.before.id, None)
+        if change.after is not None:
+            widgets[change.after.id] = change.after
+    return replace(layout, widgets=list(widgets.values()))
+
+
+class LayoutHistory:
+    """基于 diff 记录的撤销/重做栈"""
+
+    def __init__(self, limit: int = LAYOUT_HISTORY_LIMIT):
+        self._undo: deque[list[WidgetChange]] = deque(maxlen=limit)
+        self._redo: list[list[WidgetChange]] = []
+
+    def push(self, changes: list[WidgetChange]) -> None:
+        if not changes:
+            return
+        self._undo.append(changes)
+        self._redo.clear()
+
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def undo(self) -> list[WidgetChange] | None:
+        """返回撤销所需应用的变化"""
+        if not self._undo:
+            return None
+        changes = self._undo.pop()
+        self._redo.append(changes)
+        return invert_changes(changes)
+
+    def redo(self) -> list[WidgetChange] | None:
+        """返回重做所需应用的变化"""
+        if not self._redo:
+            return None
+        changes = self._redo.pop()
+        self._undo.append(changes)
+        return changes
+
+    def clear(self) -> None:
+        self._undo.clear()
+        self._redo.clear()
+
+
+# ==================== 布局 <-> 字典 ====================
+
+
+def _record_to_dict(record: WidgetRecord) -> dict[str, Any]:
+    data: dict[str, Any] = {
+        "id": record.id,
+        "type": record.type,
+        "x": record.x,
+        "y": record.y,
+        "width": record.width,
+        "height": record.height,
+    }
+    if record.text:
+        data["text"] = record.text
+    if record.keys:
+        data["default_keys"] = record.keys
+    if record.direction_keys:
+        data["direction_keys"] = record.direction_keys
+    if record.config:
+        data["config"] = record.config
+    return data
+
+
+def _record_from_dict(
+    data: dict[str, Any], legacy_size: tuple[int, int] | None
+) -> WidgetRecord:
+    """legacy_size 不为空时，data 为旧版 JSON 的绝对像素坐标"""
+    widget_type = str(data.get("type", ""))
+    config: dict[str, dict[str, Any]] = {}
+    for key, item in (data.get("config") or {}).items():
+        entry = {"value": item.get("value")}
+        if "visible" in item:
+            entry["visible"] = item["visible"]
+        config[key] = entry
+
+    scale_x = scale_y = 1.0
+    if legacy_size is not None:
+        width, height = legacy_size
+        scale_x, scale_y = 1 / width, 1 / height
+        # 旧格式的宏坐标是绝对值，在导入时一次性归一化
+        for key in COORDINATE_CONFIG_KEYS.get(widget_type, ()):
+            value = config.get(key, {}).get("value")
+            if isinstance(value, str):
+                config[key]["value"] = normalize_points(value, width, height)
+
+    return WidgetRecord(
+        type=widget_type,
+        x=float(data.get("x", 0)) * scale_x,
+        y=float(data.get("y", 0)) * scale_y,
+        width=float(data.get("width", 100)) * scale_x,
+        height=float(data.get("height", 100)) * scale_y,
+        text=str(data.get("text", "")),
+        keys=[list(kc) for kc in data.get("default_keys", [])],
+        direction_keys={k: list(v) for k, v in (data.get("direction_keys") or {}).items()},
+        config=config,
+        id=str(data.get("id") or uuid.uuid4().hex),
+    )
+
+
+def layout_to_dict(layout: Layout) -> dict[str, Any]:
+    width, height = layout.screen_resolution
+    return {
+        "format": LAYOUT_FORMAT_VERSION,
+        "version": layout.widget_version,
+        "screen_resolution": {"width": width, "height": height},
+        "widgets": [_record_to_dict(r) for r in layout.widgets],
+    }
+
+
+def layout_from_dict(data: dict[str, Any]) -> Layout:
+    if "widgets" not in data:
+        raise LayoutError("Invalid layout file format")
+
+    resolution = data.get("screen_resolution") or {}
+    width = int(resolution.get("width", 0) or 0)
+    height = int(resolution.get("height", 0) or 0)
+
+    # 没有 format 字段的是旧版 JSON，坐标为绝对像素
+    legacy_size = None
+    if "format" not in data:
+        if width <= 0 or height <= 0:
+            raise LayoutError("Legacy layout without screen resolution")
+        legacy_size = (width, height)
+
+    return Layout(
+        widgets=[_record_from_dict(w, legacy_size) for w in data["widgets"]],
+        screen_resolution=(width, height),
+        widget_version=str(data.get("version", "")),
+    )
+
+
+# ==================== msgpack 子集编解码 ====================
+
+
+def _pack(value: Any, out: bytearray) -> None:
+    if value is None:
+        out.append(0xC0)
+    elif value is True:
+        out.append(0xC3)
+    elif value is False:
+        out.append(0xC2)
+    elif isinstance(value, int):
+        if 0 <= value <= 0x7F:
+            out.append(value)
+        elif -32 <= value < 0:
+            out += struct.pack(">b", value)
+        else:
+            out += struct.pack(">Bq", 0xD3, value)
+    elif isinstance(value, float):
+        out += struct.pack(">Bd", 0xCB, value)
+    elif isinstance(value, str):
+        raw = value.encode("utf-8")
+        if len(raw) <= 31:
+            out.append(0xA0 | len(raw))
+        else:
+            out += struct.pack(">BI", 0xDB, len(raw))
+        out += raw
+    elif isinstance(value, (list, tuple)):
+        if len(value) <= 15:
+            out.append(0x90 | len(value))
+        else:
+            out += struct.pack(">BI", 0xDD, len(value))
+        for item in value:
+            _pack(item, out)
+    elif isinstance(value, dict):
+        if len(value) <= 15:
+            out.append(0x80 | len(value))
+        else:
+            out += struct.pack(">BI", 0xDF, len(value))
+        for k, v in value.items():
+            _pack(str(k), out)
+            _pack(v, out)
+    else:
+        raise LayoutError(f"Unsupported value type: {type(value).__name__}")
+
+
+def _unpack(data: bytes | memoryview, pos: int) -> tuple[Any, int]:
+    tag = data[pos]
+    pos += 1
+    if tag <= 0x7F:
+        return tag, pos
+    if tag >= 0xE0:
+        return tag - 0x100, pos
+    if 0xA0 <= tag <= 0xBF:
+        end = pos + (tag & 0x1F)
+        return bytes(data[pos:end]).decode("utf-8"), end
+    if 0x90 <= tag <= 0x9F:
+        return _unpack_array(data, pos, tag & 0x0F)
+    if 0x80 <= tag <= 0x8F:
+        return _unpack_map(data, pos, tag & 0x0F)
+    if tag == 0xC0:
+        return None, pos
+    if tag == 0xC2:
+        return False, pos
+    if tag == 0xC3:
+        return True, pos
+    if tag == 0xD3:
+        return struct.unpack_from(">q", data, pos)[0], pos + 8
+    if tag == 0xCB:
+        return struct.unpack_from(">d", data, pos)[0], pos + 8
+    if tag == 0xDB:
+        (length,) = struct.unpack_from(">I", data, pos)
+        pos += 4
+        return bytes(data[pos : pos + length]).decode("utf-8"), pos + length
+    if tag == 0xDD:
+        (length,) = struct.unpack_from(">I", data, pos)
+        return _unpack_array(data, pos + 4, length)
+    if tag == 0xDF:
+        (length,) = struct.unpack_from(">I", data, pos)
+        return _unpack_map(data, pos + 4, length)
+    raise LayoutError(f"Unknown type tag: {tag:#x}")
+
+
+def _unpack_array(data: bytes | memoryview, pos: int, length: int) -> tuple[list[Any], int]:
+    items: list[Any] = []
+    for _ in range(length):
+        item, pos = _unpack(data, pos)
+        items.append(item)
+    return items, pos
+
+
+def _unpack_map(data: bytes | memoryview, pos: int, length: int) -> tuple[dict[str, Any], int]:
+    result: dict[str, Any] = {}
+    for _ in range(length):
+        key, pos = _unpack(data, pos)
+        value, pos = _unpack(data, pos)
+        result[key] = value
+    return result, pos
+
+
+# ==================== 公共接口 ====================
+
+
+def encode_layout(layout: Layout) -> bytes:
+    """编码为二进制布局"""
+    out = bytearray(_HEADER.pack(LAYOUT_MAGIC, LAYOUT_FORMAT_VERSION))
+    _pack(layout_to_dict(layout), out)
+    return bytes(out)
+
+
+def decode_layout(data: bytes) -> Layout:
+    """解码二进制布局"""
+    if len(data) < _HEADER.size:
+        raise LayoutError("Layout file is truncated")
+    magic, version = _HEADER.unpack_from(data)
+    if magic != LAYOUT_MAGIC:
+        raise LayoutError("Not a layout file")
+    if version > LAYOUT_FORMAT_VERSION:
+        raise LayoutError(f"Unsupported layout format version: {version}")
+    try:
+        payload, _ = _unpack(memoryview(data), _HEADER.size)
+    except (IndexError, struct.error, UnicodeDecodeError) as e:
+        raise LayoutError(f"Corrupted layout file: {e}") from e
+    return layout_from_dict(payload)
+
+
+def export_json(layout: Layout) -> str:
+    return json.dumps(layout_to_dict(layout), indent=2, ensure_ascii=False)
+
+
+def import_json(text: str) -> Layout:
+    try:
+        return layout_from_dict(json.loads(text))
+    except json.JSONDecodeError as e:
+        raise LayoutError(f"Invalid JSON layout: {e}") from e
+
+
+def read_layout_file(path: str) -> Layout:
+    """根据文件头自动识别二进制或 JSON 格式"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data.startswith(LAYOUT_MAGIC):
+        return decode_layout(data)
+    return import_json(data.decode("utf-8"))
+
+
+def write_layout_file(path: str, layout: Layout) -> None:
+    """以 .json 结尾时导出 JSON，否则写入二进制格式"""
+    if path.endswith(".json"):
+        data = export_json(layout).encode("utf-8")
+    else:
+        data = encode_layout(layout)
+    with open(path, "wb") as f:
+        f.write(data)
+    logger.debug(f"Layout written to {path} ({len(data)} bytes)")
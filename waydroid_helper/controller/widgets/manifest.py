@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+组件清单
+构建时静态解析 components 目录下的模块源码，生成 组件类型 -> 元数据/模块路径 的清单，
+运行时据此按需导入组件模块，无需扫描和导入全部组件。
+
+只依赖标准库，meson 构建时直接以脚本方式运行:
+    python3 manifest.py <输出文件> <组件源文件>...
+"""
+
+import ast
+import json
+import os
+import sys
+from dataclasses import asdict, dataclass
+from gettext import gettext, pgettext
+from typing import Any
+
+MANIFEST_NAME = "widget_manifest.json"
+MANIFEST_VERSION = 1
+COMPONENTS_PACKAGE = "waydroid_helper.controller.widgets.components"
+# 第三方组件包通过该 entry point 分组注册，名称为组件类型，值为 "模块:类名"
+ENTRY_POINT_GROUP = "waydroid_helper.widgets"
+
+
+@dataclass
+class WidgetEntry:
+    """清单中的一个组件"""
+
+    type: str
+    class_name: str
+    module: str
+    # 可翻译文本保存为 {"context": ..., "msgid": ...}，运行时再翻译
+    name: dict[str, str]
+    description: dict[str, str]
+    allow_context_menu_creation: bool = True
+
+    def metadata(self) -> dict[str, Any]:
+        """与 WidgetFactory 原有元数据相同的结构"""
+        return {
+            "name": _translate(self.name) or self.class_name,
+            "description": _translate(self.description),
+            "class_name": self.class_name,
+            "module": self.module,
+            "allow_context_menu_creation": self.allow_context_menu_creation,
+        }
+
+
+def _translate(text: dict[str, str]) -> str:
+    msgid = text.get("msgid", "")
+    if not msgid:
+        return ""
+    context = text.get("context")
+    return pgettext(context, msgid) if context else gettext(msgid)
+
+
+def _literal_text(node: ast.expr) -> dict[str, str] | None:
+    """解析 "text" 或 pgettext("ctx", "text") 形式的类属性"""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return {"msgid": node.value}
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id in ("pgettext", "_", "gettext")
+    ):
+        args = [
+            arg.value
+            for arg in node.args
+            if isinstance(arg, ast.Constant) and isinstance(arg.value, str)
+        ]
+        if len(args) != len(node.args):
+            return None
+        if node.func.id == "pgettext" and len(args) == 2:
+            return {"context": args[0], "msgid": args[1]}
+        if len(args) == 1:
+            return {"msgid": args[0]}
+    return None
+
+
+def _text_attr(attrs: dict[str, ast.expr], name: str) -> dict[str, str]:
+    node = attrs.get(name)
+    return (_literal_text(node) if node is not None else None) or {}
+
+
+def _is_widget_class(node: ast.ClassDef, attrs: dict[str, ast.expr]) -> bool:
+    base_names = {base.id for base in node.bases if isinstance(base, ast.Name)}
+    return "BaseWidget" in base_names or "WIDGET_NAME" in attrs
+
+
+def scan_module(path: str, module: str) -> list[WidgetEntry]:
+    """静态解析一个组件模块，不导入它"""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    entries: list[WidgetEntry] = []
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        attrs: dict[str, ast.expr] = {}
+        for stmt in node.body:
+            if isinstance(stmt, ast.Assign):
+                for target in stmt.targets:
+                    if isinstance(target, ast.Name):
+                        attrs[target.id] = stmt.value
+        if not _is_widget_class(node, attrs):
+            continue
+
+        allow = attrs.get("ALLOW_CONTEXT_MENU_CREATION")
+        entries.append(
+            WidgetEntry(
+                type=node.name.lower(),
+                class_name=node.name,
+                module=module,
+                name=_text_attr(attrs, "WIDGET_NAME"),
+                description=_text_attr(attrs, "WIDGET_DESCRIPTION"),
+                allow_context_menu_creation=not (
+                    isinstance(allow, ast.Constant) and allow.value is False
+                ),
+            )
+        )
+    return entries
+
+
+def build_manifest(paths: list[str]) -> dict[str, Any]:
+    """从组件源文件生成清单"""
+    widgets: list[dict[str, Any]] = []
+    for path in sorted(paths):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        if stem.startswith("__"):
+            continue
+        for entry in scan_module(path, f"{COMPONENTS_PACKAGE}.{stem}"):
+            widgets.append(asdict(entry))
+    return {"version": MANIFEST_VERSION, "widgets": widgets}
+
+
+def _components_dir() -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "components")
+
+
+def load_manifest() -> list[WidgetEntry]:
+    """读取安装时生成的清单；源码树中运行时没有清单，直接静态解析组件目录"""
+    manifest_path = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), MANIFEST_NAME
+    )
+    data: dict[str, Any] | None = None
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != MANIFEST_VERSION:
+            data = None
+    except (OSError, ValueError, AttributeError):
+        data = None
+
+    if data is None:
+        components_dir = _components_dir()
+        data = build_manifest(
+            [
+                os.path.join(components_dir, name)
+                for name in os.listdir(components_dir)
+                if name.endswith(".py")
+            ]
+        )
+
+    return [WidgetEntry(**item) for item in data.get("widgets", [])]
+
+
+def main(argv: list[str]) -> int:
+    if len(argv) < 2:
+        sys.stderr.write(f"Usage: {argv[0]} <output> <component sources>...\n")
+        return 2
+    manifest = build_manifest(argv[2:])
+    with open(argv[1], "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
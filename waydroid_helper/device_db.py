@@ -0,0 +1,198 @@
+"""
+Device profile database used for device spoofing.
+
+``devices.json`` is compiled at build time into ``devices.idx``, a compact
+binary index that is memory-mapped at runtime. Property keys (and the many
+empty or repeated values) are interned once in a shared string table, and a
+name→offset table lets the page list every profile without decoding any
+properties. A profile's properties are only decoded when it is applied.
+
+Layout (little endian)::
+
+    header   magic "WHDB", u16 version, u16 reserved,
+             u32 device_count, u32 string_count
+    strings  string_count x (u32 offset, u32 length) into the blob
+    devices  device_count x (u32 name_sid, u32 record_offset)
+    records  per device: u32 prop_count, prop_count x (u32 key_sid, u32 value_sid)
+    blob     utf-8 bytes of all strings
+
+When no index is installed (e.g. running from the source tree) the JSON file
+is compiled in memory instead.
+
+Build the index with ``python3 device_db.py devices.json devices.idx``.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from dataclasses import dataclass
+
+MAGIC = b"WHDB"
+VERSION = 1
+HEADER = struct.Struct("<4sHHII")
+U32 = struct.Struct("<I")
+PAIR = struct.Struct("<II")
+
+BRAND_KEY = "ro.product.brand"
+MODEL_KEY = "ro.product.model"
+
+
+def compile_index(devices: list[dict]) -> bytes:
+    """Compile the ``devices`` list of devices.json into the binary index"""
+    strings: list[bytes] = []
+    sids: dict[str, int] = {}
+
+    def intern(text: str) -> int:
+        sid = sids.get(text)
+        if sid is None:
+            sid = sids[text] = len(strings)
+            strings.append(text.encode("utf-8"))
+        return sid
+
+    entries: list[tuple[int, list[tuple[int, int]]]] = []
+    for device in devices:
+        props = [(intern(k), intern(str(v))) for k, v in device["properties"].items()]
+        entries.append((intern(device["name"]), props))
+
+    string_table_size = len(strings) * PAIR.size
+    device_table_size = len(entries) * PAIR.size
+    records_start = HEADER.size + string_table_size + device_table_size
+
+    device_table = bytearray()
+    records = bytearray()
+    for name_sid, props in entries:
+        device_table += PAIR.pack(name_sid, records_start + len(records))
+        records += U32.pack(len(props))
+        for key_sid, value_sid in props:
+            records += PAIR.pack(key_sid, value_sid)
+
+    blob_start = records_start + len(records)
+    string_table = bytearray()
+    offset = blob_start
+    for data in strings:
+        string_table += PAIR.pack(offset, len(data))
+        offset += len(data)
+
+    header = HEADER.pack(MAGIC, VERSION, 0, len(entries), len(strings))
+    return b"".join((header, string_table, device_table, records, *strings))
+
+
+@dataclass(frozen=True)
+class DeviceMatch:
+    index: int
+    name: str
+    score: float
+
+
+class DeviceDB:
+    """Read-only view over a compiled device index"""
+
+    def __init__(self, data: bytes | mmap.mmap):
+        self._data: bytes | mmap.mmap = data
+        magic, version, _, self._count, self._string_count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a device index or unsupported version")
+        self._strings_at: int = HEADER.size
+        self._devices_at: int = self._strings_at + self._string_count * PAIR.size
+        self._string_cache: dict[int, str] = {}
+        self.names: list[str] = [
+            self._string(PAIR.unpack_from(data, self._devices_at + i * PAIR.size)[0])
+            for i in range(self._count)
+        ]
+        self._index: dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        self._search_keys: list[str] | None = None
+
+    @classmethod
+    def open(cls, data_dir: str) -> "DeviceDB":
+        """Map devices.idx from data_dir, or compile devices.json if no index exists"""
+        index_path = os.path.join(data_dir, "devices.idx")
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as f:
+                return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        with open(os.path.join(data_dir, "devices.json")) as f:
+            return cls(compile_index(json.load(f)["devices"]))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _string(self, sid: int) -> str:
+        # Interned ids make the cache effectively a per-key/value lookup table
+        text = self._string_cache.get(sid)
+        if text is None:
+            offset, length = PAIR.unpack_from(self._data, self._strings_at + sid * PAIR.size)
+            text = self._string_cache[sid] = bytes(self._data[offset : offset + length]).decode("utf-8")
+        return text
+
+    def index_of(self, name: str) -> int | None:
+        return self._index.get(name)
+
+    def properties(self, index: int) -> dict[str, str]:
+        """Decode the properties of one profile"""
+        _, offset = PAIR.unpack_from(self._data, self._devices_at + index * PAIR.size)
+        (count,) = U32.unpack_from(self._data, offset)
+        props: dict[str, str] = {}
+        for i in range(count):
+            key_sid, value_sid = PAIR.unpack_from(self._data, offset + U32.size + i * PAIR.size)
+            props[self._string(key_sid)] = self._string(value_sid)
+        return props
+
+    def _keys(self) -> list[str]:
+        if self._search_keys is None:
+            keys: list[str] = []
+            for i, name in enumerate(self.names):
+                props = self.properties(i)
+                keys.append(
+                    " ".join((name, props.get(BRAND_KEY, ""), props.get(MODEL_KEY, ""))).lower()
+                )
+            self._search_keys = keys
+        return self._search_keys
+
+    def search(self, query: str, limit: int = 20) -> list[DeviceMatch]:
+        """Fuzzy search over profile name, brand and model
+
+        Every query word must occur in order (as a subsequence) in the
+        profile; contiguous and earlier matches score higher.
+        """
+        words = query.lower().split()
+        if not words:
+            return [DeviceMatch(i, name, 0.0) for i, name in enumerate(self.names[:limit])]
+
+        matches: list[DeviceMatch] = []
+        for i, key in enumerate(self._keys()):
+            score = 0.0
+            for word in words:
+                word_score = _match_score(word, key)
+                if word_score is None:
+                    break
+                score += word_score
+            else:
+                matches.append(DeviceMatch(i, self.names[i], score))
+        matches.sort(key=lambda m: (-m.score, m.name))
+        return matches[:limit]
+
+
+def _match_score(word: str, text: str) -> float | None:
+    position = text.find(word)
+    if position >= 0:
+        # Substring match, best at the start of a word
+        at_word_start = position == 0 or text[position - 1] == " "
+        return 2.0 + (1.0 if at_word_start else 0.0) - position / (len(text) + 1)
+    # Subsequence match, penalised by how spread out it is
+    start = last = -1
+    for char in word:
+        last = text.find(char, last + 1)
+        if last < 0:
+            return None
+        if start < 0:
+            start = last
+    return len(word) / (last - start + 1)
+
+
+if __name__ == "__main__":
+    # python3 device_db.py devices.json devices.idx
+    with open(sys.argv[1]) as src:
+        index = compile_index(json.load(src)["devices"])
+    with open(sys.argv[2], "wb") as dst:
+        _ = dst.write(index)
@@ -72,6 +72,12 @@ class ExtensionsPage(Gtk.Box):
         self.extension_manager.connect(
             "installation-started", self.on_installation_started
         )
+        self.extension_manager.connect(
+            "download-progress", self.on_download_progress
+        )
+        self.extension_manager.connect(
+            "installation-output", self.on_installation_output
+        )
         self.extension_manager.connect(
             "installation-completed", self.on_installation_completed
         )
@@ -89,6 +95,20 @@ class ExtensionsPage(Gtk.Box):
             page = cast(AvailableVersionPage, nav_page)
             page.on_installation_started(obj, name, version)
 
+    def on_download_progress(
+        self, obj: GObject.Object, name: str, downloaded: int, total: int, rate: float
+    ):
+        nav_page: AvailableVersionPage = self._navigation_view.find_page(name)
+        if isinstance(nav_page, AvailableVersionPage):
+            page = cast(AvailableVersionPage, nav_page)
+            page.on_download_progress(obj, name, downloaded, total, rate)
+
+    def on_installation_output(self, obj: GObject.Object, name: str, line: str):
+        nav_page: AvailableVersionPage = self._navigation_view.find_page(name)
+        if isinstance(nav_page, AvailableVersionPage):
+            page = cast(AvailableVersionPage, nav_page)
+            page.on_installation_output(obj, name, line)
+
     def on_installation_completed(self, obj: GObject.Object, name: str, version: str):
         nav_page: AvailableVersionPage = self._navigation_view.find_page(name)
         if isinstance(nav_page, AvailableVersionPage):
@@ -58,9 +58,10 @@ class GpuComboRow(Adw.ComboRow):
     async def load_gpu_info(self):
         self.add_option(_("Default"), "")
         waydroid_cli_path = os.environ.get("WAYDROID_CLI_PATH")
-        result = await self._subprocess_manager.submit(
+        # GPU 列表在运行期间不会变化，所有实例共用一次查询结果
+        result = await self._subprocess_manager.query(
             command=f"{waydroid_cli_path} get_gpu_info", shell=False
-        ).get()
+        )
         # 解析 stdout，按 : 分割，加入 option
         if result and result["stdout"]:
             lines = result["stdout"].strip().splitlines()
@@ -6,7 +6,6 @@
 
 import dis
 from gettext import gettext as _
-import multiprocessing
 from typing import cast
 import asyncio
 import shutil
@@ -21,7 +20,7 @@ gi.require_version("Adw", "1")
 
 from gi.repository import Adw, GObject, Gtk
 
-from waydroid_helper.controller.app.window import create_keymapper
+from waydroid_helper.controller.app.keymapper_process import KeymapperLauncher
 from waydroid_helper.infobar import InfoBar
 from waydroid_helper.shared_folder import SharedFoldersWidget
 from waydroid_helper.util import Task, logger
@@ -34,9 +33,6 @@ from waydroid_helper.compat_widget import (
     ADW_VERSION,
 )
 from waydroid_helper.compat_widget.message_dialog import MessageDialog
-from waydroid_helper.props_page import PropsPage
-from waydroid_helper.extensions_page import ExtensionsPage
-from waydroid_helper.scripts_page import ScriptsPage
 import os
 from waydroid_helper.config.models import RootConfig
 
@@ -68,6 +64,7 @@ class InstanceDetailPage(NavigationPage):
         self.connect("notify::root", self._on_page_added_to_window)
 
         self.keymapper_proc = None
+        self.keymapper_launcher = KeymapperLauncher()
 
     def _ensure_pages_created(self):
         """延迟创建页面实例，只在需要时创建"""
@@ -79,6 +76,11 @@ class InstanceDetailPage(NavigationPage):
         from gi.repository import GLib
 
         def create_pages():
+            # 这些页面依赖 Vte、httpx 等较重的模块，首帧之后再导入
+            from waydroid_helper.extensions_page import ExtensionsPage
+            from waydroid_helper.props_page import PropsPage
+            from waydroid_helper.scripts_page import ScriptsPage
+
             self._props_page = PropsPage(self.waydroid)
             self._extensions_page = ExtensionsPage(
                 self.waydroid, navigation_view=self._navigation_view
@@ -93,15 +95,22 @@ class InstanceDetailPage(NavigationPage):
 
     def _on_page_added_to_window(self, widget, param):
         if self.get_root() and not self._pages_created:
-            from gi.repository import GLib
+            from waydroid_helper.util import startup_trace
 
-            GLib.timeout_add(200, self._start_preload)
+            # 首帧绘制完成后再创建页面，页面随数据加载逐步就绪
+            startup_trace.after_first_frame(self, self._start_preload)
 
     def _start_preload(self):
         if not self._pages_created:
             self._ensure_pages_created()
         return False
 
+    def _on_key_mapping_row_entered(self, *args):
+        # 指针移到或焦点进入按键映射一行时才预热进程，点击打开时无需再等待导入；
+        # 从不使用按键映射的用户不会多出一个解释器
+        if self.keymapper_proc is None:
+            self.keymapper_launcher.prewarm()
+
     def _add_placeholder_pages(self):
         from waydroid_helper.compat_widget import Spinner
 
@@ -390,6 +399,13 @@ class InstanceDetailPage(NavigationPage):
         key_mapping_row.add_suffix(button_box)
         group.add(key_mapping_row)
 
+        motion = Gtk.EventControllerMotion.new()
+        motion.connect("enter", self._on_key_mapping_row_entered)
+        key_mapping_row.add_controller(motion)
+        focus = Gtk.EventControllerFocus.new()
+        focus.connect("enter", self._on_key_mapping_row_entered)
+        key_mapping_row.add_controller(focus)
+
         return group
 
     def set_app(self, app: Gtk.Application):
@@ -593,9 +609,7 @@ class InstanceDetailPage(NavigationPage):
                     display_name = self.config.cage.socket_name
                 else:
                     display_name = self.get_display().get_name()
-                self.keymapper_proc = multiprocessing.get_context('spawn').Process(target=create_keymapper,
-                                                                    args=(display_name,), name=f"KeyMapper-{display_name}")
-                self.keymapper_proc.start()
+                self.keymapper_proc = self.keymapper_launcher.attach(display_name)
 
                 async def watch_process(p):
                     loop = asyncio.get_running_loop()
@@ -39,6 +39,7 @@ class KeyMappingPreferenceDialog(Dialog):
         self.socket_name_entry: Gtk.Entry
         self.hide_titlebar_switch: Gtk.Switch
         self.confine_pointer_switch: Gtk.Switch
+        self.uhid_input_switch: Gtk.Switch
 
         self._setup_ui()
         self._setup_signals()
@@ -90,8 +91,33 @@ class KeyMappingPreferenceDialog(Dialog):
         cage_group = self._create_cage_group()
         preferences_page.add(cage_group)
 
+        # 输入设置组
+        input_group = self._create_input_group()
+        preferences_page.add(input_group)
+
         return preferences_page
 
+    def _create_input_group(self):
+        """创建输入设置组"""
+        group = Adw.PreferencesGroup.new()
+        group.set_title(_("Input Settings"))
+
+        # UHID 虚拟键盘
+        uhid_input_row = Adw.ActionRow.new()
+        uhid_input_row.set_title(_("Virtual HID Keyboard"))
+        uhid_input_row.set_subtitle(
+            _("Send keyboard input as HID reports instead of injected events")
+        )
+
+        self.uhid_input_switch = Gtk.Switch.new()
+        self.uhid_input_switch.set_valign(Gtk.Align.CENTER)
+        uhid_input_row.add_suffix(self.uhid_input_switch)
+        uhid_input_row.set_activatable_widget(self.uhid_input_switch)
+
+        group.add(uhid_input_row)
+
+        return group
+
     def _create_cage_group(self):
         """创建 Cage 设置组"""
         group = Adw.PreferencesGroup.new()
@@ -463,6 +489,13 @@ class KeyMappingPreferenceDialog(Dialog):
             GObject.BindingFlags.SYNC_CREATE | GObject.BindingFlags.BIDIRECTIONAL,
         )
 
+        self.config.key_mapping.bind_property(
+            "uhid_input",
+            self.uhid_input_switch,
+            "active",
+            GObject.BindingFlags.SYNC_CREATE | GObject.BindingFlags.BIDIRECTIONAL,
+        )
+
     def _setup_close_handlers(self):
         # 根据 ADW 版本选择正确的信号
         if ADW_VERSION >= (1, 5, 0):
@@ -7,14 +7,13 @@ import os
 import asyncio
 from typing import Callable
 
+from waydroid_helper.util import startup_trace
+
 import gi
 
 gi.require_version("Gtk", "4.0")
 gi.require_version("Adw", "1")
 
-
-Adw.init()
-
 GLIB_VERSION = GLib.MAJOR_VERSION, GLib.MINOR_VERSION, GLib.MICRO_VERSION
 
 if GLIB_VERSION >= (2, 74, 0):
@@ -40,6 +39,15 @@ class WaydroidHelperApplication(Adw.Application):
             "Set the logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)",
             "LEVEL",
         )
+        # 由启动脚本解析并写入 WAYDROID_HELPER_STARTUP_TRACE，这里只需让 GApplication 接受该选项
+        self.add_main_option(
+            "startup-trace",
+            0,
+            GLib.OptionFlags.NONE,
+            GLib.OptionArg.FILENAME,
+            "Write a Chrome trace of the startup to FILE",
+            "FILE",
+        )
 
         self.create_action(
             "quit",
@@ -84,7 +92,13 @@ class WaydroidHelperApplication(Adw.Application):
 
                 self.logger = logger
                 win = WaydroidHelperWindow(application=self)
-            win.present()
+                startup_trace.mark("window")
+                win.present()
+                startup_trace.after_first_frame(
+                    win, lambda: startup_trace.mark("first-frame")
+                )
+            else:
+                win.present()
 
     def on_about_action(self, widget: Gtk.Widget, _: GObject.Object):
         """Callback for the app.about action."""
@@ -96,9 +110,35 @@ class WaydroidHelperApplication(Adw.Application):
             version=self.version,
             developers=["rikka"],
             copyright="© 2024 rikka",
+            debug_info=self._subprocess_debug_info(),
         )
         about.present()
 
+    def _subprocess_debug_info(self) -> str:
+        """子进程各并发池的统计，显示在关于窗口的调试信息中"""
+        from waydroid_helper.util import SubprocessManager
+
+        lines = ["Subprocess pools (avg queue / spawn / runtime):"]
+        for pool, stats in SubprocessManager().get_stats().items():
+            lines.append(
+                f"  {pool}: {stats['jobs']:.0f} jobs, {stats['running']:.0f} running, "
+                f"{stats['failed']:.0f} failed, "
+                f"{stats['queue_wait_ms']:.1f} / {stats['spawn_ms']:.1f} / "
+                f"{stats['runtime_ms']:.1f} ms"
+            )
+        slowest = sorted(
+            (m for m in SubprocessManager().get_metrics() if m.finished),
+            key=lambda m: m.runtime or 0.0,
+            reverse=True,
+        )[:5]
+        if slowest:
+            lines.append("Slowest recent commands:")
+            lines.extend(
+                f"  {(m.runtime or 0.0) * 1000:.0f} ms [{m.returncode}] {m.key}"
+                for m in slowest
+            )
+        return "\n".join(lines)
+
     def on_preferences_action(self, widget: Gtk.Widget, _: GObject.Object):
         """Callback for the app.preferences action."""
         self.logger.info("app.preferences action activated")
@@ -128,6 +168,15 @@ class WaydroidHelperApplication(Adw.Application):
         sys.stderr.write("Application is shutting down...\n")
 
         try:
+            # 启动未完成就退出时也写出已记录的启动轨迹
+            startup_trace.dump()
+
+            # 先让预热的按键映射进程正常退出
+            from waydroid_helper.controller.app.keymapper_process import (
+                shutdown_launchers,
+            )
+            shutdown_launchers()
+
             # 清理所有multiprocessing子进程（主要是KeyMapper等）
             self._cleanup_child_processes()
 
@@ -190,6 +239,9 @@ class WaydroidHelperApplication(Adw.Application):
 
 def main(version: str):
     """The application's entry point."""
+    startup_trace.mark("import")
+    # Initialise libadwaita only when the GUI actually starts, not on import
+    Adw.init()
     asyncio.set_event_loop_policy(
         GLibEventLoopPolicy()  # pyright:ignore[reportUnknownArgumentType]
     )
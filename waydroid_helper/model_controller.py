@@ -9,11 +9,14 @@ and SDK layer, providing a clean interface for the view layer.
 """
 
 import asyncio
+import os
 from typing import Any
 
 from gi.repository import GLib, GObject
 
-from waydroid_helper.util import Task, logger
+from waydroid_helper.util import Task, logger, startup_trace
+from waydroid_helper.util.task_graph import TaskGraph
+from waydroid_helper.util.session_watcher import SessionWatcher
 from waydroid_helper.models import (
     PropertyCategory,
     PropertyModel,
@@ -21,7 +24,24 @@ from waydroid_helper.models import (
     ModelState,
     SessionState,
 )
-from waydroid_helper.sdk import WaydroidSDK, PropertyManager, ConfigManager
+from waydroid_helper.sdk import (
+    WAYDROID_CONFIG_PATH,
+    ConfigManager,
+    PropertyManager,
+    WaydroidSDK,
+)
+
+# Session state normally comes from SessionWatcher events; polling only
+# catches anything the watcher misses (e.g. no D-Bus access)
+FALLBACK_POLL_SECONDS = 30
+# Used instead when no event source could be set up
+NO_WATCHER_POLL_SECONDS = 2
+# sys.boot_completed has no change notification, so it is polled while
+# the session is running but Android has not finished booting
+BOOT_POLL_SECONDS = 2
+# Persist property edits are merged and written in one batch once no new
+# edit has arrived for this long
+PERSIST_WRITE_DELAY_MS = 500
 
 
 class ModelController(GObject.Object):
@@ -51,6 +71,13 @@ class ModelController(GObject.Object):
         self._task = Task()
         self._status_update_lock = asyncio.Lock()
         self._monitoring_started = False
+        self._session_watcher = SessionWatcher(self._on_session_event)
+        self._boot_poll_source = 0
+
+        # Write-behind queue for persist properties
+        self._persist_dirty: set[str] = set()
+        self._persist_flush_source = 0
+        self._persist_write_lock = asyncio.Lock()
 
         # Defer async initialization until event loop is available
         GLib.idle_add(self._start_status_monitoring)
@@ -65,34 +92,102 @@ class ModelController(GObject.Object):
         # Initial status check
         self._task.create_task(self._initial_status_check())
 
-        # Schedule periodic updates every 2 seconds
-        GLib.timeout_add_seconds(2, self._schedule_status_update)
+        self._session_watcher.start()
+        if self._session_watcher.active:
+            interval = FALLBACK_POLL_SECONDS
+        else:
+            logger.warning("No session event source available, polling waydroid status")
+            interval = NO_WATCHER_POLL_SECONDS
 
-        # Schedule periodic ERROR state recovery checks every 10 seconds
-        GLib.timeout_add_seconds(10, self._schedule_error_recovery)
+        # Slow fallback poll; each status update also retries properties in ERROR state
+        GLib.timeout_add_seconds(interval, self._schedule_status_update)
 
         return False  # Don't repeat this idle callback
 
+    def _on_session_event(self, reason: str):
+        """Session may have changed: re-check without waiting for the poll"""
+        logger.debug(f"Session event: {reason}")
+        self.waydroid_sdk.invalidate_session_status()
+        self._task.create_task(self._update_session_status())
+
+    def _update_boot_polling(self, state: SessionState):
+        """Poll boot-completed only while Android is booting"""
+        booting = state == SessionState.RUNNING and not self.property_model.get_property(
+            "boot-completed"
+        )
+        if booting and not self._boot_poll_source:
+            self._boot_poll_source = GLib.timeout_add_seconds(
+                BOOT_POLL_SECONDS, self._poll_boot_completed
+            )
+        elif not booting and self._boot_poll_source:
+            GLib.source_remove(self._boot_poll_source)
+            self._boot_poll_source = 0
+
+    def _poll_boot_completed(self) -> bool:
+        self._task.create_task(self._refresh_boot_completed())
+        return True
+
+    async def _refresh_boot_completed(self):
+        _ = await self.refresh_persist_property("boot-completed")
+        self._update_boot_polling(self.session_model.get_property("state"))
+
     async def _initial_status_check(self):
-        """Initial status check with forced property loading"""
-        try:
-            current_state = await self.waydroid_sdk.get_session_status()
+        """Initial status check with forced property loading
 
-            # Set initial session state
-            self.session_model.set_session_state(current_state)
+        The config-backed loads only need an initialized Waydroid (i.e. an
+        existing waydroid.cfg), not the session status, so they run alongside
+        ``waydroid status``; only the persist properties wait for it. Each
+        model goes READY as soon as its own step finishes, so pages fill in as
+        data arrives instead of after the slowest load.
+        """
+        initialized = os.path.exists(WAYDROID_CONFIG_PATH)
 
-            # Force load privileged and waydroid properties if waydroid is initialized
-            if current_state in (SessionState.STOPPED, SessionState.RUNNING):
-                await self._load_privileged_properties()
-                await self._load_waydroid_properties()
-                await self._load_android_version()
+        async def load_status() -> SessionState | bool:
+            try:
+                state = await self.waydroid_sdk.get_session_status()
+            except Exception as e:
+                logger.error(f"Failed initial status check: {e}")
+                return False
+            self.session_model.set_session_state(state)
+            return state
 
-            # Load persist properties if session is running
-            if current_state == SessionState.RUNNING:
-                await self._load_persist_properties()
+        async def load_config_properties(load) -> bool:
+            if not initialized:
+                return False
+            await load()
+            return True
 
-        except Exception as e:
-            logger.error(f"Failed initial status check: {e}")
+        async def load_persist() -> bool:
+            if graph.results["status"] != SessionState.RUNNING:
+                return False
+            await self._load_persist_properties()
+            return True
+
+        graph = TaskGraph("startup")
+        # A failed status check must not cancel the config-backed loads
+        graph.add("status", load_status, required=False)
+        graph.add(
+            "privileged",
+            lambda: load_config_properties(self._load_privileged_properties),
+            required=False,
+        )
+        graph.add(
+            "waydroid",
+            lambda: load_config_properties(self._load_waydroid_properties),
+            required=False,
+        )
+        graph.add(
+            "android_version",
+            lambda: load_config_properties(self._load_android_version),
+            required=False,
+        )
+        graph.add("persist", load_persist, deps=("status",), required=False)
+
+        try:
+            _ = await graph.run()
+        finally:
+            startup_trace.add_timings(graph.name, graph.timings)
+            startup_trace.mark("data-ready")
 
     def _schedule_status_update(self) -> bool:
         """Schedule a status update task"""
@@ -100,12 +195,6 @@ class ModelController(GObject.Object):
         asyncio.create_task(self._update_session_status())
         return True  # Continue the timeout
 
-    def _schedule_error_recovery(self) -> bool:
-        """Schedule an error recovery check"""
-        # self._task.create_task(self._handle_error_state_recovery())
-        asyncio.create_task(self._handle_error_state_recovery())
-        return True  # Continue the timeout
-
     async def _update_session_status(self):
         """Update session status and load properties if needed"""
         async with self._status_update_lock:
@@ -123,6 +212,7 @@ class ModelController(GObject.Object):
                 self.session_model.set_session_state(new_state)
 
                 _ = await self.refresh_persist_property("boot-completed")
+                self._update_boot_polling(new_state)
 
                 # Handle state transitions
                 await self._handle_session_state_transition(old_state, new_state)
@@ -282,6 +372,16 @@ class ModelController(GObject.Object):
             logger.info("Attempting to recover from waydroid properties ERROR state")
             await self._load_waydroid_properties_with_retry(max_retries=2)
 
+        # A failed persist write leaves the model out of sync, re-read it
+        persist_state = self.property_model.get_property("state")
+        session_state = self.session_model.get_property("state")
+        if persist_state == ModelState.ERROR and session_state == SessionState.RUNNING:
+            logger.info("Attempting to recover from persist properties ERROR state")
+            try:
+                await self._load_persist_properties()
+            except Exception:
+                pass
+
     async def _load_android_version(self):
         """Load Android version from config"""
         try:
@@ -305,12 +405,53 @@ class ModelController(GObject.Object):
             logger.error(f"Failed to save persist property {property_name}: {e}")
             return False
 
+    def queue_persist_property(
+        self, property_name: str, delay_ms: int = PERSIST_WRITE_DELAY_MS
+    ):
+        """Schedule a persist property to be written with the next batch
+
+        Every queued edit restarts the delay, so a burst of edits across any
+        number of properties results in a single bulk write.
+        """
+        self._persist_dirty.add(property_name)
+        if self._persist_flush_source:
+            GLib.source_remove(self._persist_flush_source)
+        self._persist_flush_source = GLib.timeout_add(
+            delay_ms, self._on_persist_flush_timeout
+        )
+
+    def _on_persist_flush_timeout(self) -> bool:
+        self._persist_flush_source = 0
+        self._task.create_task(self.flush_persist_properties())
+        return False
+
+    async def flush_persist_properties(self) -> bool:
+        """Write all queued persist properties in one batch"""
+        async with self._persist_write_lock:
+            if not self._persist_dirty:
+                return True
+            names, self._persist_dirty = self._persist_dirty, set()
+            try:
+                # Values are read now, so only the latest edit of each property is written
+                batch = {
+                    self.property_model.find_property(name).get_nick(): self.property_model.get_property_raw_value(name)
+                    for name in names
+                }
+                logger.info(f"Saving persist properties {batch}")
+                success = await self.property_manager.set_persist_properties(batch)
+            except Exception as e:
+                logger.error(f"Failed to save persist properties {names}: {e}")
+                success = False
+            if not success:
+                self.property_model.set_property("state", ModelState.ERROR)
+            return success
+
     async def refresh_persist_property(self, property_name: str) -> bool:
         """Refresh a single persist property from Waydroid"""
         try:
             # Get current value from Waydroid
             nick = self.property_model.find_property(property_name).get_nick()
-            raw_value = await self.property_manager.get_persist_property(nick)
+            raw_value = await self.property_manager.get_persist_property(nick, fresh=True)
 
             self.property_model.set_property_raw_value(property_name, raw_value)
 
@@ -321,7 +462,15 @@ class ModelController(GObject.Object):
             logger.error(f"Failed to refresh persist property {property_name}: {e}")
             return False
 
-    async def save_all_privileged_properties(self) -> bool:
+    async def _save_config(self, upgrade: bool) -> bool:
+        """Write pending config edits; with upgrade, apply them in the same privileged call"""
+        success = await self.config_manager.save_config(upgrade=upgrade)
+        if success and upgrade:
+            await self._load_privileged_properties_with_retry()
+            await self._load_waydroid_properties_with_retry()
+        return success
+
+    async def save_all_privileged_properties(self, upgrade: bool = False) -> bool:
         """Save all privileged properties to config file"""
         try:
             # Prepare all privileged properties for saving
@@ -337,9 +486,7 @@ class ModelController(GObject.Object):
             self.config_manager.set_multiple_privileged_properties(properties_to_save)
 
             # Save config file
-            success = await self.config_manager.save_config()
-
-            return success
+            return await self._save_config(upgrade)
 
         except Exception as e:
             logger.error(f"Failed to save privileged properties: {e}")
@@ -354,21 +501,15 @@ class ModelController(GObject.Object):
             # Reset in model
             self.property_model.reset_to_defaults(PropertyCategory.PERSIST)
 
-            # Save all persist properties
-            tasks = []
-            for prop in persist_props:
-                task = self.save_persist_property(prop.get_name())
-                tasks.append(task)
-
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            # Save all persist properties in one batch
+            properties_to_save = {
+                prop.get_nick(): self.property_model.get_property_raw_value(prop.get_name())
+                for prop in persist_props
+            }
+            success = await self.property_manager.set_persist_properties(properties_to_save)
             self.property_model.set_property("state", ModelState.READY)
 
-            # Check if all succeeded
-            return all(
-                result is True
-                for result in results
-                if not isinstance(result, Exception)
-            )
+            return success
 
         except Exception as e:
             logger.error(f"Failed to reset persist properties: {e}")
@@ -385,9 +526,9 @@ class ModelController(GObject.Object):
             for prop in props:
                 self.config_manager.set_privileged_property(prop.get_nick(), "")
 
-            success = await self.config_manager.save_config()
+            success = await self._save_config(upgrade=True)
             if success:
-                return await self.upgrade(offline=True)
+                return True
 
             self.property_model.set_property("privileged-state", ModelState.READY)
             return success
@@ -397,7 +538,7 @@ class ModelController(GObject.Object):
             self.property_model.set_property("privileged-state", ModelState.ERROR)
             return False
 
-    async def save_all_waydroid_properties(self) -> bool:
+    async def save_all_waydroid_properties(self, upgrade: bool = False) -> bool:
         """Save all waydroid config properties to [waydroid] section"""
         try:
             # Prepare all waydroid properties for saving
@@ -413,7 +554,7 @@ class ModelController(GObject.Object):
             self.config_manager.set_multiple_waydroid_properties(properties_to_save)
 
             # Save config file
-            success = await self.config_manager.save_config()
+            success = await self._save_config(upgrade)
 
             if success:
                 # Trigger restart container to apply changes
@@ -438,9 +579,9 @@ class ModelController(GObject.Object):
                 raw_value = self.property_model.get_property_raw_value(prop.get_name())
                 self.config_manager.set_waydroid_property(nick, raw_value)
 
-            success = await self.config_manager.save_config()
+            success = await self._save_config(upgrade=True)
             if success:
-                return await self.upgrade(offline=True)
+                return True
 
             self.property_model.set_property("waydroid-state", ModelState.READY)
             return success
@@ -497,11 +638,16 @@ class ModelController(GObject.Object):
     async def set_device_info(self, device_properties: dict[str, Any]) -> bool:
         """Set device information properties"""
         try:
-            # Update model
-            for prop_name, value in device_properties.items():
-                # Convert property names (e.g., "ro.product.brand" -> "ro_product_brand")
-                model_prop_name = prop_name.replace(".", "_")
-                _ = self.property_model.set_property_raw_value(model_prop_name, value)
+            # Update model as one transaction: notifications are emitted once,
+            # after every property of the profile has been set
+            self.property_model.freeze_notify()
+            try:
+                for prop_name, value in device_properties.items():
+                    # Convert property names (e.g., "ro.product.brand" -> "ro_product_brand")
+                    model_prop_name = prop_name.replace(".", "_")
+                    _ = self.property_model.set_property_raw_value(model_prop_name, value)
+            finally:
+                self.property_model.thaw_notify()
             self.config_manager.set_multiple_privileged_properties(device_properties)
             return True
 
@@ -509,35 +655,35 @@ class ModelController(GObject.Object):
             logger.error(f"Failed to set device info: {e}")
             return False
 
-    async def set_extension_properties(self, properties: dict[str, Any]) -> bool:
+    async def set_extension_properties(self, properties: dict[str, Any], upgrade: bool = False) -> bool:
         """Set extension properties"""
         try:
             # Set properties in config
             self.config_manager.set_multiple_privileged_properties(properties)
 
-            success = await self.config_manager.save_config()
-
-            return success
+            return await self._save_config(upgrade)
 
         except Exception as e:
             logger.error(f"Failed to set extension properties: {e}")
             return False
 
-    async def remove_extension_properties(self, property_keys: list[str]) -> bool:
+    async def remove_extension_properties(self, property_keys: list[str], upgrade: bool = False) -> bool:
         """Remove extension properties"""
         try:
             # Remove properties from config
             empty_properties = {key: "" for key in property_keys}
             self.config_manager.set_multiple_privileged_properties(empty_properties)
 
-            success = await self.config_manager.save_config()
-
-            return success
+            return await self._save_config(upgrade)
 
         except Exception as e:
             logger.error(f"Failed to remove extension properties: {e}")
             return False
 
+    async def get_build_props(self, prefix: str = "ro.") -> dict[str, str]:
+        """Get build.prop entries of the current system image"""
+        return await self.config_manager.get_build_props(prefix)
+
     # Session management
 
     async def start_session(self) -> bool:
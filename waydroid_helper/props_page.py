@@ -5,17 +5,17 @@
 # pyright: reportUnknownParameterType=false
 
 import asyncio
-from typing import Any, Callable
+from typing import Callable
 
 import gi
 
+from waydroid_helper.device_db import DeviceDB
 from waydroid_helper.gpu_combo_row import GpuComboRow
 from waydroid_helper.models import _get_valid_images_path
 
 gi.require_version("Gtk", "4.0")
 gi.require_version("Adw", "1")
 
-import json
 import os
 import stat
 from functools import partial
@@ -32,7 +32,6 @@ from waydroid_helper.waydroid import PropsState, Waydroid
 class PropsPage(Gtk.Box):
     __gtype_name__: str = "PropsPage"
 
-    items: dict[Any, Any] = dict()
 
     switch_1: Gtk.Switch = Gtk.Template.Child()
     switch_2: Gtk.Switch = Gtk.Template.Child()
@@ -47,6 +46,7 @@ class PropsPage(Gtk.Box):
     entry_6: Gtk.Entry = Gtk.Template.Child()
     switch_21: Gtk.Switch = Gtk.Template.Child()
     device_combo: Adw.ComboRow = Gtk.Template.Child()
+    device_search: Adw.EntryRow = Gtk.Template.Child()
     waydroid_switch_1: Gtk.Switch = Gtk.Template.Child()
     waydroid_switch_2: Gtk.Switch = Gtk.Template.Child()
     waydroid_entry_1: Gtk.Entry = Gtk.Template.Child()
@@ -60,7 +60,6 @@ class PropsPage(Gtk.Box):
     reset_privileged_prop_btn: Gtk.Button = Gtk.Template.Child()
     reset_waydroid_prop_btn: Gtk.Button = Gtk.Template.Child()
 
-    timeout_id: dict[Any, Any] = dict()
     _task: Task = Task()
 
     # Removed complex signal management - no longer needed with new architecture!
@@ -73,8 +72,11 @@ class PropsPage(Gtk.Box):
         )
         data_dir = os.getenv("PKGDATADIR", default_dir)
 
-        with open(os.path.join(data_dir, "data", "devices.json")) as f:
-            self.items = json.load(f)
+        # 设备数据库在后台线程打开，页面不必等待
+        self.devices: DeviceDB | None = None
+        self._devices_task: asyncio.Task[DeviceDB] = asyncio.create_task(
+            asyncio.to_thread(DeviceDB.open, os.path.join(data_dir, "data"))
+        )
 
         self.set_property("waydroid", waydroid)
         self._init_bindings()
@@ -118,8 +120,6 @@ class PropsPage(Gtk.Box):
             ok_callback=partial(self.on_apply_waydroid_button_clicked, upgrade=True),
         )
 
-        model = Gtk.StringList.new(strings=list(self.items["index"].keys()))
-        self.device_combo.set_model(model=model)
         self._model_changed: bool = False
         self._brand_changed: bool = False
 
@@ -222,12 +222,10 @@ class PropsPage(Gtk.Box):
                 case _:
                     current = ""
 
-            if device == current:
+            if device == current or self.devices is None:
                 return
-            if device in self.items["index"].keys():
-                self.device_combo.set_selected(self.items["index"][device])
-            else:
-                self.device_combo.set_selected(0)
+            index = self.devices.index_of(device)
+            self.device_combo.set_selected(index if index is not None else 0)
 
         def on_adw_combo_row_selected_item(
             comborow: Adw.ComboRow, GParamObject: GObject.ParamSpec
@@ -246,19 +244,44 @@ class PropsPage(Gtk.Box):
                     logger.info("No device selected")
                     return
                 case Gtk.StringObject() as selected_item:
+                    if self.devices is None:
+                        return
+                    index = self.devices.index_of(selected_item.get_string())
+                    if index is None:
+                        return
                     self.waydroid.privileged_props.set_device_info(
-                        self.items["devices"][
-                            self.items["index"][selected_item.get_string()]
-                        ]["properties"]
+                        self.devices.properties(index)
                     )
                 case _:
                     return
 
+        # 回车时选中模糊搜索（品牌、型号）得分最高的设备
+        def on_device_search_activated(entry: Adw.EntryRow):
+            query = entry.get_text().strip()
+            if self.devices is None or not query:
+                return
+            matches = self.devices.search(query, limit=1)
+            if not matches:
+                entry.add_css_class("error")
+                return
+            self.device_combo.set_selected(matches[0].index)
+
+        def on_device_search_changed(entry: Adw.EntryRow):
+            entry.remove_css_class("error")
+
         async def init_device_combo_row():
             nonlocal update_device_combo_row
+            try:
+                self.devices = await self._devices_task
+            except (OSError, ValueError) as e:
+                logger.error(f"Failed to load device database: {e}")
+                return
+            self.device_combo.set_model(model=Gtk.StringList.new(strings=self.devices.names))
             self.device_combo.connect(
                 "notify::selected-item", on_adw_combo_row_selected_item
             )
+            self.device_search.connect("entry-activated", on_device_search_activated)
+            self.device_search.connect("changed", on_device_search_changed)
             update_device_combo_row = True
             on_device_info_changed()
             update_device_combo_row = False
@@ -604,14 +627,6 @@ class PropsPage(Gtk.Box):
         # Show notification for waydroid config changes
         self.set_reveal(self.save_waydroid_notification, True)
 
-    def __on_persist_text_changed(self, entry: Gtk.Entry, name: str):
-        # new_value = entry.get_text()
-
-        # self.waydroid._controller.property_model.set_property(name, new_value)
-
-        _ = self._task.create_task(self.waydroid.save_persist_prop(name))
-        self.timeout_id[name] = None
-
     def on_persist_text_changed(
         self, a: Gtk.Entry, b: GObject.ParamSpec, name: str, flag: bool = False
     ):
@@ -620,12 +635,8 @@ class PropsPage(Gtk.Box):
         if self.waydroid.persist_props.get_property("state") != PropsState.READY:
             return
 
-        if self.timeout_id.get(name) is not None:
-            GLib.source_remove(self.timeout_id[name])
-
-        self.timeout_id[name] = GLib.timeout_add(
-            1000, partial(self.__on_persist_text_changed, a, name)
-        )
+        # Give typing a longer quiet period before the batched write
+        self.waydroid.queue_persist_prop(name, delay_ms=1000)
         if flag:
             self.set_reveal(self.save_notification, True)
 
@@ -638,7 +649,7 @@ class PropsPage(Gtk.Box):
         # self.waydroid._controller.property_model.set_property(name, new_value)
 
         self.set_reveal(self.save_notification, True)
-        self._task.create_task(self.waydroid.save_persist_prop(name))
+        self.waydroid.queue_persist_prop(name)
 
     # def on_cancel_button_clicked(self, button):
     #     self.set_reveal(self.save_notification, False)
@@ -11,15 +11,29 @@ managing state or emitting events. It's a pure interface to Waydroid functionali
 import asyncio
 import configparser
 import copy
+import json
 import os
 from typing import Any, Dict, List, Optional, Tuple
 
-from gi.repository import GLib
+from gi.repository import Gio, GLib
 from gi.repository.GObject import ParamSpec
 
 from waydroid_helper.util import SubprocessError, SubprocessManager, logger
+from waydroid_helper.util.build_prop import BuildPropIndex
+from waydroid_helper.util.subprocess_manager import command_text
 from waydroid_helper.models import SessionState
 
+# Status polling and pages loading at the same time share one `waydroid status`
+STATUS_CACHE_TTL = 1.0
+# Persist props are only changed through this app (invalidated on set) and
+# are also invalidated whenever the session state changes
+PROP_CACHE_TTL = 30.0
+WAYDROID_CONFIG_PATH = "/var/lib/waydroid/waydroid.cfg"
+# Reads and writes whole batches of props in one process, see the script
+PROP_SERVICE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "tools", "prop_service.py"
+)
+
 class WaydroidSDK:
     """
     Pure Waydroid SDK that handles session management.
@@ -32,21 +46,38 @@ class WaydroidSDK:
     
     def __init__(self):
         self._subprocess = SubprocessManager()
+        self._last_state: SessionState | None = None
+    
+    def _invalidate_session_queries(self):
+        self._subprocess.invalidate(tag="session")
+        self._subprocess.invalidate(tag="props")
+    
+    def invalidate_session_status(self):
+        """Drop the cached status so the next check runs `waydroid status`"""
+        self._subprocess.invalidate(tag="session")
     
     async def get_session_status(self) -> SessionState:
         """Get current Waydroid session status"""
         try:
-            result = await self._subprocess.submit("waydroid status", shell=False).get()
+            result = await self._subprocess.query(
+                ["waydroid", "status"], ttl=STATUS_CACHE_TTL, tag="session"
+            )
             output = result["stdout"]
             
             if "WayDroid is not initialized" in output:
-                return SessionState.UNINITIALIZED
+                state = SessionState.UNINITIALIZED
             elif "Session:\tRUNNING" in output:
-                return SessionState.RUNNING
+                state = SessionState.RUNNING
             elif "Session:\tSTOPPED" in output:
-                return SessionState.STOPPED
+                state = SessionState.STOPPED
             else:
-                return SessionState.LOADING
+                state = SessionState.LOADING
+            
+            if self._last_state is not None and state != self._last_state:
+                # Session was started or stopped elsewhere, props must be re-read
+                self._subprocess.invalidate(tag="props")
+            self._last_state = state
+            return state
                 
         except SubprocessError as e:
             logger.error(f"Failed to get Waydroid status: {e}")
@@ -56,9 +87,10 @@ class WaydroidSDK:
         """Start Waydroid session"""
         try:
             if wait:
-                await self._subprocess.submit("waydroid session start", flag=True, shell=False).get()
+                await self._subprocess.submit("waydroid session start", flag=True, shell=False, long_running=True).get()
             else:
                 await self._subprocess.start("waydroid session start", flag=True, shell=False)
+            self._invalidate_session_queries()
             return True
         except SubprocessError as e:
             logger.error(f"Failed to start Waydroid session: {e}")
@@ -68,9 +100,10 @@ class WaydroidSDK:
         """Stop Waydroid session"""
         try:
             if wait:
-                await self._subprocess.submit("waydroid session stop", flag=True, shell=False).get()
+                await self._subprocess.submit("waydroid session stop", flag=True, shell=False, long_running=True).get()
             else:
                 await self._subprocess.start("waydroid session stop", flag=True, shell=False)
+            self._invalidate_session_queries()
             return True
         except SubprocessError as e:
             logger.error(f"Failed to stop Waydroid session: {e}")
@@ -101,7 +134,7 @@ class WaydroidSDK:
         try:
             command = f"pkexec {os.environ['WAYDROID_CLI_PATH']} restart_container"
             if wait:
-                await self._subprocess.submit(command, flag=True, shell=False).get()
+                await self._subprocess.submit(command, flag=True, shell=False, long_running=True).get()
             else:
                 await self._subprocess.start(command, flag=True, shell=False)
             return True
@@ -117,7 +150,7 @@ class WaydroidSDK:
             else:
                 cmd = f"pkexec {os.environ['WAYDROID_CLI_PATH']} upgrade"
             
-            await self._subprocess.submit(cmd, flag=True, shell=False).get()
+            await self._subprocess.submit(cmd, flag=True, shell=False, long_running=True).get()
             return True
         except SubprocessError as e:
             logger.error(f"Failed to upgrade Waydroid: {e}")
@@ -137,10 +170,15 @@ class PropertyManager:
     def __init__(self):
         self._subprocess = SubprocessManager()
     
-    async def get_persist_property(self, property_nick: str) -> str:
+    async def get_persist_property(self, property_nick: str, fresh: bool = False) -> str:
         """Get a persist property value using waydroid prop get"""
         try:
-            result = await self._subprocess.submit(f"waydroid prop get {property_nick}", shell=False, timeout=10).get()
+            command = ["waydroid", "prop", "get", property_nick]
+            if fresh:
+                self._subprocess.invalidate(key=command_text(command))
+            result = await self._subprocess.query(
+                command, ttl=PROP_CACHE_TTL, tag="props", timeout=10
+            )
             output = result["stdout"].replace(
                 "[gbinder] Service manager /dev/binder has appeared", ""
             ).strip().split("\n")[-1]
@@ -152,20 +190,46 @@ class PropertyManager:
     async def set_persist_property(self, property_nick: str, value: str) -> bool:
         """Set a persist property value using waydroid prop set"""
         try:
-            await self._subprocess.submit(f'waydroid prop set {property_nick} "{value}"', shell=False).get()
+            await self._subprocess.submit(["waydroid", "prop", "set", property_nick, value], shell=False).get()
+            self._subprocess.invalidate(tag="props")
             return True
         except SubprocessError as e:
             logger.error(f"Failed to set persist property {property_nick}: {e}")
             return False
     
+    async def _run_prop_service(self, *args: str, cached: bool) -> dict[str, Any]:
+        """Run the bulk prop helper and return its JSON result"""
+        command = ["python3", PROP_SERVICE_PATH, *args]
+        if cached:
+            result = await self._subprocess.query(
+                command, ttl=PROP_CACHE_TTL, tag="props", timeout=10
+            )
+        else:
+            result = await self._subprocess.submit(command, shell=False, timeout=10).get()
+        lines = result["stdout"].strip().splitlines()
+        if not lines:
+            raise ValueError("prop service returned no output")
+        return json.loads(lines[-1])
+    
     async def get_all_persist_properties(self, param_specs: list[ParamSpec]) -> dict[str, str]:
-        """Get all persist properties in parallel"""
+        """Get all persist properties in one batch, falling back to one process per property"""
         if not param_specs:
             return {}
 
+        try:
+            values = await self._run_prop_service(
+                "get", *(p.get_nick() for p in param_specs), cached=True
+            )
+            return {p.get_name(): str(values.get(p.get_nick(), "")) for p in param_specs}
+        # TimeoutError: helper hung; OSError: python3 missing
+        except (SubprocessError, ValueError, asyncio.TimeoutError, OSError) as e:
+            logger.warning(f"Bulk property read failed, reading one by one: {e}")
+
         async def get_prop(p: ParamSpec):
             try:
-                result = await self._subprocess.submit(f"waydroid prop get {p.get_nick()}", shell=False, timeout=10).get()
+                result = await self._subprocess.query(
+                    ["waydroid", "prop", "get", p.get_nick()], ttl=PROP_CACHE_TTL, tag="props", timeout=10
+                )
                 output = result["stdout"].replace(
                     "[gbinder] Service manager /dev/binder has appeared", ""
                 ).strip().split("\n")[-1]
@@ -178,6 +242,26 @@ class PropertyManager:
         results = await asyncio.gather(*tasks)
         return dict(results)
 
+    async def set_persist_properties(self, properties: dict[str, str]) -> bool:
+        """Set several persist properties in one batch, falling back to one process per property"""
+        if not properties:
+            return True
+
+        try:
+            results = await self._run_prop_service(
+                "set", *(f"{nick}={value}" for nick, value in properties.items()), cached=False
+            )
+            self._subprocess.invalidate(tag="props")
+            return all(results.get(nick) is True for nick in properties)
+        # TimeoutError: helper hung; OSError: python3 missing
+        except (SubprocessError, ValueError, asyncio.TimeoutError, OSError) as e:
+            logger.warning(f"Bulk property write failed, writing one by one: {e}")
+
+        results = await asyncio.gather(
+            *(self.set_persist_property(nick, value) for nick, value in properties.items())
+        )
+        return all(results)
+
 
 class ConfigManager:
     """
@@ -192,38 +276,117 @@ class ConfigManager:
     def __init__(self):
         self._subprocess: SubprocessManager = SubprocessManager()
         self._config_cache: configparser.ConfigParser | None = None
+        self._build_props: BuildPropIndex = BuildPropIndex()
+        self._config_path: str = WAYDROID_CONFIG_PATH
+        # Edits not yet written to disk: (section, key) -> value, None removes the key
+        self._pending: dict[tuple[str, str], str | None] = {}
+        # Set by the file monitor when waydroid.cfg changes on disk
+        self._stale: bool = False
+        self._monitor: Gio.FileMonitor | None = None
+    
+    @property
+    def has_pending_changes(self) -> bool:
+        return bool(self._pending)
+    
+    def _watch_config(self, config_path: str):
+        if self._monitor is not None:
+            return
+        try:
+            self._monitor = Gio.File.new_for_path(config_path).monitor_file(
+                Gio.FileMonitorFlags.NONE, None
+            )
+            self._monitor.connect("changed", self._on_config_changed)
+        except GLib.Error as e:
+            logger.warning(f"Cannot monitor {config_path}: {e}")
+    
+    def _on_config_changed(self, monitor, file, other_file, event_type):
+        if event_type in (
+            Gio.FileMonitorEvent.CHANGES_DONE_HINT,
+            Gio.FileMonitorEvent.CREATED,
+            Gio.FileMonitorEvent.DELETED,
+        ):
+            self._stale = True
+    
+    def _ensure_loaded(self) -> bool:
+        """Load the config if needed, re-reading it (keeping pending edits) after it changed on disk"""
+        if self._config_cache is not None and not self._stale:
+            return True
+        pending = dict(self._pending)
+        if not self.load_config(self._config_path):
+            # load_config leaves the pending edits alone when it fails
+            return False
+        for (section, key), value in pending.items():
+            self._apply(section, key, value)
+        return True
+    
+    def _apply(self, section: str, key: str, value: str | None):
+        if value is None:
+            if self._config_cache.has_option(section, key):
+                self._config_cache.remove_option(section, key)
+        else:
+            if not self._config_cache.has_section(section):
+                self._config_cache.add_section(section)
+            self._config_cache.set(section, key, value)
+        self._pending[(section, key)] = value
     
-    def load_config(self, config_path: str = "/var/lib/waydroid/waydroid.cfg") -> bool:
-        """Load Waydroid configuration file with improved error handling"""
+    def _set(self, section: str, key: str, raw_value: str):
+        """Change one key in memory, tracking it as dirty only if the value changes"""
+        value = raw_value if raw_value != "" else None
+        current = self._config_cache.get(section, key, fallback=None)
+        if current == value and (section, key) not in self._pending:
+            return
+        self._apply(section, key, value)
+    
+    def load_config(self, config_path: str = WAYDROID_CONFIG_PATH) -> bool:
+        """Load Waydroid configuration file with improved error handling, discarding pending edits
+
+        Pending edits and the previously loaded config are only dropped once the
+        new config is in place; a failed load leaves both untouched.
+        """
+        self._config_path = config_path
+        self._watch_config(config_path)
+        previous = self._config_cache
         try:
             # Check if config file exists
             if not os.path.exists(config_path):
                 logger.warning(f"Config file does not exist: {config_path}")
                 # Try to create a minimal config
-                return self._create_minimal_config()
+                return self._loaded(self._create_minimal_config())
 
             # Check if config file is readable
             if not os.access(config_path, os.R_OK):
                 logger.error(f"Config file is not readable: {config_path}")
                 return False
 
-            self._config_cache = configparser.ConfigParser()
-            self._config_cache.read(config_path)
+            config = configparser.ConfigParser()
+            config.read(config_path)
 
             # Verify config has required sections
-            if not self._config_cache.has_section("properties"):
+            if not config.has_section("properties"):
                 logger.warning("Config missing [properties] section, adding it")
-                self._config_cache.add_section("properties")
+                config.add_section("properties")
 
-            if not self._config_cache.has_section("waydroid"):
+            if not config.has_section("waydroid"):
                 logger.warning("Config missing [waydroid] section, adding it")
-                self._config_cache.add_section("waydroid")
+                config.add_section("waydroid")
 
-            return True
+            self._config_cache = config
+            return self._loaded(True)
         except Exception as e:
             logger.error(f"Failed to load config: {e}")
+            if previous is not None:
+                # A re-read failed: keep the config we have rather than a minimal one
+                # that a later save would write over the real file
+                self._config_cache = previous
+                return False
             # Try to create a minimal config as fallback
-            return self._create_minimal_config()
+            return self._loaded(self._create_minimal_config())
+
+    def _loaded(self, success: bool) -> bool:
+        if success:
+            self._pending = {}
+            self._stale = False
+        return success
 
     def _create_minimal_config(self) -> bool:
         """Create a minimal configuration as fallback"""
@@ -241,9 +404,8 @@ class ConfigManager:
     
     def get_privileged_property(self, property_nick: str) -> str:
         """Get a privileged property from config"""
-        if not self._config_cache:
-            if not self.load_config():
-                return ""
+        if not self._ensure_loaded():
+            return ""
         
         try:
             return self._config_cache.get("properties", property_nick, fallback="")
@@ -253,9 +415,8 @@ class ConfigManager:
     
     def get_all_privileged_properties(self, param_specs: list[ParamSpec]) -> dict[str, str]:
         """Get all privileged properties from config"""
-        if not self._config_cache:
-            if not self.load_config():
-                return {}
+        if not self._ensure_loaded():
+            return {}
         
         property_values = {}
         for p in param_specs:
@@ -270,9 +431,8 @@ class ConfigManager:
 
     def get_all_waydroid_properties(self, param_specs: list[ParamSpec]) -> dict[str, str]:
         """Get all waydroid config properties from [waydroid] section"""
-        if not self._config_cache:
-            if not self.load_config():
-                return {}
+        if not self._ensure_loaded():
+            return {}
 
         property_values = {}
         for p in param_specs:
@@ -288,59 +448,37 @@ class ConfigManager:
 
     def set_waydroid_property(self, property_nick: str, raw_value: str):
         """Set a waydroid property in config (in memory only)"""
-        if not self._config_cache:
-            if not self.load_config():
-                return
+        if not self._ensure_loaded():
+            return
         
-        if raw_value == "":
-            # Remove empty properties
-            self._config_cache.remove_option("waydroid", property_nick)
-        else:
-            self._config_cache.set("waydroid", property_nick, raw_value)
+        # Empty values remove the property
+        self._set("waydroid", property_nick, raw_value)
 
     def set_privileged_property(self, property_nick: str, raw_value: str):
         """Set a privileged property in config (in memory only)"""
-        if not self._config_cache:
-            if not self.load_config():
-                return
+        if not self._ensure_loaded():
+            return
         
-        if raw_value == "":
-            # Remove empty properties
-            self._config_cache.remove_option("properties", property_nick)
-        else:
-            self._config_cache.set("properties", property_nick, raw_value)
+        # Empty values remove the property
+        self._set("properties", property_nick, raw_value)
     
     def set_multiple_privileged_properties(self, properties: dict[str, str]):
         """Set multiple privileged properties in config (in memory only)"""
-        if not self._config_cache:
-            if not self.load_config():
-                logger.error("Failed to load config for setting privileged properties")
-                return
+        if not self._ensure_loaded():
+            logger.error("Failed to load config for setting privileged properties")
+            return
 
         for property_nick, raw_value in properties.items():
-            if raw_value == "":
-                if self._config_cache.has_option("properties", property_nick):
-                    self._config_cache.remove_option("properties", property_nick)
-            else:
-                self._config_cache.set("properties", property_nick, raw_value)
+            self._set("properties", property_nick, raw_value)
 
     def set_multiple_waydroid_properties(self, properties: dict[str, str]):
         """Set multiple waydroid config properties in [waydroid] section (in memory only)"""
-        if not self._config_cache:
-            if not self.load_config():
-                logger.error("Failed to load config for setting waydroid properties")
-                return
-
-        # Ensure [waydroid] section exists
-        if not self._config_cache.has_section("waydroid"):
-            self._config_cache.add_section("waydroid")
+        if not self._ensure_loaded():
+            logger.error("Failed to load config for setting waydroid properties")
+            return
 
         for property_nick, raw_value in properties.items():
-            if raw_value == "":
-                if self._config_cache.has_option("waydroid", property_nick):
-                    self._config_cache.remove_option("waydroid", property_nick)
-            else:
-                self._config_cache.set("waydroid", property_nick, raw_value)
+            self._set("waydroid", property_nick, raw_value)
 
     # def reset_waydroid_properties(self, param_specs: list[ParamSpec]):
     #     """Reset waydroid properties to defaults"""
@@ -356,9 +494,28 @@ class ConfigManager:
     #     for p in param_specs:
     #         self._config_cache.set("waydroid", p.get_nick(), p.get_default_value())
 
-    async def save_config(self) -> bool:
-        """Save config to file using privileged access"""
-        if not self._config_cache:
+    async def save_config(self, upgrade: bool = False, offline: bool = True) -> bool:
+        """Write pending edits to waydroid.cfg with a single privileged call
+        
+        With upgrade=True the same pkexec call also runs `waydroid upgrade`, so
+        saving and applying the config costs one authorization prompt.
+        """
+        cli = os.environ["WAYDROID_CLI_PATH"]
+        if not self._pending:
+            if not upgrade:
+                logger.debug("No pending config changes, skipping write")
+                return True
+            try:
+                cmd = f"pkexec {cli} upgrade" + (" -o" if offline else "")
+                await self._subprocess.submit(cmd, flag=True, shell=False, long_running=True).get()
+                return True
+            except SubprocessError as e:
+                logger.error(f"Failed to upgrade Waydroid: {e}")
+                return False
+
+        # Merge pending edits into the latest file content, not a stale copy
+        self._stale = True
+        if not self._ensure_loaded():
             logger.error("No config loaded to save")
             return False
         
@@ -371,32 +528,37 @@ class ConfigManager:
             with open(cache_config_path, "w") as f:
                 self._config_cache.write(f)
             
-            # Copy to system location with pkexec
-            cmd = f"pkexec {os.environ['WAYDROID_CLI_PATH']} copy_to_var {cache_config_path} waydroid.cfg"
-            await self._subprocess.submit(cmd, flag=True, shell=False).get()
+            # Copy to system location with pkexec (replaced atomically by waydroid-cli)
+            if upgrade:
+                cmd = f"pkexec {cli} apply_config {cache_config_path}" + (" -o" if offline else "")
+            else:
+                cmd = f"pkexec {cli} copy_to_var {cache_config_path} waydroid.cfg"
+            await self._subprocess.submit(cmd, flag=True, shell=False, long_running=True).get()
+            self._pending = {}
             return True
-        except SubprocessError as e:
+        except (OSError, SubprocessError) as e:
             logger.error(f"Failed to save config: {e}")
             return False
     
-    async def get_android_version(self) -> str:
-        """Get Android version from system image"""
-        if not self._config_cache:
-            if not self.load_config():
-                return ""
+    async def get_build_props(self, prefix: str = "ro.") -> dict[str, str]:
+        """Get build.prop entries of the system image whose key starts with prefix"""
+        if not self._ensure_loaded():
+            return {}
         
         try:
             system_image_path = os.path.join(
                 self._config_cache.get("waydroid", "images_path"), "system.img"
             )
-            result = await self._subprocess.submit(
-                f"debugfs -R 'cat /system/build.prop' {system_image_path} | grep '^ro.build.version.release=' | cut -d'=' -f2",
-                shell=True
-            ).get()
-            return result["stdout"].strip()
+            props = await self._build_props.load(system_image_path)
+            return {k: v for k, v in props.items() if k.startswith(prefix)}
         except Exception as e:
-            logger.error(f"Failed to get Android version: {e}")
-            return ""
+            logger.error(f"Failed to read build.prop: {e}")
+            return {}
+    
+    async def get_android_version(self) -> str:
+        """Get Android version from system image"""
+        props = await self.get_build_props("ro.build.version.")
+        return props.get("ro.build.version.release", "")
     
     # def reset_privileged_properties(self):
     #     """Reset all privileged properties to defaults (in memory only)"""
@@ -1,10 +1,33 @@
-from .extensions_manager import ExtensionManagerState, PackageManager
-from .monitor_service import start as start_monitor
-from .mount_service import start as start_mount
-
-__all__ = [
-    'PackageManager',
-    'ExtensionManagerState',
-    "start_monitor",
-    "start_mount"
-]
\ No newline at end of file
+# extensions_manager pulls in httpx and yaml, and the services pull in dbus;
+# load each one only when it is first used
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .extensions_manager import (
+        ExtensionManagerState,
+        InstallationCancelled,
+        PackageManager,
+    )
+    from .monitor_service import start as start_monitor
+    from .mount_service import start as start_mount
+
+_LAZY_ATTRS = {
+    "ExtensionManagerState": (".extensions_manager", "ExtensionManagerState"),
+    "InstallationCancelled": (".extensions_manager", "InstallationCancelled"),
+    "PackageManager": (".extensions_manager", "PackageManager"),
+    "start_monitor": (".monitor_service", "start"),
+    "start_mount": (".mount_service", "start"),
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name: str):
+    try:
+        module_name, attr = _LAZY_ATTRS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(import_module(module_name, __name__), attr)
+    globals()[name] = value
+    return value
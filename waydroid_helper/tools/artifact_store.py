@@ -0,0 +1,188 @@
+"""
+Content-addressed store for downloaded extension files.
+
+Every verified download is kept once under ``objects/<sha256[:2]>/<sha256>``
+and linked into a package's build dir on demand, preferring a hardlink, then
+a reflink, then a plain copy. Reinstalling a package or switching to another
+version that ships the same files needs no network traffic.
+
+``index.json`` records the objects with their size and last use, and the
+digests of files already verified in the build dirs together with their
+(size, mtime, inode) stamp. An unchanged file is therefore never hashed
+again. When the store grows past its size limit, the least recently used
+objects are evicted.
+"""
+
+import errno
+import fcntl
+import json
+import os
+import shutil
+import time
+from typing import Any
+
+from waydroid_helper.util.log import logger
+
+# Bump when the index format changes
+INDEX_VERSION = 1
+DEFAULT_MAX_BYTES = 4 * 1024**3
+# ioctl(dest_fd, FICLONE, src_fd): share the extents of src (btrfs, xfs, bcachefs)
+FICLONE = 0x40049409
+
+FileStamp = list[int]
+
+
+def _stamp(path: str) -> FileStamp | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+def _reflink(src: str, dest: str) -> None:
+    with open(src, "rb") as src_file, open(dest, "wb") as dest_file:
+        fcntl.ioctl(dest_file.fileno(), FICLONE, src_file.fileno())
+
+
+class ArtifactStore:
+    def __init__(self, root: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root: str = root
+        self.max_bytes: int = max_bytes
+        self._index_path: str = os.path.join(root, "index.json")
+        # sha256 -> {"size", "mtime_ns", "used"}
+        self._objects: dict[str, dict[str, Any]] | None = None
+        # path -> {"algorithm", "digest", "stamp"}
+        self._files: dict[str, dict[str, Any]] = {}
+        self._dirty: bool = False
+
+    def _object_path(self, sha256: str) -> str:
+        return os.path.join(self.root, "objects", sha256[:2], sha256)
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        if self._objects is None:
+            self._objects = {}
+            try:
+                with open(self._index_path) as f:
+                    data = json.load(f)
+                if data.get("version") == INDEX_VERSION:
+                    self._objects = data.get("objects", {})
+                    self._files = data.get("files", {})
+            except (OSError, ValueError):
+                pass
+        return self._objects
+
+    def save(self) -> None:
+        """Write the index if it changed, dropping files that no longer exist"""
+        if not self._dirty:
+            return
+        self._files = {path: entry for path, entry in self._files.items() if os.path.exists(path)}
+        tmp_path = f"{self._index_path}.tmp"
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(
+                    {"version": INDEX_VERSION, "objects": self._load(), "files": self._files}, f
+                )
+            os.replace(tmp_path, self._index_path)
+            self._dirty = False
+        except OSError as e:
+            logger.warning(f"Failed to write artifact index: {e}")
+
+    def verified(self, path: str, algorithm: str, digest: str) -> bool:
+        """Whether path was verified against digest and has not changed since"""
+        _ = self._load()
+        entry = self._files.get(path)
+        return (
+            entry is not None
+            and entry["algorithm"] == algorithm
+            and entry["digest"] == digest
+            and entry["stamp"] == _stamp(path)
+        )
+
+    def record(self, path: str, algorithm: str, digest: str) -> None:
+        """Remember that path currently matches digest"""
+        _ = self._load()
+        stamp = _stamp(path)
+        if stamp is not None:
+            self._files[path] = {"algorithm": algorithm, "digest": digest, "stamp": stamp}
+            self._dirty = True
+
+    def lookup(self, sha256: str) -> str | None:
+        """Path of the stored object, or None if it is missing or was modified"""
+        objects = self._load()
+        entry = objects.get(sha256)
+        if entry is None:
+            return None
+        path = self._object_path(sha256)
+        stamp = _stamp(path)
+        # Objects can be hardlinked into build dirs; an in-place edit there
+        # changes the mtime and invalidates the object
+        if stamp is None or stamp[:2] != [entry["size"], entry["mtime_ns"]]:
+            logger.warning(f"Dropping modified or missing artifact {sha256}")
+            del objects[sha256]
+            self._dirty = True
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return None
+        entry["used"] = time.time()
+        self._dirty = True
+        return path
+
+    def materialize(self, sha256: str, dest: str) -> bool:
+        """Place the object at dest (hardlink, reflink or copy); False if not stored"""
+        src = self.lookup(sha256)
+        if src is None:
+            return False
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp_path = f"{dest}.tmp"
+        try:
+            os.link(src, tmp_path)
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                raise
+            try:
+                _reflink(src, tmp_path)
+            except OSError:
+                _ = shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dest)
+        self.record(dest, "sha256", sha256)
+        logger.info(f"Reused cached artifact for {dest}")
+        return True
+
+    def add(self, path: str, sha256: str) -> None:
+        """Store a verified file; path stays usable and is recorded as verified"""
+        objects = self._load()
+        self.record(path, "sha256", sha256)
+        if sha256 in objects:
+            return
+        object_path = self._object_path(sha256)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        tmp_path = f"{object_path}.tmp"
+        try:
+            os.link(path, tmp_path)
+        except OSError:
+            _ = shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, object_path)
+        st = os.stat(object_path)
+        objects[sha256] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "used": time.time()}
+        self._dirty = True
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove least recently used objects until the store fits max_bytes"""
+        objects = self._load()
+        total = sum(entry["size"] for entry in objects.values())
+        for sha256, entry in sorted(objects.items(), key=lambda item: item[1]["used"]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._object_path(sha256))
+            except FileNotFoundError:
+                pass
+            del objects[sha256]
+            total -= entry["size"]
+            self._dirty = True
+            logger.info(f"Evicted cached artifact {sha256}")
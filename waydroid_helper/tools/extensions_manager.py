@@ -4,11 +4,13 @@
 # pyright: reportUnknownMemberType=false
 # pyright: reportUnknownArgumentType=false
 import asyncio
+import hashlib
 import json
 import os
 import re
+import time
 import xml.etree.ElementTree as ET
-from collections.abc import Coroutine, Iterable
+from collections.abc import Callable, Coroutine, Iterable
 from enum import IntEnum
 from gettext import gettext as _
 from typing import Any, TypedDict, TypeGuard
@@ -16,14 +18,19 @@ from dataclasses import dataclass
 
 import aiofiles
 import httpx
-import yaml
 from gi.repository import GLib, GObject
 
+from waydroid_helper.tools.artifact_store import ArtifactStore
 from waydroid_helper.util.state_waiter import wait_for_state
 from waydroid_helper.util.abx_reader import AbxReader
+from waydroid_helper.util.http_client import (
+    PRIORITY_METADATA,
+    PRIORITY_PAYLOAD,
+    shared_http_client,
+)
 from waydroid_helper.util.arch import host
 from waydroid_helper.util.log import logger
-from waydroid_helper.util.subprocess_manager import SubprocessManager
+from waydroid_helper.util.subprocess_manager import SubprocessError, SubprocessManager
 from waydroid_helper.util.task import Task
 from waydroid_helper.waydroid import Waydroid, WaydroidState
 
@@ -48,6 +55,10 @@ class ValidationResult:
         )
 
 
+class InstallationCancelled(Exception):
+    """用户取消了正在进行的安装"""
+
+
 class ExtensionManagerState(IntEnum):
     UNINITIALIZED = 0
     READY = 1
@@ -103,6 +114,72 @@ class PackageClassListItem(TypedDict):
     list: list[VariantListItem] | list[PackageListItem]
 
 
+# 流式下载每次读取的块大小
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+# 下载进度（速度）的报告间隔，单位秒
+PROGRESS_INTERVAL = 0.5
+
+
+def _hash_file(path: str, algorithm: str) -> "hashlib._Hash":
+    """在线程中计算已有文件的校验和，返回的对象可以继续 update"""
+    hasher = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        while chunk := f.read(DOWNLOAD_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher
+
+
+def _resume_validator(headers: httpx.Headers) -> str | None:
+    """可用于 If-Range 的校验值：强 ETag 优先，其次 Last-Modified"""
+    etag = headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return headers.get("Last-Modified")
+
+
+class DownloadProgress:
+    """汇总一个包所有文件的下载进度，按固定间隔报告下载速度"""
+
+    def __init__(
+        self,
+        callback: Callable[[int, int, float], None],
+        interval: float = PROGRESS_INTERVAL,
+    ):
+        self.downloaded: int = 0
+        self.total: int = 0
+        self._callback: Callable[[int, int, float], None] = callback
+        self._interval: float = interval
+        self._last_time: float = time.monotonic()
+        self._last_bytes: int = 0
+
+    def add_total(self, size: int):
+        self.total += size
+
+    def adjust(self, size: int):
+        """计入续传前已有（或扣除需重新下载）的字节，不影响速度统计"""
+        self.downloaded += size
+        self._last_bytes += size
+
+    def advance(self, size: int):
+        self.downloaded += size
+        now = time.monotonic()
+        if now - self._last_time >= self._interval:
+            self._report(now)
+
+    def finish(self):
+        self._report(time.monotonic())
+
+    def _report(self, now: float):
+        elapsed = now - self._last_time
+        rate = (self.downloaded - self._last_bytes) / elapsed if elapsed > 0 else 0.0
+        self._last_time = now
+        self._last_bytes = self.downloaded
+        logger.debug(
+            f"Downloaded {self.downloaded}/{self.total or '?'} bytes at {rate / 1024:.1f} KiB/s"
+        )
+        self._callback(self.downloaded, self.total, rate)
+
+
 def bash_var_replacement_regex(command: str, var_dict: dict[str, str]) -> str:
     def replace_match(match: re.Match[str]):
         var = match.group(1)
@@ -121,6 +198,14 @@ class PackageManager(GObject.Object):
     __gsignals__ = {
         "installation-started": (GObject.SignalFlags.RUN_FIRST, None, (str, str)),
         # 'installation-progress': (GObject.SignalFlags.RUN_FIRST, None, (str, float)),
+        # 包名, 已下载字节数, 总字节数 (未知时为 0), 下载速度 (字节/秒)
+        "download-progress": (
+            GObject.SignalFlags.RUN_FIRST,
+            None,
+            (str, GObject.TYPE_UINT64, GObject.TYPE_UINT64, float),
+        ),
+        # 包名, 构建输出的一行
+        "installation-output": (GObject.SignalFlags.RUN_FIRST, None, (str, str)),
         "installation-completed": (GObject.SignalFlags.RUN_FIRST, None, (str, str)),
         "uninstallation-started": (GObject.SignalFlags.RUN_FIRST, None, (str, str)),
         "uninstallation-completed": (GObject.SignalFlags.RUN_FIRST, None, (str, str)),
@@ -142,25 +227,29 @@ class PackageManager(GObject.Object):
     )
     _task = Task()
     _subprocess = SubprocessManager()
+    _http = shared_http_client()
     # TODO 同时安装多个扩展的问题, 最好做到可以并发下载, 串行安装
     _package_lock = asyncio.Lock()
+    # 按 sha256 存放的下载缓存，不同版本和重新安装之间共享
+    artifacts = ArtifactStore(os.path.join(cache_dir, "artifacts"))
 
     async def fetch_snapshot(self, name: str, version: str):
         logger.info(self.available_extensions[f"{name}-{version}"])
 
     async def fetch_extension_json(self) -> Any:
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            try:
-                response = await client.get(self.remote + "extensions.json")
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    logger.error(
-                        f"Failed to fetch JSON from, status code: {response.status_code}"
-                    )
-                    return None
-            except AssertionError as e:
-                logger.error(e)
+        try:
+            response = await self._http.get(
+                self.remote + "extensions.json", priority=PRIORITY_METADATA
+            )
+            if response.status_code == 200:
+                return response.json()
+            else:
+                logger.error(
+                    f"Failed to fetch JSON from, status code: {response.status_code}"
+                )
+                return None
+        except (AssertionError, httpx.HTTPError) as e:
+            logger.error(e)
 
     async def save_extension_json(self):
         json_path = os.path.join(self.storage_dir, "extensions.json")
@@ -363,53 +452,130 @@ class PackageManager(GObject.Object):
 
     async def download_file(
         self,
-        client: httpx.AsyncClient,
         url: str,
         dest_path: str,
         sha256: str | None = None,
         md5: str | None = None,
         retries: int = 3,
-        delay: int = 2,
+        priority: int = PRIORITY_PAYLOAD,
+        progress: "DownloadProgress | None" = None,
     ):
+        """流式下载到 dest_path.part，边下载边计算校验和，失败后用 Range 续传，
+        校验通过后原子重命名为 dest_path
+
+        续传时用 If-Range 带上首次响应的 ETag/Last-Modified（保存在 .part.validator），
+        文件在服务器上变化时服务器返回完整内容，从头下载。既没有校验和也没有
+        校验值时无法确认 .part 属于同一个文件，不续传。
+        """
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        part_path = f"{dest_path}.part"
+        validator_path = f"{part_path}.validator"
+
+        # Prefer SHA-256 validation; fall back to MD5 if SHA-256 not provided
+        algorithm, expected = ("sha256", sha256) if sha256 is not None else ("md5", md5)
+
+        received = 0
+        hasher = hashlib.new(algorithm)
+        validator: str | None = None
+
+        def discard_part():
+            nonlocal received, hasher, validator
+            for path in (part_path, validator_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            if progress is not None:
+                progress.adjust(-received)
+            received = 0
+            hasher = hashlib.new(algorithm)
+            validator = None
+
+        # 上次中断留下的 .part 文件：先补算已有部分的校验和再续传
+        if os.path.exists(validator_path):
+            async with aiofiles.open(validator_path, mode="r") as f:
+                validator = (await f.read()).strip() or None
+        if os.path.exists(part_path) and (expected is not None or validator is not None):
+            hasher = await asyncio.to_thread(_hash_file, part_path, algorithm)
+            received = os.path.getsize(part_path)
+        else:
+            discard_part()
+        if progress is not None:
+            progress.adjust(received)
+        total: int | None = None
+
         attempt = 0
         while attempt < retries:
             try:
-                response = await client.get(url)
-                assert response.content, "Downloaded content is empty"
-
-                if not os.path.exists(os.path.dirname(dest_path)):
-                    os.makedirs(os.path.dirname(dest_path))
-
-                async with aiofiles.open(dest_path, mode="wb") as f:
-                    await f.write(response.content)
-
-                # Prefer SHA-256 validation; fall back to MD5 if SHA-256 not provided
-                if sha256 is not None:
-                    result = await self._subprocess.submit(
-                        f'sha256sum "{dest_path}"', shell=False
-                    ).get()
-                    actual_sha256 = result["stdout"].split()[0]
-                    if actual_sha256 != sha256:
-                        raise ValueError(
-                            f"SHA256 mismatch: expected {sha256}, got {actual_sha256}"
-                        )
-                elif md5 is not None:
-                    result = await self._subprocess.submit(
-                        f'md5sum "{dest_path}"', shell=False
-                    ).get()
-                    actual_md5 = result["stdout"].split()[0]
-                    if actual_md5 != md5:
+                # 上一次写入失败时文件可能比已计算的部分长
+                if os.path.exists(part_path) and os.path.getsize(part_path) != received:
+                    os.truncate(part_path, received)
+                # 不接受压缩编码：Range 和 Content-Length 都要按原始字节计算
+                headers = {"Accept-Encoding": "identity"}
+                if received:
+                    headers["Range"] = f"bytes={received}-"
+                    if validator is not None:
+                        headers["If-Range"] = validator
+
+                async with self._http.stream(
+                    "GET", url, priority=priority, headers=headers
+                ) as response:
+                    if received and response.status_code == 416:
+                        if expected is None:
+                            # 没有校验和，无法确认 .part 就是完整的文件
+                            discard_part()
+                            raise ValueError("Requested range not satisfiable")
+                        # Range 超出文件末尾，按校验和判断是否已完整下载
+                    else:
+                        # 先处理错误状态，临时错误不能丢弃已下载的部分
+                        _ = response.raise_for_status()
+                        if received and response.status_code == 200:
+                            # 文件已变化或服务器忽略了 Range，返回完整内容，从头开始
+                            discard_part()
+                        if not received:
+                            validator = _resume_validator(response.headers)
+                            if validator is not None:
+                                async with aiofiles.open(validator_path, mode="w") as f:
+                                    _ = await f.write(validator)
+
+                        length = response.headers.get("Content-Length")
+                        # 服务器仍然压缩时 aiter_bytes 得到的是解压后的字节，无法与长度比较
+                        encoded = response.headers.get("Content-Encoding", "identity") != "identity"
+                        if total is None and length is not None and not encoded:
+                            total = received + int(length)
+                            if progress is not None:
+                                progress.add_total(total)
+
+                        async with aiofiles.open(part_path, mode="ab" if received else "wb") as f:
+                            async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                                _ = await f.write(chunk)
+                                hasher.update(chunk)
+                                received += len(chunk)
+                                if progress is not None:
+                                    progress.advance(len(chunk))
+
+                assert received, "Downloaded content is empty"
+                if total is not None and received != total:
+                    raise ValueError(f"Incomplete download: {received} of {total} bytes")
+
+                if expected is not None:
+                    actual = hasher.hexdigest()
+                    if actual != expected:
+                        # 数据已损坏，续传没有意义，下一次从头下载
+                        discard_part()
                         raise ValueError(
-                            f"MD5 mismatch: expected {md5}, got {actual_md5}"
+                            f"{algorithm.upper()} mismatch: expected {expected}, got {actual}"
                         )
 
+                os.replace(part_path, dest_path)
+                if os.path.exists(validator_path):
+                    os.remove(validator_path)
                 logger.info(f"File downloaded and saved to {dest_path}")
                 return
             except Exception as e:
                 attempt += 1
                 if attempt < retries:
+                    delay = self._http.backoff(attempt - 1)
                     logger.warning(
-                        f"Attempt {attempt} failed: {e}. Retrying in {delay} seconds..."
+                        f"Attempt {attempt} failed: {e}. Retrying in {delay:.1f} seconds..."
                     )
                     await asyncio.sleep(delay)
                 else:
@@ -431,83 +597,92 @@ class PackageManager(GObject.Object):
         return all_files
 
     async def download(self, package_info: PackageInfo):
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            tasks: list[Coroutine[Any, Any, None]] = []
-            for file in package_info["files"]:
-                url = f'{self.remote}{package_info["path"]}/{file}'
-                dest = f'{self.cache_dir}/extensions/{package_info["name"]}/{file}'
-                tasks.append(self.download_file(client, url, dest))
-
-            # Determine source and checksum lists, preferring SHA-256 over MD5
-            if f"source_{self.arch}" in package_info.keys():
-                _source = f"source_{self.arch}"
-                _sha256sums = f"sha256sums_{self.arch}"
-                _md5sums = f"md5sums_{self.arch}"
-            else:
-                _source = "source"
-                _sha256sums = "sha256sums"
-                _md5sums = "md5sums"
+        name = package_info["name"]
+        progress = DownloadProgress(
+            lambda downloaded, total, rate: self.emit(
+                "download-progress", name, downloaded, total, rate
+            )
+        )
+        tasks: list[Coroutine[Any, Any, None]] = []
+        for file in package_info["files"]:
+            url = f'{self.remote}{package_info["path"]}/{file}'
+            dest = f'{self.cache_dir}/extensions/{package_info["name"]}/{file}'
+            tasks.append(
+                self.download_file(url, dest, priority=PRIORITY_METADATA, progress=progress)
+            )
 
-            if _source not in package_info:
-                logger.warning(f"Package {package_info['name']} missing {_source}")
-                return
+        # Determine source and checksum lists, preferring SHA-256 over MD5
+        if f"source_{self.arch}" in package_info.keys():
+            _source = f"source_{self.arch}"
+            _sha256sums = f"sha256sums_{self.arch}"
+            _md5sums = f"md5sums_{self.arch}"
+        else:
+            _source = "source"
+            _sha256sums = "sha256sums"
+            _md5sums = "md5sums"
 
-            has_sha256 = _sha256sums in package_info and bool(package_info[_sha256sums])
-            has_md5 = _md5sums in package_info and bool(package_info[_md5sums])
-            if not has_sha256 and not has_md5:
-                logger.warning(
-                    f"Package {package_info['name']} missing both {_sha256sums} and {_md5sums}"
-                )
-                return
+        if _source not in package_info:
+            logger.warning(f"Package {package_info['name']} missing {_source}")
+            return
 
-            use_sha256 = has_sha256
-            sums_key = _sha256sums if use_sha256 else _md5sums
+        has_sha256 = _sha256sums in package_info and bool(package_info[_sha256sums])
+        has_md5 = _md5sums in package_info and bool(package_info[_md5sums])
+        if not has_sha256 and not has_md5:
+            logger.warning(
+                f"Package {package_info['name']} missing both {_sha256sums} and {_md5sums}"
+            )
+            return
 
-            for source, expected in zip(
-                package_info[_source],
-                package_info[sums_key],
+        use_sha256 = has_sha256
+        sums_key = _sha256sums if use_sha256 else _md5sums
+        algorithm = "sha256" if use_sha256 else "md5"
+        # 本次校验通过（或将要下载）的文件，下载完成后记入缓存索引
+        stored: list[tuple[str, str]] = []
+
+        for source, expected in zip(
+            package_info[_source],
+            package_info[sums_key],
+        ):
+            file_name: str = source.split("::")[0]
+            url: str = source.split("::")[1]
+            file_path = os.path.join(
+                self.cache_dir, "extensions", package_info["name"], file_name
+            )
+            # 已校验且未改动的文件不再计算校验和
+            if self.artifacts.verified(file_path, algorithm, expected):
+                continue
+            # 其他版本或之前安装下载过的相同文件，直接从缓存链接过来
+            if use_sha256 and await asyncio.to_thread(
+                self.artifacts.materialize, expected, file_path
             ):
-                file_name: str = source.split("::")[0]
-                url: str = source.split("::")[1]
-                file_path = os.path.join(
-                    self.cache_dir, "extensions", package_info["name"], file_name
+                continue
+            if os.path.exists(file_path):
+                hasher = await asyncio.to_thread(_hash_file, file_path, algorithm)
+                if hasher.hexdigest() == expected:
+                    stored.append((file_path, expected))
+                    continue
+
+            if use_sha256:
+                tasks.append(
+                    self.download_file(url, file_path, sha256=expected, progress=progress)
                 )
-                if os.path.exists(file_path):
-                    if use_sha256:
-                        result = await self._subprocess.submit(
-                            f'sha256sum "{file_path}"', shell=False
-                        ).get()
-                        actual = result["stdout"].split()[0]
-                    else:
-                        result = await self._subprocess.submit(
-                            f'md5sum "{file_path}"', shell=False
-                        ).get()
-                        actual = result["stdout"].split()[0]
-
-                    if actual == expected:
-                        continue
-                    else:
-                        if use_sha256:
-                            tasks.append(
-                                self.download_file(
-                                    client, url, file_path, sha256=expected
-                                )
-                            )
-                        else:
-                            tasks.append(
-                                self.download_file(client, url, file_path, md5=expected)
-                            )
-                else:
-                    if use_sha256:
-                        tasks.append(
-                            self.download_file(client, url, file_path, sha256=expected)
-                        )
-                    else:
-                        tasks.append(
-                            self.download_file(client, url, file_path, md5=expected)
-                        )
+            else:
+                tasks.append(
+                    self.download_file(url, file_path, md5=expected, progress=progress)
+                )
+            stored.append((file_path, expected))
 
+        try:
             await asyncio.gather(*tasks)
+            progress.finish()
+            # 下载成功的文件存入缓存（逐个进行，索引不是线程安全的）
+            for file_path, expected in stored:
+                if use_sha256:
+                    await asyncio.to_thread(self.artifacts.add, file_path, expected)
+                else:
+                    self.artifacts.record(file_path, algorithm, expected)
+        finally:
+            self.artifacts.save()
 
     def get_android_version_to_sdk(self, android_version: str) -> str:
         """将 Android 版本转换为对应的 SDK 版本"""
@@ -531,9 +706,28 @@ class PackageManager(GObject.Object):
         )
         return "30"
 
+    async def get_image_sdk(self) -> str:
+        """系统镜像的 SDK 版本，优先读取 build.prop，读不到时按 Android 版本推算"""
+        props = await self.waydroid.get_build_props("ro.build.version.")
+        sdk = props.get("ro.build.version.sdk", "")
+        if sdk.isdigit():
+            return sdk
+        return self.get_android_version_to_sdk(self.waydroid.get_android_version())
+
+    @staticmethod
+    def _cancel_group_name(name: str) -> str:
+        return f"package:{name}"
+
+    async def cancel_installation(self, name: str):
+        """结束该包正在运行的构建和安装进程"""
+        logger.info(f"Cancelling package installation: {name}")
+        await self._subprocess.group(self._cancel_group_name(name)).cancel()
+
     async def install_package(self, name: str, version: str):
         async with self._package_lock:
             logger.info(f"Starting package installation: {name}-{version}")
+            # 安装开始时创建取消组，cancel_installation 会结束组内的进程
+            group = self._subprocess.group(self._cancel_group_name(name))
             self.emit("installation-started", name, version)
             should_start_session = self.waydroid.state == WaydroidState.RUNNING
             package_info = self.get_package_info(name, version)
@@ -561,6 +755,8 @@ class PackageManager(GObject.Object):
             logger.info(f"Starting package file download: {name}-{version}")
             await self.download(package_info)
             logger.info(f"Package file download completed: {name}-{version}")
+            if group.cancelled:
+                raise InstallationCancelled(f"{name}-{version}")
 
             # 调用 installer
             package_name = package_info["name"]
@@ -569,27 +765,39 @@ class PackageManager(GObject.Object):
             pkgdir = os.path.join(startdir, "pkg")
             package = f"{startdir}/{package_name}-{package_version}.tar.gz"
             logger.info(f"Starting package build: {package_name}-{package_version}")
-            await self._subprocess.submit(
-                f'{os.environ["WAYDROID_CLI_PATH"]} call_package "{startdir}" "{package_name}" "{package_version}"',
-                env={
-                    "CARCH": self.arch,
-                    "SDK": self.get_android_version_to_sdk(
-                        self.waydroid.get_android_version()
-                    ),
-                },
-                shell=False,
-            ).get()
-            logger.info(f"Package build completed: {package_name}-{package_version}")
-            if "install" in package_info.keys():
-                logger.info(f"Executing pre-install operations: {package_name}")
-                await self.pre_install(package_info)
-                logger.info(f"Pre-install operations completed: {package_name}")
-            
-            logger.info(f"Starting package installation to system: {package_name}")
-            await self._subprocess.submit(
-                f'pkexec {os.environ["WAYDROID_CLI_PATH"]} install "{package}"',
-                shell=False,
-            ).get()
+            try:
+                # 构建输出逐行转发给界面，构建和安装进程都加入取消组
+                async for line in self._subprocess.stream(
+                    f'{os.environ["WAYDROID_CLI_PATH"]} call_package "{startdir}" "{package_name}" "{package_version}"',
+                    env={
+                        "CARCH": self.arch,
+                        "SDK": await self.get_image_sdk(),
+                    },
+                    shell=False,
+                    long_running=True,
+                    group=group,
+                ):
+                    logger.debug(line)
+                    self.emit("installation-output", name, line)
+                logger.info(f"Package build completed: {package_name}-{package_version}")
+                if "install" in package_info.keys():
+                    logger.info(f"Executing pre-install operations: {package_name}")
+                    await self.pre_install(package_info)
+                    logger.info(f"Pre-install operations completed: {package_name}")
+                if group.cancelled:
+                    raise InstallationCancelled(f"{name}-{version}")
+
+                logger.info(f"Starting package installation to system: {package_name}")
+                await self._subprocess.submit(
+                    f'pkexec {os.environ["WAYDROID_CLI_PATH"]} install "{package}"',
+                    shell=False,
+                    long_running=True,
+                    group=group,
+                ).get()
+            except (SubprocessError, asyncio.CancelledError):
+                if not group.cancelled:
+                    raise
+                raise InstallationCancelled(f"{name}-{version}") from None
             logger.info(f"Package installation to system completed: {package_name}")
 
             installed_files = self.get_all_files_relative(pkgdir)
@@ -606,11 +814,10 @@ class PackageManager(GObject.Object):
                 ) as f:
                     content = await f.read()
                     props: dict[str, Any] = json.loads(content)
-                    success = await self.waydroid.set_extension_props(props)
+                    logger.info(f"Setting package properties and upgrading system: {package_name}")
+                    success = await self.waydroid.set_extension_props(props, upgrade=True)
                     if success:
-                        logger.info(f"Package properties set successfully, starting system upgrade: {package_name}")
-                        await self.waydroid.upgrade(offline=True)
-                        logger.info(f"System upgrade completed: {package_name}")
+                        logger.info(f"Package properties applied and system upgraded: {package_name}")
                     else:
                         logger.warning(f"Failed to set package properties: {package_name}")
 
@@ -662,6 +869,8 @@ class PackageManager(GObject.Object):
                 self.storage_dir, "local", info["name"], "install"
             )
 
+        import yaml  # only needed when installing, keep it off the startup path
+
         async with aiofiles.open(install_path, "r") as f:
             content = await f.read()
             yml = yaml.safe_load(content)
@@ -807,6 +1016,7 @@ class PackageManager(GObject.Object):
                 await self._subprocess.submit(
                     f'pkexec {os.environ["WAYDROID_CLI_PATH"]} rm_overlay {" ".join(self.installed_packages[package_name]["installed_files"])}',
                     shell=False,
+                    long_running=True,
                 ).get()
                 logger.info(f"System overlay file removal completed: {package_name}")
                 # await self._subprocess.run(
@@ -815,12 +1025,10 @@ class PackageManager(GObject.Object):
                 if "props" in self.installed_packages[package_name].keys():
                     logger.info(f"Starting package property configuration removal: {package_name}")
                     success = await self.waydroid.remove_extension_props(
-                        self.installed_packages[package_name]["props"]
+                        self.installed_packages[package_name]["props"], upgrade=True
                     )
                     if success:
-                        logger.info(f"Package properties removed successfully, starting system upgrade: {package_name}")
-                        _ = await self.waydroid.upgrade(offline=True)
-                        logger.info(f"System upgrade completed: {package_name}")
+                        logger.info(f"Package properties removed and system upgraded: {package_name}")
                     else:
                         logger.warning(f"Failed to remove package properties: {package_name}")
                         
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Bulk access to Android properties through Waydroid's own binder client.
+
+`waydroid prop get` starts a full Waydroid process and opens a new gbinder
+connection for every single key. This script loads Waydroid's Python stack
+once and handles a whole batch over one connection:
+
+    prop_service.py get KEY...          -> {"KEY": "value", ...}
+    prop_service.py set KEY=VALUE...    -> {"KEY": true, ...}
+
+It must run with the system python3 (gbinder is a C extension installed for
+it) and is invoked by file path so that it does not import waydroid_helper.
+Exit code 2 means the Waydroid libraries could not be loaded and the caller
+should fall back to `waydroid prop`.
+"""
+
+import json
+import os
+import shutil
+import sys
+
+EXIT_UNAVAILABLE = 2
+
+
+def _waydroid_lib_dir() -> str:
+    executable = shutil.which("waydroid")
+    if executable is not None:
+        return os.path.dirname(os.path.realpath(executable))
+    return "/usr/lib/waydroid"
+
+
+def _load_waydroid():
+    sys.path.insert(0, _waydroid_lib_dir())
+    import tools.config  # pyright: ignore[reportMissingImports]
+    import tools.helpers  # pyright: ignore[reportMissingImports]
+    from tools.helpers import props  # pyright: ignore[reportMissingImports]
+
+    # helpers.arguments() parses sys.argv, give it a valid prop command line
+    argv, sys.argv = sys.argv, ["waydroid", "prop", "get", "-"]
+    try:
+        args = tools.helpers.arguments()
+    finally:
+        sys.argv = argv
+    args.cache = {}
+    args.work = tools.config.defaults["work"]
+    args.config = args.work + "/waydroid.cfg"
+    args.log = args.work + "/waydroid.log"
+    args.sudo_timer = False
+    args.timeout = 1800
+    drivers = getattr(tools.helpers, "drivers", None)
+    if drivers is not None and hasattr(drivers, "loadBinderNodes"):
+        drivers.loadBinderNodes(args)
+    return args, props
+
+
+def main(argv: list[str]) -> int:
+    if len(argv) < 2 or argv[0] not in ("get", "set"):
+        print(__doc__, file=sys.stderr)
+        return 1
+
+    try:
+        args, props = _load_waydroid()
+    except Exception as e:
+        print(f"Waydroid libraries unavailable: {e}", file=sys.stderr)
+        return EXIT_UNAVAILABLE
+
+    result: dict[str, str | bool] = {}
+    if argv[0] == "get":
+        for key in argv[1:]:
+            value = props.get(args, key)
+            result[key] = value if value else ""
+    else:
+        for item in argv[1:]:
+            key, _, value = item.partition("=")
+            try:
+                props.set(args, key, value)
+                result[key] = True
+            except Exception as e:
+                print(f"Failed to set {key}: {e}", file=sys.stderr)
+                result[key] = False
+
+    print(json.dumps(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,14 +1,18 @@
 from .abx_reader import AbxReader
 from .log import logger
-from .subprocess_manager import SubprocessError, SubprocessJob, SubprocessManager
+from .subprocess_manager import (CancelGroup, JobMetrics, SubprocessError,
+                                 SubprocessJob, SubprocessManager)
 from .task import Task
 from .template import template
+from .adb_client import AdbClient, AdbDeviceTransport, AdbError
 from .adb_helper import AdbHelper
 from .weak_ref import \
     connect_weakly  # pyright: ignore[reportUnknownVariableType]
 
 __all__ = [
     'logger',
+    'CancelGroup',
+    'JobMetrics',
     'SubprocessError',
     'SubprocessJob',
     'SubprocessManager',
@@ -16,5 +20,8 @@ __all__ = [
     'connect_weakly',
     'template',
     'AbxReader',
+    'AdbClient',
+    'AdbDeviceTransport',
+    'AdbError',
     'AdbHelper',
 ]
@@ -0,0 +1,405 @@
+"""Native asyncio clients for the adb protocols.
+
+``AdbClient`` talks the host protocol to the local adb server (port 5037) and
+``AdbDeviceTransport`` talks the device protocol directly to adbd over TCP,
+multiplexing every stream over one connection. Both expose the same
+``shell``/``open_shell``/``push``/``reverse`` coroutines, built on top of
+``open_service``; only the server client can ``connect``, ``disconnect`` and
+``forward``, and reverse tunnels always need the server.
+"""
+
+import abc
+import asyncio
+import os
+import struct
+from typing import Awaitable, Callable
+
+from waydroid_helper.util.log import logger
+
+ADB_SERVER_HOST = "127.0.0.1"
+ADB_SERVER_PORT = int(os.environ.get("ANDROID_ADB_SERVER_PORT", "5037"))
+
+# sync protocol
+SYNC_DATA_MAX = 64 * 1024
+DEFAULT_PUSH_MODE = 0o100644
+
+# device protocol
+A_CNXN = 0x4E584E43
+A_OPEN = 0x4E45504F
+A_OKAY = 0x59414B4F
+A_CLSE = 0x45534C43
+A_WRTE = 0x45545257
+A_VERSION = 0x01000001
+DEVICE_MAX_PAYLOAD = 256 * 1024
+_PACKET = struct.Struct("<6I")
+
+
+class AdbError(Exception):
+    """Raised when adb reports FAIL or the connection breaks."""
+
+
+class AdbStream:
+    """One adb service stream: a StreamReader plus a write/close pair."""
+
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        write: Callable[[bytes], Awaitable[None]],
+        close: Callable[[], Awaitable[None]],
+    ):
+        self.reader = reader
+        self._write = write
+        self._close = close
+        self.closed = False
+
+    async def read(self, n: int = -1) -> bytes:
+        return await self.reader.read(n)
+
+    async def readexactly(self, n: int) -> bytes:
+        try:
+            return await self.reader.readexactly(n)
+        except asyncio.IncompleteReadError as e:
+            raise AdbError("adb stream closed unexpectedly") from e
+
+    async def readline(self) -> bytes:
+        return await self.reader.readline()
+
+    async def write(self, data: bytes) -> None:
+        await self._write(data)
+
+    async def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            await self._close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        line = await self.reader.readline()
+        if not line:
+            raise StopAsyncIteration
+        return line.decode(errors="replace").rstrip("\r\n")
+
+
+class _AdbServices(abc.ABC):
+    """Device services shared by both transports."""
+
+    @abc.abstractmethod
+    async def open_service(self, service: str) -> AdbStream:
+        """Opens a stream to the given adb service."""
+
+    async def open_shell(self, command: str) -> AdbStream:
+        """Starts a shell command and returns its output stream."""
+        return await self.open_service(f"shell:{command}")
+
+    async def shell(self, command: str, timeout: float | None = None) -> str:
+        """Runs a shell command and returns its output."""
+        stream = await self.open_shell(command)
+        try:
+            output = await asyncio.wait_for(stream.read(), timeout=timeout)
+        finally:
+            await stream.close()
+        return output.decode(errors="replace")
+
+    async def push(
+        self, local_path: str, remote_path: str, mode: int = DEFAULT_PUSH_MODE
+    ) -> None:
+        """Pushes a file with the sync protocol."""
+        stream = await self.open_service("sync:")
+        try:
+            header = f"{remote_path},{mode}".encode()
+            await stream.write(b"SEND" + struct.pack("<I", len(header)) + header)
+            with open(local_path, "rb") as f:
+                while chunk := f.read(SYNC_DATA_MAX):
+                    await stream.write(b"DATA" + struct.pack("<I", len(chunk)) + chunk)
+            mtime = int(os.stat(local_path).st_mtime)
+            await stream.write(b"DONE" + struct.pack("<I", mtime))
+
+            reply = await stream.readexactly(8)
+            status, length = reply[:4], struct.unpack("<I", reply[4:])[0]
+            if status == b"FAIL":
+                message = await stream.readexactly(length)
+                raise AdbError(f"push failed: {message.decode(errors='replace')}")
+            if status != b"OKAY":
+                raise AdbError(f"unexpected sync reply: {status!r}")
+            await stream.write(b"QUIT" + struct.pack("<I", 0))
+        finally:
+            await stream.close()
+
+    async def reverse(self, remote: str, local: str) -> None:
+        """Forwards ``remote`` on the device to ``local`` on this host."""
+        await self._device_command(f"reverse:forward:{remote};{local}")
+
+    async def reverse_remove_all(self) -> None:
+        await self._device_command("reverse:killforward-all")
+
+    async def _device_command(self, service: str) -> None:
+        stream = await self.open_service(service)
+        try:
+            await _read_status(stream.reader)
+        finally:
+            await stream.close()
+
+
+async def _read_status(reader: asyncio.StreamReader) -> None:
+    """Reads OKAY, or FAIL with a length-prefixed message."""
+    try:
+        status = await reader.readexactly(4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            raise AdbError((await _read_hex_prefixed(reader)).decode(errors="replace"))
+    except asyncio.IncompleteReadError as e:
+        raise AdbError("adb server closed the connection") from e
+    raise AdbError(f"unexpected adb status: {status!r}")
+
+
+async def _read_hex_prefixed(reader: asyncio.StreamReader) -> bytes:
+    length = int(await reader.readexactly(4), 16)
+    return await reader.readexactly(length)
+
+
+def _encode_request(request: str) -> bytes:
+    payload = request.encode()
+    return f"{len(payload):04x}".encode() + payload
+
+
+class AdbClient(_AdbServices):
+    """Host protocol client for the local adb server.
+
+    Every adb service consumes the socket it is opened on, so each call uses
+    its own loopback connection; none of them fork an adb process.
+    """
+
+    def __init__(
+        self,
+        serial: str,
+        host: str = ADB_SERVER_HOST,
+        port: int = ADB_SERVER_PORT,
+    ):
+        self.serial = serial
+        self.host = host
+        self.port = port
+
+    async def _open(
+        self, request: str
+    ) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        except OSError as e:
+            raise AdbError(f"adb server unavailable: {e}") from e
+        try:
+            writer.write(_encode_request(request))
+            await writer.drain()
+            await _read_status(reader)
+        except BaseException:
+            writer.close()
+            raise
+        return reader, writer
+
+    async def _query(self, request: str) -> str:
+        """Runs a host service that replies with a length-prefixed string."""
+        reader, writer = await self._open(request)
+        try:
+            return (await _read_hex_prefixed(reader)).decode(errors="replace")
+        except asyncio.IncompleteReadError as e:
+            raise AdbError("adb server closed the connection") from e
+        finally:
+            writer.close()
+
+    async def version(self) -> int:
+        return int(await self._query("host:version"), 16)
+
+    async def connect(self, serial: str | None = None) -> str:
+        return await self._query(f"host:connect:{serial or self.serial}")
+
+    async def disconnect(self, serial: str | None = None) -> str:
+        return await self._query(f"host:disconnect:{serial or self.serial}")
+
+    async def forward(self, local: str, remote: str) -> None:
+        """Forwards ``local`` on this host to ``remote`` on the device."""
+        reader, writer = await self._open(
+            f"host-serial:{self.serial}:forward:{local};{remote}"
+        )
+        try:
+            await _read_status(reader)
+        finally:
+            writer.close()
+
+    async def open_service(self, service: str) -> AdbStream:
+        reader, writer = await self._open(f"host:transport:{self.serial}")
+        try:
+            writer.write(_encode_request(service))
+            await writer.drain()
+            await _read_status(reader)
+        except BaseException:
+            writer.close()
+            raise
+
+        async def write(data: bytes) -> None:
+            writer.write(data)
+            await writer.drain()
+
+        async def close() -> None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+        return AdbStream(reader, write, close)
+
+
+class _DeviceStream:
+    def __init__(self, local_id: int):
+        self.local_id = local_id
+        self.remote_id = 0
+        self.reader = asyncio.StreamReader()
+        self.opened: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self.can_write = asyncio.Event()
+        self.closed = False
+
+
+class AdbDeviceTransport(_AdbServices):
+    """Device protocol over one TCP connection to adbd.
+
+    Only devices that accept the connection without RSA authentication are
+    supported; ``connect`` raises ``AdbError`` otherwise so callers can fall
+    back to ``AdbClient``. Reverse tunnels are not available here.
+    """
+
+    def __init__(self, host: str, port: int = 5555):
+        self.host = host
+        self.port = port
+        self.max_payload = DEVICE_MAX_PAYLOAD
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._streams: dict[int, _DeviceStream] = {}
+        self._next_id = 1
+        self._read_task: asyncio.Task[None] | None = None
+
+    @property
+    def connected(self) -> bool:
+        return self._read_task is not None and not self._read_task.done()
+
+    async def connect(self, timeout: float = 1.0) -> None:
+        try:
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), timeout=timeout
+            )
+            self._send(A_CNXN, A_VERSION, DEVICE_MAX_PAYLOAD, b"host::\0")
+            command, _, arg1, _ = await asyncio.wait_for(
+                self._read_packet(), timeout=timeout
+            )
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+            self._close_writer()
+            raise AdbError(f"direct connection to {self.host}:{self.port} failed: {e}") from e
+        if command != A_CNXN:
+            self._close_writer()
+            raise AdbError("device requires authentication")
+        self.max_payload = min(arg1, DEVICE_MAX_PAYLOAD)
+        self._read_task = asyncio.create_task(self._dispatch())
+
+    async def close(self) -> None:
+        if self._read_task is not None:
+            self._read_task.cancel()
+            self._read_task = None
+        self._close_writer()
+        self._fail_all()
+
+    def _close_writer(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def _send(self, command: int, arg0: int, arg1: int, data: bytes = b"") -> None:
+        if self._writer is None:
+            raise AdbError("device transport is closed")
+        header = _PACKET.pack(
+            command, arg0, arg1, len(data), sum(data) & 0xFFFFFFFF, command ^ 0xFFFFFFFF
+        )
+        self._writer.write(header + data)
+
+    async def _read_packet(self) -> tuple[int, int, int, bytes]:
+        assert self._reader is not None
+        command, arg0, arg1, length, _, magic = _PACKET.unpack(
+            await self._reader.readexactly(_PACKET.size)
+        )
+        if magic != command ^ 0xFFFFFFFF:
+            raise AdbError("corrupt adb packet")
+        data = await self._reader.readexactly(length) if length else b""
+        return command, arg0, arg1, data
+
+    async def _dispatch(self) -> None:
+        try:
+            while True:
+                command, arg0, arg1, data = await self._read_packet()
+                stream = self._streams.get(arg1)
+                if command == A_OPEN:
+                    # device-initiated streams (reverse tunnels) are not served here
+                    self._send(A_CLSE, 0, arg0)
+                elif stream is None:
+                    continue
+                elif command == A_OKAY:
+                    if not stream.opened.done():
+                        stream.remote_id = arg0
+                        stream.opened.set_result(None)
+                    stream.can_write.set()
+                elif command == A_WRTE:
+                    stream.reader.feed_data(data)
+                    self._send(A_OKAY, stream.local_id, stream.remote_id)
+                elif command == A_CLSE:
+                    self._finish(stream, AdbError("service refused"))
+        except (asyncio.IncompleteReadError, OSError, AdbError) as e:
+            logger.warning(f"Direct adb transport closed: {e}")
+        finally:
+            self._close_writer()
+            self._fail_all()
+
+    def _finish(self, stream: _DeviceStream, error: Exception) -> None:
+        stream.closed = True
+        self._streams.pop(stream.local_id, None)
+        if not stream.opened.done():
+            stream.opened.set_exception(error)
+        stream.reader.feed_eof()
+        stream.can_write.set()
+
+    def _fail_all(self) -> None:
+        for stream in list(self._streams.values()):
+            self._finish(stream, AdbError("device transport is closed"))
+
+    async def open_service(self, service: str) -> AdbStream:
+        if not self.connected:
+            raise AdbError("device transport is not connected")
+        stream = _DeviceStream(self._next_id)
+        self._next_id += 1
+        self._streams[stream.local_id] = stream
+        self._send(A_OPEN, stream.local_id, 0, service.encode() + b"\0")
+        try:
+            await stream.opened
+        except BaseException:
+            self._streams.pop(stream.local_id, None)
+            raise
+
+        async def write(data: bytes) -> None:
+            # adb allows one unacknowledged WRTE per stream
+            for offset in range(0, len(data), self.max_payload):
+                await stream.can_write.wait()
+                if stream.closed:
+                    raise AdbError("adb stream closed")
+                stream.can_write.clear()
+                self._send(
+                    A_WRTE,
+                    stream.local_id,
+                    stream.remote_id,
+                    data[offset : offset + self.max_payload],
+                )
+
+        async def close() -> None:
+            if not stream.closed and self._writer is not None:
+                self._send(A_CLSE, stream.local_id, stream.remote_id)
+            self._finish(stream, AdbError("adb stream closed"))
+
+        return AdbStream(stream.reader, write, close)
+
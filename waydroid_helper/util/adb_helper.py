@@ -1,13 +1,42 @@
+import asyncio
+import hashlib
 import os
 import re
 import secrets
+from typing import Callable
 
+from waydroid_helper.util.adb_client import (
+    AdbClient,
+    AdbDeviceTransport,
+    AdbError,
+    AdbStream,
+)
 from waydroid_helper.util.log import logger
 from waydroid_helper.util.subprocess_manager import SubprocessManager
 
 SCRCPY_SERVER_PATH_ON_DEVICE = "/data/local/tmp/scrcpy-server.jar"
 SCRCPY_VERSION = "3.3.1"
 
+# 在设备端循环查询前台 Activity，只在变化时输出一行，整个会话只占用一个 adb shell
+FOREGROUND_POLL_SECONDS = 1
+_FOREGROUND_WATCH_SCRIPT = (
+    "last=; while true; do "
+    "cur=$(dumpsys activity activities | grep -m1 ResumedActivity); "
+    'if [ "$cur" != "$last" ]; then echo "$cur"; last=$cur; fi; '
+    f"sleep {FOREGROUND_POLL_SECONDS}; done"
+)
+
+# 同样在设备端轮询显示信息，尺寸或旋转变化时输出一行 DisplayInfo
+DISPLAY_POLL_SECONDS = 1
+_DISPLAY_WATCH_SCRIPT = (
+    "last=; while true; do "
+    "cur=$(dumpsys display | grep -m1 mOverrideDisplayInfo); "
+    'if [ "$cur" != "$last" ]; then echo "$cur"; last=$cur; fi; '
+    f"sleep {DISPLAY_POLL_SECONDS}; done"
+)
+_DISPLAY_SIZE_RE = re.compile(r"\breal (\d+) x (\d+)")
+_DISPLAY_ROTATION_RE = re.compile(r"\brotation (\d)")
+
 # Get the correct path for scrcpy-server, handling both normal and AppImage environments
 def _get_scrcpy_server_path() -> str:
     # In AppImage environment, use PKGDATADIR
@@ -23,20 +52,76 @@ def _get_scrcpy_server_path() -> str:
 
 SCRCPY_SERVER_PATH_ON_PC = _get_scrcpy_server_path()
 
+# (path, size, mtime_ns) -> sha256 hex digest
+_local_hash_cache: dict[tuple[str, int, int], str] = {}
+
+
+def _local_sha256(path: str) -> str:
+    st = os.stat(path)
+    key = (path, st.st_size, st.st_mtime_ns)
+    digest = _local_hash_cache.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(1024 * 1024):
+                h.update(chunk)
+        digest = _local_hash_cache[key] = h.hexdigest()
+    return digest
+
 
 class AdbHelper:
     def __init__(self):
         self.sm = SubprocessManager()
         self.serial = "192.168.240.112:5555"
+        self.client = AdbClient(self.serial)
+        # Direct adbd connection; when available shell and push share it
+        self.device: AdbDeviceTransport | None = None
+        self._scrcpy_stream: AdbStream | None = None
+        self._scrcpy_log_task: asyncio.Task[None] | None = None
+
+    @property
+    def services(self) -> AdbClient | AdbDeviceTransport:
+        if self.device is not None and self.device.connected:
+            return self.device
+        return self.client
+
+    async def _ensure_server(self) -> None:
+        try:
+            await self.client.version()
+        except AdbError:
+            # The adb CLI is only needed once, to spawn the server daemon
+            logger.info("Starting adb server")
+            await self.sm.submit("adb start-server", shell=False).get()
+
+    async def _connect_direct(self) -> None:
+        if self.device is not None:
+            await self.device.close()
+            self.device = None
+        host, _, port = self.serial.rpartition(":")
+        if not host or not port.isdigit():
+            return
+        device = AdbDeviceTransport(host, int(port))
+        try:
+            await device.connect()
+        except AdbError as e:
+            logger.debug(f"Direct adb transport unavailable, using adb server: {e}")
+            return
+        self.device = device
+        logger.info(f"Direct adb transport connected to {self.serial}")
 
     async def connect(self) -> bool:
         """Connects to the ADB device using the configured serial."""
         logger.info(f"Connecting to ADB device: {self.serial}")
         try:
-            result = await self.sm.submit(f"adb disconnect {self.serial}; adb connect {self.serial}", shell=True).get()
-            output = result["stdout"]
+            await self._ensure_server()
+            try:
+                await self.client.disconnect()
+            except AdbError:
+                pass
+            output = await self.client.connect()
             if "connected" in output.lower() or "already connected" in output.lower():
                 logger.info(f"Successfully connected to {self.serial}")
+                await self._connect_direct()
                 return True
             else:
                 logger.warning(f"ADB connect output: {output}")
@@ -48,8 +133,7 @@ class AdbHelper:
     async def get_screen_resolution(self) -> tuple[int, int] | None:
         logger.info("Getting device screen resolution...")
         try:
-            result = await self.sm.submit(f"adb -s {self.serial} shell dumpsys window displays", shell=False).get()
-            output = result["stdout"]
+            output = await self.services.shell("dumpsys window displays")
             match = re.search(r"cur=(\d+)x(\d+)", output)
             if match:
                 width = int(match.group(1))
@@ -65,16 +149,28 @@ class AdbHelper:
             logger.error(f"Failed to get screen resolution: {e}")
             return None
 
+    async def _scrcpy_server_up_to_date(self) -> bool:
+        """Compares the jar on the device with the bundled one by SHA-256."""
+        try:
+            output = await self.services.shell(
+                f"sha256sum {SCRCPY_SERVER_PATH_ON_DEVICE} 2>/dev/null"
+            )
+        except AdbError as e:
+            logger.debug(f"Could not hash scrcpy-server on device: {e}")
+            return False
+        device_hash = output.split(maxsplit=1)[0] if output.strip() else ""
+        return device_hash == _local_sha256(SCRCPY_SERVER_PATH_ON_PC)
+
     async def push_scrcpy_server(self) -> bool:
-        logger.info(f"Pushing scrcpy-server to {SCRCPY_SERVER_PATH_ON_DEVICE}")
         try:
             if not os.path.exists(SCRCPY_SERVER_PATH_ON_PC):
                 logger.error(f"scrcpy-server not found at {SCRCPY_SERVER_PATH_ON_PC}")
                 return False
-            await self.sm.submit(
-                f"adb -s {self.serial} push {SCRCPY_SERVER_PATH_ON_PC} {SCRCPY_SERVER_PATH_ON_DEVICE}",
-                shell=False
-            ).get()
+            if await self._scrcpy_server_up_to_date():
+                logger.info("scrcpy-server on device is up to date, skipping push")
+                return True
+            logger.info(f"Pushing scrcpy-server to {SCRCPY_SERVER_PATH_ON_DEVICE}")
+            await self.services.push(SCRCPY_SERVER_PATH_ON_PC, SCRCPY_SERVER_PATH_ON_DEVICE)
             return True
         except Exception as e:
             logger.error(f"Failed to push scrcpy-server: {e}")
@@ -83,8 +179,8 @@ class AdbHelper:
     async def reverse_tunnel(self, socket_name: str, port: int) -> bool:
         logger.info("Setting up adb reverse tunnel")
         try:
-            await self.sm.submit(f"adb -s {self.serial} reverse --remove-all", shell=False).get()
-            await self.sm.submit(f"adb -s {self.serial} reverse localabstract:{socket_name} tcp:{port}", shell=False).get()
+            await self.client.reverse_remove_all()
+            await self.client.reverse(f"localabstract:{socket_name}", f"tcp:{port}")
             return True
         except Exception as e:
             logger.error(f"Failed to set up adb reverse tunnel: {e}")
@@ -93,7 +189,7 @@ class AdbHelper:
     async def remove_reverse_tunnel(self) -> bool:
         logger.info("Removing adb reverse tunnel")
         try:
-            await self.sm.submit(f"adb -s {self.serial} reverse --remove-all", shell=False).get()
+            await self.client.reverse_remove_all()
             return True
         except Exception as e:
             logger.error(f"Failed to remove adb reverse tunnel: {e}")
@@ -103,16 +199,106 @@ class AdbHelper:
         logger.info("Starting scrcpy-server on device")
         try:
             server_command = (
-                f"adb -s {self.serial} shell CLASSPATH={SCRCPY_SERVER_PATH_ON_DEVICE} app_process / com.genymobile.scrcpy.Server "
+                f"CLASSPATH={SCRCPY_SERVER_PATH_ON_DEVICE} app_process / com.genymobile.scrcpy.Server "
                 f"{SCRCPY_VERSION} scid={scid} log_level=debug video=false audio=false control=true"
             )
-            await self.sm.submit(server_command, flag=True, shell=False).get()
+            await self.stop_scrcpy_server()
+            # The shell stream stays open for as long as the server runs
+            self._scrcpy_stream = await self.services.open_shell(server_command)
+            self._scrcpy_log_task = asyncio.create_task(
+                self._log_scrcpy_output(self._scrcpy_stream)
+            )
             logger.info("scrcpy-server start command sent.")
             return True
         except Exception as e:
             logger.error(f"Failed to start scrcpy-server: {e}")
             return False
 
+    async def _log_scrcpy_output(self, stream: AdbStream) -> None:
+        async for line in stream:
+            logger.debug(f"scrcpy-server: {line}")
+        logger.info("scrcpy-server exited")
+
+    async def stop_scrcpy_server(self) -> None:
+        if self._scrcpy_log_task is not None:
+            self._scrcpy_log_task.cancel()
+            self._scrcpy_log_task = None
+        if self._scrcpy_stream is not None:
+            await self._scrcpy_stream.close()
+            self._scrcpy_stream = None
+
+    async def close(self) -> None:
+        """Stops the scrcpy server and closes the direct transport."""
+        await self.stop_scrcpy_server()
+        if self.device is not None:
+            await self.device.close()
+            self.device = None
+
+    @staticmethod
+    def parse_resumed_package(line: str) -> str | None:
+        """从 "ResumedActivity: ActivityRecord{... u0 com.pkg/.Main t12}" 中提取包名"""
+        for token in line.split():
+            if "/" in token and not token.startswith("{"):
+                return token.split("/", 1)[0]
+        return None
+
+    @staticmethod
+    def parse_display_info(line: str) -> tuple[int, int, int] | None:
+        """从 "DisplayInfo{... real 1080 x 2400, ... rotation 1, ...}" 中提取 (宽, 高, 旋转)"""
+        size = _DISPLAY_SIZE_RE.search(line)
+        if size is None:
+            return None
+        rotation = _DISPLAY_ROTATION_RE.search(line)
+        return (
+            int(size.group(1)),
+            int(size.group(2)),
+            int(rotation.group(1)) if rotation else 0,
+        )
+
+    async def _watch_shell(
+        self, name: str, script: str, on_line: Callable[[str], None]
+    ) -> "asyncio.Task[None] | None":
+        """启动一个常驻 adb shell，每输出一行调用一次 on_line"""
+        logger.info(f"Starting {name} watcher")
+        try:
+            stream = await self.services.open_shell(script)
+        except Exception as e:
+            logger.error(f"Failed to start {name} watcher: {e}")
+            return None
+
+        async def watch() -> None:
+            try:
+                async for line in stream:
+                    on_line(line)
+            finally:
+                await stream.close()
+
+        return asyncio.create_task(watch())
+
+    async def watch_foreground_app(
+        self, callback: Callable[[str], None]
+    ) -> "asyncio.Task[None] | None":
+        """前台应用变化时以包名调用 callback"""
+
+        def on_line(line: str) -> None:
+            package = self.parse_resumed_package(line)
+            if package:
+                callback(package)
+
+        return await self._watch_shell("foreground app", _FOREGROUND_WATCH_SCRIPT, on_line)
+
+    async def watch_display(
+        self, callback: Callable[[int, int, int], None]
+    ) -> "asyncio.Task[None] | None":
+        """设备显示尺寸或旋转变化时以 (宽, 高, 旋转) 调用 callback"""
+
+        def on_line(line: str) -> None:
+            info = self.parse_display_info(line)
+            if info is not None:
+                callback(*info)
+
+        return await self._watch_shell("display", _DISPLAY_WATCH_SCRIPT, on_line)
+
     def generate_scid(self) -> tuple[str, str]:
         scid_int = secrets.randbelow(0x7FFFFFFF)
         scid = f"{scid_int:x}"
@@ -0,0 +1,116 @@
+"""
+Parsed build.prop of a Waydroid system image.
+
+Reading build.prop needs ``debugfs`` to open the ext4 image, which is slow
+enough to notice. The parsed properties are cached in memory and on disk,
+keyed on the image identity (path, size, mtime, inode). A new image after
+``waydroid upgrade`` gets a new identity and is read again.
+"""
+
+import hashlib
+import json
+import os
+
+from gi.repository import GLib
+
+from waydroid_helper.util.log import logger
+from waydroid_helper.util.subprocess_manager import SubprocessError, SubprocessManager
+
+# Location of build.prop inside system.img (system-as-root and legacy layouts)
+BUILD_PROP_PATHS = ("/system/build.prop", "/build.prop")
+# Bump when the cache file format changes
+CACHE_VERSION = 1
+
+ImageIdentity = tuple[str, int, int, int]
+
+
+def parse_build_prop(text: str) -> dict[str, str]:
+    """Parse ``key=value`` lines, ignoring comments and imports"""
+    props: dict[str, str] = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        key, _, value = line.partition("=")
+        props[key.strip()] = value.strip()
+    return props
+
+
+def image_identity(image_path: str) -> ImageIdentity | None:
+    try:
+        path = os.path.realpath(image_path)
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (path, st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+class BuildPropIndex:
+    def __init__(self, cache_dir: str | None = None):
+        self._cache_dir: str = cache_dir or os.path.join(
+            GLib.get_user_cache_dir(), "waydroid-helper", "build_prop"
+        )
+        self._memory: dict[ImageIdentity, dict[str, str]] = {}
+        self._subprocess: SubprocessManager = SubprocessManager()
+
+    async def load(self, image_path: str) -> dict[str, str]:
+        """All properties from the image's build.prop; empty if it cannot be read"""
+        identity = image_identity(image_path)
+        if identity is None:
+            logger.warning(f"System image not found: {image_path}")
+            return {}
+
+        props = self._memory.get(identity)
+        if props is None:
+            props = self._read_cache(identity)
+        if props is None:
+            props = await self._read_image(identity)
+            if props:
+                self._write_cache(identity, props)
+        if props:
+            self._memory[identity] = props
+        return props
+
+    async def _read_image(self, identity: ImageIdentity) -> dict[str, str]:
+        path = identity[0]
+        for build_prop in BUILD_PROP_PATHS:
+            try:
+                result = await self._subprocess.query(
+                    ["debugfs", "-R", f"cat {build_prop}", path], stamp=identity
+                )
+            except SubprocessError as e:
+                logger.error(f"Failed to read {build_prop} from {path}: {e}")
+                return {}
+            props = parse_build_prop(result["stdout"])
+            if props:
+                return props
+        logger.warning(f"No build.prop found in {path}")
+        return {}
+
+    def _cache_file(self, identity: ImageIdentity) -> str:
+        # One file per image path; a replaced image overwrites the stale entry
+        digest = hashlib.sha1(identity[0].encode()).hexdigest()
+        return os.path.join(self._cache_dir, f"{digest}.json")
+
+    def _read_cache(self, identity: ImageIdentity) -> dict[str, str] | None:
+        try:
+            with open(self._cache_file(identity)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != CACHE_VERSION or tuple(data.get("identity", ())) != identity:
+            return None
+        return data.get("props")
+
+    def _write_cache(self, identity: ImageIdentity, props: dict[str, str]) -> None:
+        cache_file = self._cache_file(identity)
+        tmp_file = f"{cache_file}.tmp"
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            with open(tmp_file, "w") as f:
+                json.dump(
+                    {"version": CACHE_VERSION, "identity": list(identity), "props": props}, f
+                )
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logger.warning(f"Failed to write build.prop cache: {e}")
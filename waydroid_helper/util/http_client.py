@@ -0,0 +1,169 @@
+import asyncio
+import heapq
+import itertools
+import random
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+
+from waydroid_helper.util.log import logger
+
+try:
+    import h2  # pyright: ignore[reportMissingImports,reportUnusedImport]  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    # 没有安装 h2 时退回 HTTP/1.1，仍然复用 keep-alive 连接
+    HTTP2_AVAILABLE = False
+
+# 同一主机同时进行的请求数
+PER_HOST_LIMIT = 4
+# 连接池上限及空闲连接保留时间
+MAX_CONNECTIONS = 16
+KEEPALIVE_EXPIRY = 30.0
+# 重试的指数退避：base * 2^attempt，上限 max，再乘以 0.5~1.5 的随机抖动
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 30.0
+# 这些状态码视为临时错误，可以重试
+RETRY_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+# 优先级：数值越小越先拿到连接，元数据（extensions.json、PKGBUILD 等）先于大文件
+PRIORITY_METADATA = 0
+PRIORITY_PAYLOAD = 10
+
+
+class _HostSlots:
+    """单个主机的并发名额，等待者按优先级（同优先级按先后顺序）获得名额"""
+
+    def __init__(self, limit: int):
+        self.limit: int = limit
+        self.active: int = 0
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._counter: itertools.count[int] = itertools.count()
+
+    async def acquire(self, priority: int):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # 名额已经转交过来但任务被取消，交给下一个等待者
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # 名额直接转交，active 不变
+                future.set_result(None)
+                return
+        self.active -= 1
+
+
+class HttpClient:
+    """应用共享的 HTTP 客户端
+
+    所有请求复用同一个连接池（可用时使用 HTTP/2），按主机限制并发并按优先级排队，
+    临时错误按带抖动的指数退避重试。测试时可以传入自己的限制和 transport。
+    """
+
+    def __init__(
+        self,
+        per_host_limit: int = PER_HOST_LIMIT,
+        base_delay: float = RETRY_BASE_DELAY,
+        max_delay: float = RETRY_MAX_DELAY,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.per_host_limit: int = per_host_limit
+        self.base_delay: float = base_delay
+        self.max_delay: float = max_delay
+        self._transport: httpx.AsyncBaseTransport | None = transport
+        self._client: httpx.AsyncClient | None = None
+        self._hosts: dict[str, _HostSlots] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """首次使用时才创建，避免在没有事件循环时建立连接池"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                follow_redirects=True,
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_CONNECTIONS,
+                    keepalive_expiry=KEEPALIVE_EXPIRY,
+                ),
+                transport=self._transport,
+            )
+        return self._client
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次（从 0 开始）失败后的等待秒数"""
+        delay = min(self.max_delay, self.base_delay * (2**attempt))
+        return delay * random.uniform(0.5, 1.5)
+
+    @asynccontextmanager
+    async def slot(self, url: str, priority: int = PRIORITY_PAYLOAD) -> AsyncIterator[None]:
+        """占用 url 所在主机的一个并发名额"""
+        host = urlsplit(url).netloc
+        slots = self._hosts.get(host)
+        if slots is None:
+            slots = self._hosts[host] = _HostSlots(self.per_host_limit)
+        await slots.acquire(priority)
+        try:
+            yield
+        finally:
+            slots.release()
+
+    async def get(
+        self, url: str, priority: int = PRIORITY_METADATA, retries: int = 3, **kwargs: Any
+    ) -> httpx.Response:
+        """GET 请求，网络错误和临时错误状态码会重试；最后一次的响应原样返回"""
+        for attempt in range(retries):
+            try:
+                async with self.slot(url, priority):
+                    response = await self.client.get(url, **kwargs)
+                if response.status_code not in RETRY_STATUS_CODES or attempt == retries - 1:
+                    return response
+                reason = f"status code {response.status_code}"
+            except httpx.TransportError as e:
+                if attempt == retries - 1:
+                    raise
+                reason = str(e) or type(e).__name__
+            delay = self.backoff(attempt)
+            logger.warning(f"GET {url} failed: {reason}. Retrying in {delay:.1f} seconds...")
+            await asyncio.sleep(delay)
+        raise AssertionError("unreachable")
+
+    @asynccontextmanager
+    async def stream(
+        self, method: str, url: str, priority: int = PRIORITY_PAYLOAD, **kwargs: Any
+    ) -> AsyncIterator[httpx.Response]:
+        """流式请求，在整个读取过程中占用主机名额；重试由调用方负责（以便续传）"""
+        async with self.slot(url, priority):
+            async with self.client.stream(method, url, **kwargs) as response:
+                yield response
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_shared: HttpClient | None = None
+
+
+def shared_http_client() -> HttpClient:
+    """应用内所有下载共用的客户端"""
+    global _shared
+    if _shared is None:
+        _shared = HttpClient()
+    return _shared
@@ -0,0 +1,115 @@
+# pyright: reportUnknownMemberType=false,reportUnknownArgumentType=false
+
+"""
+Change notifications for the Waydroid session.
+
+Waydroid registers ``id.waydro.Container`` on the system bus while the
+container service runs and ``id.waydro.Session`` on the user's session bus
+while a session is up. Together with a file monitor on the Waydroid config
+(written by ``waydroid init``) this tells us *when* the state may have
+changed, so ``waydroid status`` only has to run after an event instead of on
+a fixed interval. The log is not watched: every line written to it would
+trigger a status check.
+"""
+
+from collections.abc import Callable
+
+from gi.repository import Gio, GLib
+
+from waydroid_helper.util.log import logger
+
+WAYDROID_DIR = "/var/lib/waydroid"
+WATCHED_NAMES = (
+    (Gio.BusType.SYSTEM, "id.waydro.Container"),
+    (Gio.BusType.SESSION, "id.waydro.Session"),
+)
+WATCHED_FILES = (f"{WAYDROID_DIR}/waydroid.cfg",)
+# Session start/stop touches several of the sources above within a few
+# milliseconds; they are coalesced into a single notification.
+DEBOUNCE_MS = 150
+
+
+class SessionWatcher:
+    """Calls ``on_change(reason)`` whenever the session state may have changed."""
+
+    def __init__(self, on_change: Callable[[str], None], debounce_ms: int = DEBOUNCE_MS):
+        self._on_change: Callable[[str], None] = on_change
+        self._debounce_ms: int = debounce_ms
+        self._name_watch_ids: list[int] = []
+        self._monitors: list[Gio.FileMonitor] = []
+        self._pending_source: int = 0
+        self._pending_reasons: list[str] = []
+
+    @property
+    def active(self) -> bool:
+        """Whether at least one event source could be set up"""
+        return bool(self._name_watch_ids or self._monitors)
+
+    def start(self) -> None:
+        for bus_type, name in WATCHED_NAMES:
+            try:
+                self._name_watch_ids.append(
+                    Gio.bus_watch_name(
+                        bus_type,
+                        name,
+                        Gio.BusNameWatcherFlags.NONE,
+                        self._on_name_appeared,
+                        self._on_name_vanished,
+                    )
+                )
+            except GLib.Error as e:
+                logger.warning(f"Cannot watch D-Bus name {name}: {e}")
+
+        for path in WATCHED_FILES:
+            try:
+                monitor = Gio.File.new_for_path(path).monitor_file(
+                    Gio.FileMonitorFlags.NONE, None
+                )
+            except GLib.Error as e:
+                logger.warning(f"Cannot monitor {path}: {e}")
+                continue
+            monitor.connect("changed", self._on_file_changed)
+            self._monitors.append(monitor)
+
+    def stop(self) -> None:
+        for watch_id in self._name_watch_ids:
+            Gio.bus_unwatch_name(watch_id)
+        self._name_watch_ids.clear()
+        for monitor in self._monitors:
+            monitor.cancel()
+        self._monitors.clear()
+        if self._pending_source:
+            GLib.source_remove(self._pending_source)
+            self._pending_source = 0
+
+    def _on_name_appeared(self, connection: Gio.DBusConnection, name: str, owner: str):
+        self._notify(f"{name} appeared")
+
+    def _on_name_vanished(self, connection: Gio.DBusConnection | None, name: str):
+        self._notify(f"{name} vanished")
+
+    def _on_file_changed(
+        self,
+        monitor: Gio.FileMonitor,
+        file: Gio.File,
+        other_file: Gio.File | None,
+        event_type: Gio.FileMonitorEvent,
+    ):
+        if event_type in (
+            Gio.FileMonitorEvent.CHANGES_DONE_HINT,
+            Gio.FileMonitorEvent.CREATED,
+            Gio.FileMonitorEvent.DELETED,
+        ):
+            self._notify(f"{file.get_basename()} {event_type.value_nick}")
+
+    def _notify(self, reason: str) -> None:
+        self._pending_reasons.append(reason)
+        if not self._pending_source:
+            self._pending_source = GLib.timeout_add(self._debounce_ms, self._flush)
+
+    def _flush(self) -> bool:
+        self._pending_source = 0
+        reason = ", ".join(self._pending_reasons)
+        self._pending_reasons.clear()
+        self._on_change(reason)
+        return False
@@ -0,0 +1,111 @@
+"""Startup milestones and step timings, dumped as a Chrome trace.
+
+Launch with ``waydroid-helper --startup-trace FILE`` (which sets
+``WAYDROID_HELPER_STARTUP_TRACE``) and open FILE in about:tracing or Perfetto.
+Times are relative to the start of the process, so the ``import`` mark also
+covers interpreter start-up.
+"""
+
+import json
+import os
+import time
+from typing import Any, Callable
+
+from waydroid_helper.util.log import logger
+
+TRACE_ENV = "WAYDROID_HELPER_STARTUP_TRACE"
+# The trace is written once all of these have been marked; they come from
+# independent paths (the model load and the window's frame clock) in either order
+FINAL_MARKS = ("data-ready", "first-frame")
+
+
+def _process_start() -> float:
+    """Process start on the CLOCK_BOOTTIME timeline, or now if unknown"""
+    now = time.clock_gettime(time.CLOCK_BOOTTIME)
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 (starttime) follows the parenthesised command name
+            fields = f.read().rsplit(")", 1)[1].split()
+        return int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return now
+
+
+_T0 = _process_start()
+_events: list[dict[str, Any]] = []
+
+
+def _now_us() -> float:
+    return (time.clock_gettime(time.CLOCK_BOOTTIME) - _T0) * 1e6
+
+
+def enabled() -> bool:
+    return bool(os.environ.get(TRACE_ENV))
+
+
+def mark(name: str, **args: Any) -> None:
+    """Record an instant milestone such as ``import`` or ``first-frame``"""
+    ts = _now_us()
+    _events.append({"name": name, "ph": "i", "s": "g", "ts": ts, "args": args})
+    logger.debug(f"startup: {name} at {ts / 1000:.1f} ms")
+    if name in FINAL_MARKS:
+        marked = {event["name"] for event in _events if event["ph"] == "i"}
+        if marked.issuperset(FINAL_MARKS):
+            _ = dump()
+
+
+def add_timings(group: str, timings: list[Any]) -> None:
+    """Record TaskGraph step timings (``StepTiming``) as spans"""
+    now = time.monotonic()
+    end_us = _now_us()
+    for timing in timings:
+        if not timing.started:
+            continue
+        # StepTiming uses time.monotonic(); shift it onto the trace timeline
+        start_us = end_us - (now - timing.started) * 1e6
+        _events.append(
+            {
+                "name": timing.name,
+                "cat": group,
+                "ph": "X",
+                "ts": start_us,
+                "dur": timing.duration * 1e6,
+                "args": {"status": timing.status, "attempts": timing.attempts},
+            }
+        )
+
+
+def after_first_frame(widget: Any, callback: Callable[[], None]) -> None:
+    """Run callback once the widget's window has painted its next frame"""
+    clock = widget.get_frame_clock()
+    if clock is None:
+        # Not realized yet, the frame clock only exists afterwards
+        def on_realize(widget: Any) -> None:
+            widget.disconnect(realize_id)
+            after_first_frame(widget, callback)
+
+        realize_id = widget.connect("realize", on_realize)
+        return
+
+    def on_after_paint(frame_clock: Any) -> None:
+        frame_clock.disconnect(paint_id)
+        callback()
+
+    paint_id = clock.connect("after-paint", on_after_paint)
+
+
+def dump(path: str | None = None) -> str | None:
+    """Write everything recorded so far, replacing any earlier dump; returns the path written, if any"""
+    path = path or os.environ.get(TRACE_ENV)
+    if not path:
+        return None
+    pid = os.getpid()
+    events = [{**event, "pid": pid, "tid": 0} for event in _events]
+    try:
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, indent=1)
+    except OSError as e:
+        logger.error(f"Failed to write startup trace: {e}")
+        return None
+    logger.info(f"Startup trace written to {path}")
+    return path
@@ -4,7 +4,55 @@ from dataclasses import dataclass, field
 from collections import deque
 import os
 import shlex
-from typing import TypedDict
+import signal
+import time
+from functools import lru_cache
+from typing import AsyncIterator, Hashable, Sequence, TypedDict
+
+# 短任务（状态查询等）和长任务（会话启动、安装、等待授权的 pkexec）使用不同的并发池，
+# 长任务占满时不会阻塞短查询
+SHORT_POOL = "short"
+LONG_POOL = "long"
+POOL_SIZES = {SHORT_POOL: 10, LONG_POOL: 4}
+# start() 启动的进程（会话、scrcpy 等）可能一直运行，只在启动期间占用短任务池，指标单独统计
+DETACHED = "detached"
+# 保留最近多少个任务的指标
+METRICS_HISTORY = 200
+# 取消进程组时 SIGTERM 之后等待多久再 SIGKILL
+TERMINATE_GRACE_SECONDS = 2.0
+# 缓存多少种不同的环境变量覆盖组合
+ENV_CACHE_SIZE = 32
+# 查询结果缓存的最大条目数
+QUERY_CACHE_SIZE = 256
+
+# 命令可以是字符串（按 shell 语法拆分）或参数列表，参数列表可以跳过拆分直接执行
+Command = str | Sequence[str]
+
+
+def file_stamp(*paths: str) -> tuple[tuple[int, int], ...]:
+    """文件的 (mtime_ns, size)，用作查询缓存的失效依据；文件不存在时为 (0, 0)"""
+    stamps: list[tuple[int, int]] = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            stamps.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamps.append((0, 0))
+    return tuple(stamps)
+
+
+@lru_cache(maxsize=256)
+def _split_command(command: str) -> tuple[str, ...]:
+    return tuple(shlex.split(command))
+
+
+def command_text(command: Command) -> str:
+    """用于日志、key 和指标的命令文本"""
+    return command if isinstance(command, str) else shlex.join(command)
+
+
+def command_argv(command: Command) -> tuple[str, ...]:
+    return _split_command(command) if isinstance(command, str) else tuple(command)
 
 
 class SubprocessResult(TypedDict):
@@ -29,11 +77,49 @@ class SubprocessError(Exception):
         )
 
 
+@dataclass
+class JobMetrics:
+    """单个子进程的耗时指标，时间单位为秒"""
+
+    command: str
+    key: str
+    pool: str
+    queued_at: float = field(default_factory=time.monotonic)
+    queue_wait: float = 0.0  # 等待并发池的时间
+    spawn_time: float = 0.0  # fork/exec 的耗时
+    runtime: float | None = None  # 从启动到退出，运行中为 None
+    returncode: int | None = None
+    pid: int | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.runtime is not None
+
+
+@dataclass
+class QueryStats:
+    hits: int = 0
+    misses: int = 0
+    joined: int = 0  # 复用了正在执行的同一查询
+    invalidations: int = 0
+
+
+@dataclass
+class _CachedQuery:
+    result: SubprocessResult
+    stamp: Hashable
+    expires: float | None
+    tag: str | None
+
+
 @dataclass
 class SubprocessJob:
     command: str
     key: str
     process: asyncio.subprocess.Process | None = None
+    # 进程在独立会话中启动时，取消会结束整个进程组
+    new_session: bool = False
+    metrics: JobMetrics | None = None
     _stdout_buf: deque[bytes] = field(default_factory=lambda: deque(maxlen=200))
     _stderr_buf: deque[bytes] = field(default_factory=lambda: deque(maxlen=200))
     _stdout_task: asyncio.Task[None] | None = None
@@ -53,11 +139,7 @@ class SubprocessJob:
                 self._drain_stream(self.process.stderr, self._stderr_buf)
             )
 
-    async def _drain_stream(
-        self,
-        stream: asyncio.StreamReader,
-        buf: deque[bytes],
-    ) -> None:
+    async def _drain_stream(self, stream: asyncio.StreamReader, buf: deque[bytes]) -> None:
         try:
             while True:
                 chunk = await stream.readline()
@@ -88,6 +170,8 @@ class SubprocessJob:
 
         await self.process.wait()
         await self._join_capture_tasks()
+        if self.metrics is not None:
+            SubprocessManager().finish_metrics(self.metrics, self.process.returncode)
 
         return {
             "command": self.command,
@@ -133,12 +217,25 @@ class SubprocessJob:
     def done(self) -> bool:
         return self._result_task is not None and self._result_task.done()
 
+    def send_signal(self, sig: int) -> bool:
+        """向进程发送信号；独立会话中的进程发送给整个进程组"""
+        if self.process is None or self.process.returncode is not None:
+            return False
+        try:
+            if self.new_session:
+                os.killpg(self.process.pid, sig)
+            else:
+                self.process.send_signal(sig)
+        except (ProcessLookupError, PermissionError):
+            # 已退出，或者是 pkexec 提权后的进程
+            return False
+        return True
+
     def cancel(self) -> bool:
         cancelled = False
         if self._result_task is not None:
             cancelled = self._result_task.cancel()
-        if self.process is not None and self.process.returncode is None:
-            self.process.kill()
+        if self.send_signal(signal.SIGKILL):
             cancelled = True
         return cancelled
 
@@ -146,116 +243,410 @@ class SubprocessJob:
         return self._ensure_result_task()
 
 
+class CancelGroup:
+    """一组可以一起取消的子进程
+
+    组内进程都在独立会话中启动，取消时先向整个进程组发送 SIGTERM，
+    超时后再 SIGKILL，子进程派生的进程也会一并结束。
+    """
+
+    def __init__(self, name: str):
+        self.name: str = name
+        self.jobs: list[SubprocessJob] = []
+        self.cancelled: bool = False
+
+    def add(self, job: SubprocessJob) -> None:
+        self.jobs.append(job)
+
+    def discard(self, job: SubprocessJob) -> None:
+        if job in self.jobs:
+            self.jobs.remove(job)
+
+    async def cancel(self, grace: float = TERMINATE_GRACE_SECONDS) -> None:
+        self.cancelled = True
+        jobs = list(self.jobs)
+        terminated = [
+            job.process
+            for job in jobs
+            if job.send_signal(signal.SIGTERM) and job.process is not None
+        ]
+        if terminated:
+            _, pending = await asyncio.wait(
+                [asyncio.ensure_future(p.wait()) for p in terminated], timeout=grace
+            )
+            for task in pending:
+                task.cancel()
+        for job in jobs:
+            # 宽限期后仍未退出的直接 SIGKILL，并取消等待结果的任务
+            _ = job.cancel()
+        self.jobs.clear()
+
+
 class SubprocessManager:
     _instance = None # pyright: ignore[reportUnannotatedClassAttribute]
-    _semaphore: asyncio.Semaphore | None = None
+    _pools: dict[str, asyncio.Semaphore] | None = None
+    _metrics: deque[JobMetrics] | None = None
+    _groups: dict[str, CancelGroup] | None = None
+    _base_env: dict[str, str] | None = None
+    _env_cache: dict[tuple[tuple[str, str], ...], dict[str, str]] = {}
+    _query_cache: dict[str, _CachedQuery] = {}
+    _query_inflight: dict[tuple[str, Hashable], asyncio.Task[SubprocessResult]] = {}
+    _query_stats: QueryStats = QueryStats()
 
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
             cls._instance = super(SubprocessManager, cls).__new__(cls, *args, **kwargs)
-            cls._semaphore = asyncio.Semaphore(10)
+            cls._pools = {
+                name: asyncio.Semaphore(size) for name, size in POOL_SIZES.items()
+            }
+            cls._metrics = deque(maxlen=METRICS_HISTORY)
+            cls._groups = {}
         return cls._instance
 
+    def _pool(self, long_running: bool) -> asyncio.Semaphore:
+        if self._pools is None:
+            raise RuntimeError("Semaphore is not initialized")
+        return self._pools[LONG_POOL if long_running else SHORT_POOL]
+
+    def group(self, name: str) -> CancelGroup:
+        """获取（或创建）指定名称的取消组"""
+        assert self._groups is not None
+        group = self._groups.get(name)
+        if group is None or group.cancelled:
+            group = self._groups[name] = CancelGroup(name)
+        return group
+
+    def _new_metrics(self, command: str, key: str | None, pool: str) -> JobMetrics:
+        metrics = JobMetrics(
+            command=command,
+            key=key if key else command,
+            pool=pool,
+        )
+        assert self._metrics is not None
+        self._metrics.append(metrics)
+        return metrics
+
+    def finish_metrics(self, metrics: JobMetrics, returncode: int | None) -> None:
+        if metrics.finished:
+            return
+        started = metrics.queued_at + metrics.queue_wait
+        metrics.runtime = time.monotonic() - started
+        metrics.returncode = returncode
+
+    def get_metrics(self) -> list[JobMetrics]:
+        """最近任务的指标，按排队时间排序"""
+        return list(self._metrics or ())
+
+    def get_stats(self) -> dict[str, dict[str, float]]:
+        """按并发池汇总的平均排队、启动和运行耗时（毫秒）"""
+        stats: dict[str, dict[str, float]] = {}
+        for pool in (*POOL_SIZES, DETACHED):
+            jobs = [m for m in self.get_metrics() if m.pool == pool]
+            finished = [m for m in jobs if m.runtime is not None]
+            stats[pool] = {
+                "jobs": len(jobs),
+                "running": len(jobs) - len(finished),
+                "failed": sum(1 for m in finished if m.returncode != 0),
+                "queue_wait_ms": sum(m.queue_wait for m in jobs) / len(jobs) * 1000 if jobs else 0.0,
+                "spawn_ms": sum(m.spawn_time for m in jobs) / len(jobs) * 1000 if jobs else 0.0,
+                "runtime_ms": sum(m.runtime or 0.0 for m in finished) / len(finished) * 1000 if finished else 0.0,
+            }
+        return stats
+
+    async def query(
+        self,
+        command: Command,
+        key: str | None = None,
+        ttl: float | None = None,
+        stamp: Hashable = None,
+        tag: str | None = None,
+        env: dict[str, str] | None = None,
+        timeout: float | None = None,
+        shell: bool = False,
+    ) -> SubprocessResult:
+        """执行只读、幂等的命令并缓存结果
+
+        同一 key 的并发查询只执行一次命令。缓存在 ttl 秒后过期（None 表示不过期），
+        stamp 与缓存时不同（例如 file_stamp() 的结果变化）时也会重新执行；
+        invalidate(tag) 可以让一组查询失效。失败的结果不会被缓存。
+        """
+        key = key if key else command_text(command)
+        now = time.monotonic()
+        cached = self._query_cache.get(key)
+        if (
+            cached is not None
+            and cached.stamp == stamp
+            and (cached.expires is None or cached.expires > now)
+        ):
+            self._query_stats.hits += 1
+            return cached.result
+
+        inflight_key = (key, stamp)
+        task = self._query_inflight.get(inflight_key)
+        if task is not None:
+            self._query_stats.joined += 1
+        else:
+            self._query_stats.misses += 1
+            job = self.submit(command, key=key, env=env, timeout=timeout, shell=shell)
+            task = asyncio.create_task(
+                self._store_query(job, key, ttl, stamp, tag)
+            )
+            self._query_inflight[inflight_key] = task
+            task.add_done_callback(
+                lambda _: self._query_inflight.pop(inflight_key, None)
+            )
+        # 一个调用方被取消不应影响其他等待同一结果的调用方
+        return await asyncio.shield(task)
+
+    async def _store_query(
+        self,
+        job: SubprocessJob,
+        key: str,
+        ttl: float | None,
+        stamp: Hashable,
+        tag: str | None,
+    ) -> SubprocessResult:
+        result = await job.get()
+        if len(self._query_cache) >= QUERY_CACHE_SIZE:
+            now = time.monotonic()
+            for k in [k for k, v in self._query_cache.items() if v.expires is not None and v.expires <= now]:
+                del self._query_cache[k]
+            if len(self._query_cache) >= QUERY_CACHE_SIZE:
+                # 字典按插入顺序，删除最早的条目
+                del self._query_cache[next(iter(self._query_cache))]
+        self._query_cache[key] = _CachedQuery(
+            result=result,
+            stamp=stamp,
+            expires=None if ttl is None else time.monotonic() + ttl,
+            tag=tag,
+        )
+        return result
+
+    def invalidate(self, tag: str | None = None, key: str | None = None) -> None:
+        """使缓存的查询失效；不带参数时清空全部缓存"""
+        if key is not None:
+            dropped = [key] if key in self._query_cache else []
+        elif tag is not None:
+            dropped = [k for k, v in self._query_cache.items() if v.tag == tag]
+        else:
+            dropped = list(self._query_cache)
+        for k in dropped:
+            del self._query_cache[k]
+        self._query_stats.invalidations += len(dropped)
+
+    def get_query_stats(self) -> QueryStats:
+        stats = self._query_stats
+        return QueryStats(stats.hits, stats.misses, stats.joined, stats.invalidations)
+
     def is_running_in_flatpak(self):
         return "container" in os.environ
 
+    def invalidate_env(self) -> None:
+        """os.environ 变化后调用，下次启动进程时重新生成环境变量"""
+        self._base_env = None
+        self._env_cache.clear()
+
     def _build_env(self, env: dict[str, str] | None = None) -> dict[str, str]:
-        return {
-            **os.environ.copy(),
+        # 子进程不会修改传入的 env，同一组覆盖可以复用同一个字典
+        key = tuple(sorted(env.items())) if env else ()
+        cached = self._env_cache.get(key)
+        if cached is not None:
+            return cached
+
+        if self._base_env is None:
+            self._base_env = os.environ.copy()
+        cached = {
+            **self._base_env,
             **(env or {}),
-            "PATH": f"/usr/bin:/bin:{os.environ['PATH']}",
+            "PATH": f"/usr/bin:/bin:{self._base_env['PATH']}",
             "LD_LIBRARY_PATH": "",
             "PYTHONPATH": "",
             "PYTHONHOME": "",
         }
+        if len(self._env_cache) >= ENV_CACHE_SIZE:
+            self._env_cache.clear()
+        self._env_cache[key] = cached
+        return cached
 
     async def _spawn_process_unlocked(
         self,
-        command: str,
+        command: Command,
         flag: bool = False,
         env: dict[str, str] | None = None,
         shell: bool = False,
+        metrics: JobMetrics | None = None,
     ) -> asyncio.subprocess.Process:
-        if self._semaphore is None:
-            raise RuntimeError("Semaphore is not initialized")
-
+        start = time.monotonic()
+        if metrics is not None:
+            metrics.queue_wait = start - metrics.queued_at
+        process = await self._create_process(command, flag, env, shell)
+        if metrics is not None:
+            metrics.spawn_time = time.monotonic() - start
+            metrics.pid = process.pid
+        return process
+
+    async def _create_process(
+        self,
+        command: Command,
+        flag: bool,
+        env: dict[str, str] | None,
+        shell: bool,
+    ) -> asyncio.subprocess.Process:
+        # 不使用 preexec_fn：它强制走 fork 路径且在多线程下不安全，
+        # start_new_session 由 _posixsubprocess 在子进程中直接 setsid，可以使用 vfork
         env_vars = self._build_env(env)
         if shell:
             return await asyncio.create_subprocess_shell(
-                command,
+                command_text(command),
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
                 env=env_vars,
-                preexec_fn=os.setsid if flag else None,
+                start_new_session=flag,
             )
-        command_list = shlex.split(command)
         return await asyncio.create_subprocess_exec(
-            *command_list,
+            *command_argv(command),
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
             env=env_vars,
-            preexec_fn=os.setsid if flag else None,
+            start_new_session=flag,
         )
 
     async def _spawn_process(
         self,
-        command: str,
+        command: Command,
         flag: bool = False,
         env: dict[str, str] | None = None,
         shell: bool = False,
+        metrics: JobMetrics | None = None,
     ) -> asyncio.subprocess.Process:
-        if self._semaphore is None:
-            raise RuntimeError("Semaphore is not initialized")
-
-        async with self._semaphore:
+        # 只在 fork/exec 期间占用短任务池
+        async with self._pool(long_running=False):
             return await self._spawn_process_unlocked(
                 command=command,
                 flag=flag,
                 env=env,
                 shell=shell,
+                metrics=metrics,
             )
 
     async def start(
         self,
-        command: str,
+        command: Command,
         flag: bool = False,
         key: str | None = None,
         env: dict[str, str] | None = None,
         shell: bool = False,
+        group: CancelGroup | None = None,
     ) -> SubprocessJob:
+        """启动进程后立即返回，由调用方等待或取消
+
+        这类进程（会话、scrcpy 等）可能一直运行，只在启动期间占用短任务池，
+        不占用长任务池，否则会一直占着名额。
+        """
+        new_session = flag or group is not None
+        metrics = self._new_metrics(command_text(command), key, DETACHED)
         process = await self._spawn_process(
             command=command,
-            flag=flag,
+            flag=new_session,
             env=env,
             shell=shell,
+            metrics=metrics,
         )
         job = SubprocessJob(
-            command=command,
-            key=key if key else command,
+            command=metrics.command,
+            key=metrics.key,
             process=process,
+            new_session=new_session,
+            metrics=metrics,
         )
         job.start_capture()
+        # 即使没有人等待结果，也在进程退出时记录指标
+        job._ensure_result_task()
+        if group is not None:
+            group.add(job)
+            job.task().add_done_callback(lambda _: group.discard(job))
         return job
 
-    async def _run_and_collect(
+    async def stream(
         self,
-        command: str,
+        command: Command,
         flag: bool = False,
         key: str | None = None,
         env: dict[str, str] | None = None,
+        shell: bool = False,
+        long_running: bool = True,
+        group: CancelGroup | None = None,
+        check: bool = True,
+    ) -> AsyncIterator[str]:
+        """逐行产出 stdout，不在内存中保留完整输出
+
+        提前退出迭代时会结束进程；check 为 True 时非零退出码抛出 SubprocessError。
+        """
+        new_session = flag or group is not None
+        metrics = self._new_metrics(
+            command_text(command), key, LONG_POOL if long_running else SHORT_POOL
+        )
+        async with self._pool(long_running):
+            process = await self._spawn_process_unlocked(
+                command=command,
+                flag=new_session,
+                env=env,
+                shell=shell,
+                metrics=metrics,
+            )
+            job = SubprocessJob(
+                command=metrics.command,
+                key=metrics.key,
+                process=process,
+                new_session=new_session,
+                metrics=metrics,
+            )
+            if process.stderr is not None:
+                job._stderr_task = asyncio.create_task(
+                    job._drain_stream(process.stderr, job._stderr_buf)
+                )
+            if group is not None:
+                group.add(job)
+            try:
+                assert process.stdout is not None
+                async for line in process.stdout:
+                    yield line.decode(errors="replace").rstrip("\n")
+                await process.wait()
+            finally:
+                if process.returncode is None:
+                    job.send_signal(signal.SIGKILL)
+                    await process.wait()
+                await job._join_capture_tasks()
+                self.finish_metrics(metrics, process.returncode)
+                if group is not None:
+                    group.discard(job)
+
+        if check and process.returncode != 0:
+            raise SubprocessError(
+                process.returncode if process.returncode is not None else 1,
+                job.stderr_text(),
+            )
+
+    async def _run_and_collect(
+        self,
+        job: SubprocessJob,
+        command: Command,
+        flag: bool = False,
+        env: dict[str, str] | None = None,
         timeout: float | None = None,
         shell: bool = False,
+        long_running: bool = False,
     ) -> SubprocessResult:
-        if self._semaphore is None:
-            raise RuntimeError("Semaphore is not initialized")
-
-        async with self._semaphore:
+        assert job.metrics is not None
+        async with self._pool(long_running):
             process = await self._spawn_process_unlocked(
                 command=command,
                 flag=flag,
                 env=env,
                 shell=shell,
+                metrics=job.metrics,
             )
+            job.process = process
             try:
                 if timeout is None:
                     stdout, stderr = await process.communicate()
@@ -264,28 +655,21 @@ class SubprocessManager:
                         process.communicate(),
                         timeout=timeout,
                     )
-            except asyncio.TimeoutError:
-                process.kill()
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                job.send_signal(signal.SIGKILL)
                 await process.wait()
                 raise
+            finally:
+                self.finish_metrics(job.metrics, process.returncode)
 
             result :SubprocessResult= {
-                "command": command,
-                "key": key if key else command,
+                "command": job.command,
+                "key": job.key,
                 "returncode": process.returncode if process.returncode is not None else 1,
                 "stdout": stdout.decode(),
                 "stderr": stderr.decode(),
                 "process": None,  # 进程已完成，不需要跟踪
             }
-            # print(
-            #     json.dumps(
-            #         result,
-            #         sort_keys=True,
-            #         indent=4,
-            #         separators=(", ", ": "),
-            #         ensure_ascii=False,
-            #     )
-            # )
             if result["returncode"] != 0:
                 raise SubprocessError(result["returncode"], result["stderr"])
 
@@ -293,24 +677,41 @@ class SubprocessManager:
 
     def submit(
         self,
-        command: str,
+        command: Command,
         flag: bool = False,
         key: str | None = None,
         env: dict[str, str] | None = None,
         timeout: float | None = None,
         shell: bool = False,
+        long_running: bool = False,
+        group: CancelGroup | None = None,
     ) -> SubprocessJob:
-        return SubprocessJob(
-            command=command,
-            key=key if key else command,
-            _result_task=asyncio.create_task(
-                self._run_and_collect(
-                    command=command,
-                    flag=flag,
-                    key=key,
-                    env=env,
-                    timeout=timeout,
-                    shell=shell,
-                )
-            ),
+        """运行命令并收集全部输出
+
+        long_running 的任务（会话启动、安装、需要授权的 pkexec 等）使用单独的并发池。
+        """
+        new_session = flag or group is not None
+        metrics = self._new_metrics(
+            command_text(command), key, LONG_POOL if long_running else SHORT_POOL
+        )
+        job = SubprocessJob(
+            command=metrics.command,
+            key=metrics.key,
+            new_session=new_session,
+            metrics=metrics,
         )
+        job._result_task = asyncio.create_task(
+            self._run_and_collect(
+                job,
+                command,
+                flag=new_session,
+                env=env,
+                timeout=timeout,
+                shell=shell,
+                long_running=long_running,
+            )
+        )
+        if group is not None:
+            group.add(job)
+            job._result_task.add_done_callback(lambda _: group.discard(job))
+        return job
@@ -0,0 +1,147 @@
+"""Run async steps as a dependency graph.
+
+Each step starts as soon as the steps it depends on have finished, so
+independent steps run concurrently. A failing step is retried on its own with
+jittered exponential backoff instead of restarting the whole graph, and every
+step's duration and attempt count is recorded.
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from waydroid_helper.util.log import logger
+
+
+class StepFailed(Exception):
+    """Raised when a required step fails after all of its attempts."""
+
+    def __init__(self, step: str, error: BaseException | None):
+        self.step = step
+        self.error = error
+        super().__init__(f"step '{step}' failed: {error}")
+
+
+@dataclass
+class StepTiming:
+    name: str
+    status: str = "pending"  # ok / failed / skipped
+    attempts: int = 0
+    started: float = 0.0
+    duration: float = 0.0
+
+
+@dataclass
+class _Step:
+    name: str
+    run: Callable[[], Awaitable[Any]]
+    deps: tuple[str, ...]
+    retries: int
+    required: bool
+    timing: StepTiming = field(init=False)
+
+    def __post_init__(self):
+        self.timing = StepTiming(self.name)
+
+
+class TaskGraph:
+    """A set of named async steps with dependencies.
+
+    A step fails when it raises or returns ``False``. Optional steps that fail
+    yield ``None`` and do not stop their dependents.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        base_delay: float = 0.25,
+        max_delay: float = 3.0,
+    ):
+        self.name = name
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._steps: dict[str, _Step] = {}
+        self.results: dict[str, Any] = {}
+
+    def add(
+        self,
+        name: str,
+        run: Callable[[], Awaitable[Any]],
+        deps: tuple[str, ...] = (),
+        retries: int = 0,
+        required: bool = True,
+    ) -> None:
+        for dep in deps:
+            if dep not in self._steps:
+                raise ValueError(f"step '{name}' depends on unknown step '{dep}'")
+        self._steps[name] = _Step(name, run, deps, retries, required)
+
+    @property
+    def timings(self) -> list[StepTiming]:
+        return [step.timing for step in self._steps.values()]
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * (2**attempt))
+        return delay * random.uniform(0.5, 1.5)
+
+    async def _run_step(self, step: _Step, tasks: dict[str, asyncio.Task[Any]]) -> Any:
+        if step.deps:
+            await asyncio.gather(*(tasks[dep] for dep in step.deps))
+
+        timing = step.timing
+        timing.started = time.monotonic()
+        error: BaseException | None = None
+        for attempt in range(step.retries + 1):
+            timing.attempts = attempt + 1
+            try:
+                result = await step.run()
+                if result is not False:
+                    timing.status = "ok"
+                    timing.duration = time.monotonic() - timing.started
+                    self._report(timing)
+                    self.results[step.name] = result
+                    return result
+                error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = e
+            if attempt < step.retries:
+                await asyncio.sleep(self._backoff(attempt))
+
+        timing.status = "failed" if step.required else "skipped"
+        timing.duration = time.monotonic() - timing.started
+        self._report(timing)
+        if step.required:
+            raise StepFailed(step.name, error)
+        self.results[step.name] = None
+        return None
+
+    def _report(self, timing: StepTiming) -> None:
+        logger.info(
+            f"[{self.name}] {timing.name}: {timing.status} in "
+            f"{timing.duration * 1000:.1f} ms ({timing.attempts} attempt(s))"
+        )
+
+    async def run(self) -> dict[str, Any]:
+        """Runs every step and returns their results by name.
+
+        Raises ``StepFailed`` for the first required step that fails; the
+        remaining steps are cancelled.
+        """
+        start = time.monotonic()
+        tasks: dict[str, asyncio.Task[Any]] = {}
+        # steps were added after their dependencies, so insertion order is topological
+        for step in self._steps.values():
+            tasks[step.name] = asyncio.create_task(self._run_step(step, tasks))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        logger.info(f"[{self.name}] finished in {(time.monotonic() - start) * 1000:.1f} ms")
+        return self.results
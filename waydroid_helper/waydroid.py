@@ -158,10 +158,7 @@ class PrivilegedPropsCompat(GObject.Object):
 
     async def save(self):
         """Save properties (compatibility method)"""
-        success = await self._controller.save_all_privileged_properties()
-        if success:
-            return await self._controller.upgrade(offline=True)
-        return False
+        return await self._controller.save_all_privileged_properties(upgrade=True)
 
     async def restore(self):
         """Restore properties (compatibility method)"""
@@ -296,16 +293,21 @@ class WaydroidCompat(GObject.Object):
         """Save a persist property"""
         return await self._controller.save_persist_property(name)
 
+    def queue_persist_prop(self, name: str, delay_ms: int | None = None):
+        """Queue a persist property for the next batched write"""
+        if delay_ms is None:
+            self._controller.queue_persist_property(name)
+        else:
+            self._controller.queue_persist_property(name, delay_ms)
+
     async def refresh_persist_prop(self, name: str):
         """Refresh a persist property from Waydroid"""
         return await self._controller.refresh_persist_property(name)
 
     async def save_privileged_props(self):
         """Save privileged properties"""
-        success = await self._controller.save_all_privileged_properties()
-        if success:
-            return await self._controller.upgrade(offline=True)
-        return False
+        # Writing the config and upgrading share one authorization prompt
+        return await self._controller.save_all_privileged_properties(upgrade=True)
 
     async def restore_privileged_props(self):
         """Restore privileged properties"""
@@ -313,11 +315,7 @@ class WaydroidCompat(GObject.Object):
 
     async def save_waydroid_props(self, upgrade: bool = False):
         """Save waydroid config properties"""
-        success = await self._controller.save_all_waydroid_properties()
-        if success and upgrade:
-            logger.debug("Upgrade waydroid config properties")
-            return await self._controller.upgrade(offline=True)
-        return success
+        return await self._controller.save_all_waydroid_properties(upgrade=upgrade)
 
     async def reset_waydroid_props(self):
         """Reset waydroid config properties"""
@@ -331,18 +329,22 @@ class WaydroidCompat(GObject.Object):
         """Restore waydroid config properties"""
         return await self._controller.restore_waydroid_properties()
 
-    async def set_extension_props(self, pairs: dict[str, Any]):
-        """Set extension properties"""
-        return await self._controller.set_extension_properties(pairs)
+    async def set_extension_props(self, pairs: dict[str, Any], upgrade: bool = False):
+        """Set extension properties, optionally upgrading in the same privileged call"""
+        return await self._controller.set_extension_properties(pairs, upgrade)
 
-    async def remove_extension_props(self, keys: list[str]):
-        """Remove extension properties"""
-        return await self._controller.remove_extension_properties(keys)
+    async def remove_extension_props(self, keys: list[str], upgrade: bool = False):
+        """Remove extension properties, optionally upgrading in the same privileged call"""
+        return await self._controller.remove_extension_properties(keys, upgrade)
 
     def get_android_version(self):
         """Get Android version"""
         return self._controller.session_model.get_property("android_version")
 
+    async def get_build_props(self, prefix: str = "ro.") -> dict[str, str]:
+        """Get build.prop entries (ro.* by default) of the system image"""
+        return await self._controller.get_build_props(prefix)
+
     # State management methods
     def reset_persist_props_state(self):
         """Reset persist props state (compatibility)"""